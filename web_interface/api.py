@@ -7,28 +7,54 @@ SDG Web界面API接口
 提供RESTful API接口用于外部系统集成
 """
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 import pandas as pd
 import numpy as np
 import os
+import json
 import uuid
+import random
+import threading
 from datetime import datetime
 import logging
 
-from utils.data_processor import DataProcessor
-from utils.model_manager import ModelManager
-from utils.quality_evaluator import QualityEvaluator
+from utils.hyperparameter_search import HyperparameterSearch, hyperband_brackets
+from utils.model_registry import ModelRegistry, training_run_id
+from utils.llm_cache import get_completion_cache
+from utils.lazy_imports import LazyInstance, IMPORT_TIMINGS
+from metrics import stage, request_stats, request_elapsed
 
 # 创建API蓝图
 api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
 
-# 初始化工具类
-data_processor = DataProcessor()
-model_manager = ModelManager()
-quality_evaluator = QualityEvaluator()
+# 初始化工具类（首次使用时才导入，避免启动时加载 scipy、sdgx 等依赖）
+data_processor = LazyInstance('utils.data_processor', 'DataProcessor')
+model_manager = LazyInstance('utils.model_manager', 'ModelManager')
+quality_evaluator = LazyInstance('utils.quality_evaluator', 'QualityEvaluator')
+model_registry = ModelRegistry()
 
 # 全局存储（生产环境应使用数据库）
 api_sessions = {}
+tuning_jobs = {}
+tuning_lock = threading.Lock()
+
+# 超参数搜索默认使用的进程数
+TUNING_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# 超参数搜索的 epochs 上限（与 CTGAN epochs 参数的上限一致）和试验总数上限
+TUNING_MAX_EPOCHS = 1000
+TUNING_MAX_TRIALS = 100
+# 保留的已结束任务数，超过后丢弃最早结束的
+TUNING_KEEP_FINISHED = 20
+
+
+def _evict_finished_tuning_jobs():
+    """丢弃最早结束的任务，只保留 TUNING_KEEP_FINISHED 个（调用方持有 tuning_lock）"""
+    finished = sorted(
+        (job['finished_at'], job_id) for job_id, job in tuning_jobs.items()
+        if job['status'] != 'running'
+    )
+    for _, job_id in finished[:max(0, len(finished) - TUNING_KEEP_FINISHED)]:
+        del tuning_jobs[job_id]
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
@@ -36,7 +62,9 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'startup': current_app.config.get('STARTUP_TIMINGS', {}),
+        'lazy_imports': IMPORT_TIMINGS
     })
 
 @api_bp.route('/models', methods=['GET'])
@@ -77,7 +105,7 @@ def get_model_recommendations(model_type):
         data = request.get_json()
         data_info = data.get('data_info', {})
         
-        recommendations = model_manager.get_model_recommendations(data_info)
+        recommendations = model_manager.get_model_recommendations(data_info, data.get('time_budget'))
         suggestions = model_manager.get_parameter_suggestions(model_type, data_info)
         
         return jsonify({
@@ -92,6 +120,223 @@ def get_model_recommendations(model_type):
             'error': str(e)
         }), 400
 
+@api_bp.route('/models/<model_type>/plan', methods=['POST'])
+def estimate_training_plan(model_type):
+    """提交训练前估算耗时、峰值内存，并按时间预算给出训练参数"""
+    try:
+        data = request.get_json()
+        
+        if model_type != 'ctgan':
+            return jsonify({
+                'success': False,
+                'error': f'模型 {model_type} 不支持训练计划估算'
+            }), 400
+        
+        # 提供原始数据时先剖析结构，否则使用 data_info（analyze_data 的结果）
+        if 'data' in data:
+            data_info = {'schema': model_manager.profile_schema(pd.DataFrame(data['data']))}
+        else:
+            data_info = data.get('data_info', {})
+        
+        plan = model_manager.estimate_training_plan(
+            data_info,
+            time_budget=data.get('time_budget'),
+            parameters=data.get('model_config')
+        )
+        
+        return jsonify({
+            'success': True,
+            'model_type': model_type,
+            'plan': plan
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@api_bp.route('/models/<model_type>/tune', methods=['POST'])
+def tune_model(model_type):
+    """启动超参数搜索（后台执行，通过 /tuning/<job_id> 查询结果）"""
+    try:
+        data = request.get_json()
+        
+        if model_type != 'ctgan':
+            return jsonify({
+                'success': False,
+                'error': f'模型 {model_type} 不支持超参数搜索'
+            }), 400
+        
+        if 'data' not in data:
+            return jsonify({
+                'success': False,
+                'error': '需要提供data字段'
+            }), 400
+        
+        method = data.get('method', 'hyperband')
+        if method not in ('hyperband', 'successive_halving'):
+            return jsonify({
+                'success': False,
+                'error': f'不支持的搜索方法: {method}'
+            }), 400
+        
+        max_workers = int(data.get('max_workers', TUNING_WORKERS))
+        if max_workers < 1:
+            return jsonify({
+                'success': False,
+                'error': 'max_workers 必须大于0'
+            }), 400
+        # 每个工作进程同时训练一个模型，并行数不超过 TUNING_WORKERS 和 CPU 核数
+        max_workers = min(max_workers, TUNING_WORKERS, os.cpu_count() or 1)
+        
+        options = {
+            'min_epochs': int(data.get('min_epochs', 5)),
+            'max_epochs': int(data.get('max_epochs', 135)),
+            'eta': int(data.get('eta', 3))
+        }
+        if not 1 <= options['min_epochs'] <= options['max_epochs'] <= TUNING_MAX_EPOCHS:
+            return jsonify({
+                'success': False,
+                'error': f'需要满足 1 <= min_epochs <= max_epochs <= {TUNING_MAX_EPOCHS}'
+            }), 400
+        if options['eta'] < 2:
+            return jsonify({
+                'success': False,
+                'error': 'eta 必须不小于2'
+            }), 400
+        if method == 'successive_halving':
+            options['n_trials'] = int(data.get('n_trials', 27))
+            n_trials = options['n_trials']
+        else:
+            n_trials = sum(count for count, _ in hyperband_brackets(**options))
+        if not 1 <= n_trials <= TUNING_MAX_TRIALS:
+            return jsonify({
+                'success': False,
+                'error': f'试验数 {n_trials} 超出范围 (1-{TUNING_MAX_TRIALS})'
+            }), 400
+        
+        df = pd.DataFrame(data['data'])
+        search = HyperparameterSearch(
+            model_manager.get_model_parameters('ctgan'),
+            max_workers=max_workers,
+            seed=data.get('seed')
+        )
+        
+        # 每个任务占用一个进程池，同一时间只运行一个任务
+        with tuning_lock:
+            if any(job['status'] == 'running' for job in tuning_jobs.values()):
+                return jsonify({
+                    'success': False,
+                    'error': '已有超参数搜索任务在运行，请稍后再试'
+                }), 429
+            _evict_finished_tuning_jobs()
+            
+            job_id = str(uuid.uuid4())
+            tuning_jobs[job_id] = {
+                'status': 'running',
+                'method': method,
+                'options': options,
+                'trials': n_trials,
+                'created_at': datetime.now().isoformat()
+            }
+        
+        def run():
+            job = tuning_jobs[job_id]
+            try:
+                with stage('tune'):
+                    job['result'] = getattr(search, method)(df, **options)
+                status = 'completed'
+            except Exception as e:
+                logging.error(f"超参数搜索失败: {e}")
+                job['error'] = str(e)
+                status = 'failed'
+            with tuning_lock:
+                job['finished_at'] = datetime.now().isoformat()
+                job['status'] = status
+        
+        threading.Thread(target=run, name=f'tuning-{job_id[:8]}', daemon=True).start()
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'running'
+        }), 202
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@api_bp.route('/tuning/<job_id>', methods=['GET'])
+def get_tuning_job(job_id):
+    """查询超参数搜索任务"""
+    if job_id not in tuning_jobs:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'job': tuning_jobs[job_id]
+    })
+
+@api_bp.route('/training/runs', methods=['GET'])
+def list_training_runs():
+    """列出模型注册表中的训练运行"""
+    try:
+        return jsonify({
+            'success': True,
+            'runs': model_registry.list_runs()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/training/runs/<run_id>', methods=['GET'])
+def get_training_run(run_id):
+    """获取训练运行的进度和验证指标"""
+    try:
+        metadata = model_registry.get_metadata(run_id)
+        if metadata is None:
+            return jsonify({
+                'success': False,
+                'error': '训练运行不存在'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'run': metadata
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@api_bp.route('/training/runs/<run_id>', methods=['DELETE'])
+def delete_training_run(run_id):
+    """删除训练运行及其检查点"""
+    try:
+        if not model_registry.delete_run(run_id):
+            return jsonify({
+                'success': False,
+                'error': '训练运行不存在'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': '训练运行已删除'
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
 @api_bp.route('/data/analyze', methods=['POST'])
 def analyze_data():
     """分析数据"""
@@ -152,7 +397,8 @@ def clean_data():
             'success': True,
             'cleaned_data': cleaned_df.to_dict('records'),
             'shape': cleaned_df.shape,
-            'columns': list(cleaned_df.columns)
+            'columns': list(cleaned_df.columns),
+            'memory_report': cleaned_df.attrs.get('memory_report')
         })
     except Exception as e:
         return jsonify({
@@ -191,52 +437,155 @@ def generate_synthetic_data():
                 'validation_errors': validation_result['errors']
             }), 400
         
-        # 创建模型
-        model = model_manager.create_model(
-            data['model_type'], 
-            data['model_config']
-        )
-        
-        # 准备数据
-        prepared_df = data_processor.prepare_for_synthesis(df)
-        
-        # 创建数据连接器
-        from sdgx.data_connectors.dataframe_connector import DataFrameConnector
-        data_connector = DataFrameConnector(df=prepared_df)
-        
-        # 创建合成器
-        from sdgx.synthesizer import Synthesizer
-        synthesizer = Synthesizer(
-            model=model,
-            data_connector=data_connector
-        )
-        
-        # 训练模型
-        synthesizer.fit()
-        
-        # 生成合成数据
-        num_samples = data['num_samples']
-        synthetic_data = synthesizer.sample(num_samples)
-        
-        # 后处理合成数据
-        processed_synthetic = data_processor.post_process_synthetic(synthetic_data, df)
+        if data['model_type'] == 'gpt':
+            # GPT 通过并发、限流的采样管线生成，返回的行已按原始数据结构校验
+            sampler = model_manager.create_gpt_sampler(data['model_config'])
+            with stage('sample'):
+                processed_synthetic = sampler.sample(df, data['num_samples'], seed=data.get('seed'))
+            encoder = None
+            training = {'sampling': sampler.stats}
+        else:
+            # 准备数据（编码器保存类别映射，用于还原合成数据）
+            encoder = data_processor.fit_encoder(df)
+            prepared_df = data_processor.prepare_for_synthesis(df, encoder=encoder)
+            
+            # CTGAN 指定运行ID（或 checkpoint 为真时按数据和参数生成）时保存检查点，
+            # 相同运行ID重新提交时从检查点继续；未指定时只做验证和提前停止，不保存检查点
+            run_id = None
+            if data['model_type'] == 'ctgan':
+                run_id = data.get('run_id')
+                if not run_id and data.get('checkpoint'):
+                    run_id = training_run_id(prepared_df, data['model_config'])
+            
+            # 创建模型
+            model = model_manager.create_model(
+                data['model_type'], 
+                data['model_config'],
+                run_id=run_id
+            )
+            
+            # 创建数据连接器
+            from sdgx.data_connectors.dataframe_connector import DataFrameConnector
+            data_connector = DataFrameConnector(df=prepared_df)
+            
+            # 创建合成器
+            from sdgx.synthesizer import Synthesizer
+            synthesizer = Synthesizer(
+                model=model,
+                data_connector=data_connector
+            )
+            
+            # 训练模型
+            with stage('fit'):
+                synthesizer.fit()
+            
+            # 生成合成数据
+            num_samples = data['num_samples']
+            with stage('sample'):
+                synthetic_data = synthesizer.sample(num_samples)
+            
+            # 后处理合成数据
+            processed_synthetic = data_processor.post_process_synthetic(synthetic_data, encoder=encoder)
+            training = getattr(model, 'training_summary', None)
         
         # 生成会话ID
         session_id = str(uuid.uuid4())
-        api_sessions[session_id] = {
-            'original_data': df.to_dict('records'),
-            'synthetic_data': processed_synthetic.to_dict('records'),
-            'model_type': data['model_type'],
-            'model_config': data['model_config'],
-            'created_at': datetime.now()
-        }
+        with stage('serialize'):
+            synthetic_records = processed_synthetic.to_dict('records')
+            api_sessions[session_id] = {
+                'original_data': df.to_dict('records'),
+                'synthetic_data': synthetic_records,
+                'model_type': data['model_type'],
+                'model_config': data['model_config'],
+                'encoder': encoder.to_dict() if encoder else None,
+                'training': training,
+                'created_at': datetime.now()
+            }
         
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'synthetic_data': processed_synthetic.to_dict('records'),
+            'training': training,
+            'synthetic_data': synthetic_records,
             'shape': processed_synthetic.shape,
-            'columns': list(processed_synthetic.columns)
+            'columns': list(processed_synthetic.columns),
+            'processing_time': request_elapsed(),
+            'stages': (request_stats() or {}).get('stages')
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/synthesis/gpt/stream', methods=['POST'])
+def stream_gpt_synthesis():
+    """GPT 流式生成：按 NDJSON 逐行返回通过校验的数据，不必等待全部请求完成"""
+    try:
+        data = request.get_json()
+        
+        for field in ['data', 'model_config', 'num_samples']:
+            if field not in data:
+                return jsonify({
+                    'success': False,
+                    'error': f'缺少必需参数: {field}'
+                }), 400
+        
+        validation_result = model_manager.validate_parameters('gpt', data['model_config'])
+        if not validation_result['valid']:
+            return jsonify({
+                'success': False,
+                'error': '模型参数验证失败',
+                'validation_errors': validation_result['errors']
+            }), 400
+        
+        df = pd.DataFrame(data['data'])
+        sampler = model_manager.create_gpt_sampler(data['model_config'])
+        # 未指定种子时在这里选取并通过响应头返回，客户端以相同种子重新运行即可命中缓存
+        seed = data.get('seed')
+        if seed is None:
+            seed = random.getrandbits(32)
+        batches = sampler.iter_rows(df, int(data['num_samples']), seed=seed)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    def generate():
+        try:
+            for batch in batches:
+                yield ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in batch)
+        except Exception as e:
+            # 响应头已发送，错误以最后一行返回
+            logging.error(f"GPT流式生成失败: {e}")
+            yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Sampling-Seed': str(seed)})
+
+@api_bp.route('/llm/cache', methods=['GET'])
+def get_llm_cache_info():
+    """获取GPT补全缓存的大小和命中率"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': get_completion_cache().info()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/llm/cache', methods=['DELETE'])
+def clear_llm_cache():
+    """清空GPT补全缓存"""
+    try:
+        removed = get_completion_cache().clear()
+        return jsonify({
+            'success': True,
+            'message': f'已清除 {removed} 条缓存'
         })
     except Exception as e:
         return jsonify({
@@ -275,11 +624,13 @@ def evaluate_quality():
             synthetic_df = pd.DataFrame(data['synthetic_data'])
         
         # 执行质量评估
-        evaluation_results = quality_evaluator.evaluate(original_df, synthetic_df)
+        with stage('evaluate'):
+            evaluation_results = quality_evaluator.evaluate(original_df, synthetic_df)
         
         return jsonify({
             'success': True,
-            'evaluation_results': evaluation_results
+            'evaluation_results': evaluation_results,
+            'processing_time': request_elapsed()
         })
     except Exception as e:
         return jsonify({
@@ -422,7 +773,8 @@ def batch_process():
                 model = model_manager.create_model(model_type, model_config)
                 
                 # 准备数据
-                prepared_df = data_processor.prepare_for_synthesis(df)
+                encoder = data_processor.fit_encoder(df)
+                prepared_df = data_processor.prepare_for_synthesis(df, encoder=encoder)
                 
                 # 创建数据连接器
                 from sdgx.data_connectors.dataframe_connector import DataFrameConnector
@@ -436,18 +788,22 @@ def batch_process():
                 )
                 
                 # 训练模型
-                synthesizer.fit()
+                with stage('fit'):
+                    synthesizer.fit()
                 
                 # 生成合成数据
-                synthetic_data = synthesizer.sample(num_samples)
+                with stage('sample'):
+                    synthetic_data = synthesizer.sample(num_samples)
                 
                 # 后处理合成数据
-                processed_synthetic = data_processor.post_process_synthetic(synthetic_data, df)
+                processed_synthetic = data_processor.post_process_synthetic(synthetic_data, encoder=encoder)
                 
+                with stage('serialize'):
+                    synthetic_records = processed_synthetic.to_dict('records')
                 results.append({
                     'index': i,
                     'success': True,
-                    'synthetic_data': processed_synthetic.to_dict('records'),
+                    'synthetic_data': synthetic_records,
                     'shape': processed_synthetic.shape
                 })
                 
@@ -462,7 +818,8 @@ def batch_process():
             'success': True,
             'results': results,
             'total_processed': len(results),
-            'successful': sum(1 for r in results if r['success'])
+            'successful': sum(1 for r in results if r['success']),
+            'processing_time': request_elapsed()
         })
     except Exception as e:
         return jsonify({
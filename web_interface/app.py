@@ -15,48 +15,31 @@ from flask import Flask, render_template, request, jsonify, send_file, redirect,
 import pandas as pd
 import numpy as np
 import os
+import sys
 import json
+import time
 import uuid
+import logging
 from datetime import datetime
 import traceback
 from werkzeug.utils import secure_filename
 
-# SDG相关导入
-import sys
-import os
+from utils.lazy_imports import lazy_import
+from metrics import instrument_app, stage, request_stats, request_elapsed
+from profiler import register_profiler
+
 # 添加SDG项目路径（从web_interface目录到根目录的synthetic-data-generator）
+# sdgx 会加载 torch，导入耗时较长，在生成数据时再导入
 sdg_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'synthetic-data-generator')
 sys.path.append(sdg_path)
 
-from sdgx.data_connectors.csv_connector import CsvConnector
-from sdgx.data_connectors.dataframe_connector import DataFrameConnector
-from sdgx.models.ml.single_table.ctgan import CTGANSynthesizerModel
-from sdgx.models.LLM.single_table.gpt import SingleTableGPTModel
-from sdgx.synthesizer import Synthesizer
-from sdgx.utils import download_demo_data
-
-# 导入API蓝图
-from api import api_bp
-
-# 导入认证蓝图
-from auth_routes import auth_bp
-
-app = Flask(__name__)
-app.secret_key = 'sdg_web_interface_secret_key_2025'
-
-# 注册蓝图
-app.register_blueprint(api_bp)
-app.register_blueprint(auth_bp)
+logger = logging.getLogger(__name__)
 
 # 配置
 UPLOAD_FOLDER = 'uploads'
 RESULTS_FOLDER = 'results'
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 
-# 创建必要的文件夹
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(RESULTS_FOLDER, exist_ok=True)
-
 # 全局变量存储当前会话数据
 session_data = {}
 
@@ -87,17 +70,14 @@ def get_data_info(df):
         'sample_data': df.head(5).to_dict('records')
     }
 
-@app.route('/')
 def index():
     """主页"""
     return render_template('index.html')
 
-@app.route('/data_source')
 def data_source():
     """数据源配置页面"""
     return render_template('data_source.html')
 
-@app.route('/upload', methods=['POST'])
 def upload_file():
     """文件上传处理"""
     try:
@@ -142,12 +122,11 @@ def upload_file():
     except Exception as e:
         return jsonify({'success': False, 'message': f'上传失败: {str(e)}'})
 
-@app.route('/demo_data')
 def demo_data():
     """使用演示数据"""
     try:
         # 下载演示数据
-        demo_path = download_demo_data()
+        demo_path = lazy_import('sdgx.utils').download_demo_data()
         df = pd.read_csv(demo_path)
         
         # 获取数据信息
@@ -173,12 +152,10 @@ def demo_data():
     except Exception as e:
         return jsonify({'success': False, 'message': f'演示数据加载失败: {str(e)}'})
 
-@app.route('/model_config')
 def model_config():
     """模型配置页面"""
     return render_template('model_config.html')
 
-@app.route('/get_model_config', methods=['POST'])
 def get_model_config():
     """获取模型配置"""
     try:
@@ -215,7 +192,6 @@ def get_model_config():
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取配置失败: {str(e)}'})
 
-@app.route('/generate', methods=['POST'])
 def generate_synthetic_data():
     """生成合成数据"""
     try:
@@ -232,11 +208,13 @@ def generate_synthetic_data():
         model_type = model_config.get('model_type', 'ctgan')
         
         # 创建数据连接器
+        from sdgx.data_connectors.dataframe_connector import DataFrameConnector
+        from sdgx.synthesizer import Synthesizer
         data_connector = DataFrameConnector(df)
         
         # 创建模型
         if model_type == 'ctgan':
-            model = CTGANSynthesizerModel(
+            model = lazy_import('sdgx.models.ml.single_table.ctgan').CTGANSynthesizerModel(
                 epochs=model_config.get('epochs', 50),
                 batch_size=model_config.get('batch_size', 500),
                 generator_lr=model_config.get('generator_lr', 2e-4),
@@ -245,7 +223,7 @@ def generate_synthetic_data():
                 discriminator_decay=model_config.get('discriminator_decay', 1e-6)
             )
         elif model_type == 'gpt':
-            model = SingleTableGPTModel(
+            model = lazy_import('sdgx.models.LLM.single_table.gpt').SingleTableGPTModel(
                 openai_API_key=model_config.get('openai_API_key', ''),
                 openai_API_url=model_config.get('openai_API_url', 'https://api.openai.com/v1/'),
                 gpt_model=model_config.get('gpt_model', 'gpt-3.5-turbo'),
@@ -264,10 +242,12 @@ def generate_synthetic_data():
         )
         
         # 训练模型
-        synthesizer.fit()
+        with stage('fit'):
+            synthesizer.fit()
         
         # 生成合成数据
-        synthetic_data = synthesizer.sample(num_samples)
+        with stage('sample'):
+            synthetic_data = synthesizer.sample(num_samples)
         
         # 保存结果
         result_id = str(uuid.uuid4())
@@ -279,8 +259,9 @@ def generate_synthetic_data():
         csv_path = os.path.join(RESULTS_FOLDER, csv_filename)
         excel_path = os.path.join(RESULTS_FOLDER, excel_filename)
         
-        synthetic_data.to_csv(csv_path, index=False, encoding='utf-8-sig')
-        synthetic_data.to_excel(excel_path, index=False)
+        with stage('serialize'):
+            synthetic_data.to_csv(csv_path, index=False, encoding='utf-8-sig')
+            synthetic_data.to_excel(excel_path, index=False)
         
         # 更新会话数据
         session_data[session_id]['synthetic_data'] = synthetic_data
@@ -298,13 +279,55 @@ def generate_synthetic_data():
                 'csv': csv_filename,
                 'excel': excel_filename
             },
+            'processing_time': request_elapsed(),
+            'stages': (request_stats() or {}).get('stages'),
             'message': '合成数据生成成功'
         })
     
     except Exception as e:
         return jsonify({'success': False, 'message': f'生成失败: {str(e)}'})
 
-@app.route('/evaluate', methods=['POST'])
+def compare_basic_stats(original_df, synthetic_df):
+    """对比原始数据和合成数据的基本统计量，计算总体质量分数"""
+    # 基本统计对比
+    numeric_cols = original_df.select_dtypes(include=[np.number]).columns
+    evaluation_results = {
+        'basic_stats': {},
+        'distribution_similarity': {},
+        'overall_score': 0
+    }
+    
+    # 数值列统计对比
+    for col in numeric_cols[:5]:  # 只评估前5个数值列
+        if col in synthetic_df.columns:
+            orig_mean = original_df[col].mean()
+            synth_mean = synthetic_df[col].mean()
+            orig_std = original_df[col].std()
+            synth_std = synthetic_df[col].std()
+            
+            mean_diff = abs(orig_mean - synth_mean) / abs(orig_mean) * 100 if orig_mean != 0 else 0
+            std_diff = abs(orig_std - synth_std) / abs(orig_std) * 100 if orig_std != 0 else 0
+            
+            evaluation_results['basic_stats'][col] = {
+                'original_mean': orig_mean,
+                'synthetic_mean': synth_mean,
+                'mean_diff_percent': mean_diff,
+                'original_std': orig_std,
+                'synthetic_std': synth_std,
+                'std_diff_percent': std_diff
+            }
+    
+    # 计算总体质量分数
+    if evaluation_results['basic_stats']:
+        mean_diffs = [stats['mean_diff_percent'] for stats in evaluation_results['basic_stats'].values()]
+        std_diffs = [stats['std_diff_percent'] for stats in evaluation_results['basic_stats'].values()]
+        avg_mean_diff = np.mean(mean_diffs)
+        avg_std_diff = np.mean(std_diffs)
+        overall_score = max(0, 100 - (avg_mean_diff + avg_std_diff) / 2)
+        evaluation_results['overall_score'] = overall_score
+    
+    return evaluation_results
+
 def evaluate_data():
     """数据质量评估"""
     try:
@@ -321,42 +344,8 @@ def evaluate_data():
         original_df = session['dataframe']
         synthetic_df = session['synthetic_data']
         
-        # 基本统计对比
-        numeric_cols = original_df.select_dtypes(include=[np.number]).columns
-        evaluation_results = {
-            'basic_stats': {},
-            'distribution_similarity': {},
-            'overall_score': 0
-        }
-        
-        # 数值列统计对比
-        for col in numeric_cols[:5]:  # 只评估前5个数值列
-            if col in synthetic_df.columns:
-                orig_mean = original_df[col].mean()
-                synth_mean = synthetic_df[col].mean()
-                orig_std = original_df[col].std()
-                synth_std = synthetic_df[col].std()
-                
-                mean_diff = abs(orig_mean - synth_mean) / abs(orig_mean) * 100 if orig_mean != 0 else 0
-                std_diff = abs(orig_std - synth_std) / abs(orig_std) * 100 if orig_std != 0 else 0
-                
-                evaluation_results['basic_stats'][col] = {
-                    'original_mean': orig_mean,
-                    'synthetic_mean': synth_mean,
-                    'mean_diff_percent': mean_diff,
-                    'original_std': orig_std,
-                    'synthetic_std': synth_std,
-                    'std_diff_percent': std_diff
-                }
-        
-        # 计算总体质量分数
-        if evaluation_results['basic_stats']:
-            mean_diffs = [stats['mean_diff_percent'] for stats in evaluation_results['basic_stats'].values()]
-            std_diffs = [stats['std_diff_percent'] for stats in evaluation_results['basic_stats'].values()]
-            avg_mean_diff = np.mean(mean_diffs)
-            avg_std_diff = np.mean(std_diffs)
-            overall_score = max(0, 100 - (avg_mean_diff + avg_std_diff) / 2)
-            evaluation_results['overall_score'] = overall_score
+        with stage('evaluate'):
+            evaluation_results = compare_basic_stats(original_df, synthetic_df)
         
         # 保存评估结果
         session['evaluation_results'] = evaluation_results
@@ -370,7 +359,6 @@ def evaluate_data():
     except Exception as e:
         return jsonify({'success': False, 'message': f'评估失败: {str(e)}'})
 
-@app.route('/download/<filename>')
 def download_file(filename):
     """下载生成的文件"""
     try:
@@ -382,17 +370,14 @@ def download_file(filename):
     except Exception as e:
         return jsonify({'success': False, 'message': f'下载失败: {str(e)}'})
 
-@app.route('/results')
 def results():
     """结果展示页面"""
     return render_template('results.html')
 
-@app.route('/batch')
 def batch_processing():
     """批量处理页面"""
     return render_template('batch_processing.html')
 
-@app.route('/get_session_data/<session_id>')
 def get_session_data(session_id):
     """获取会话数据"""
     if session_id in session_data:
@@ -407,5 +392,61 @@ def get_session_data(session_id):
     else:
         return jsonify({'success': False, 'message': '会话不存在'})
 
+def register_routes(app):
+    """注册页面和接口路由（端点名即视图函数名）"""
+    app.add_url_rule('/', view_func=index)
+    app.add_url_rule('/data_source', view_func=data_source)
+    app.add_url_rule('/upload', view_func=upload_file, methods=['POST'])
+    app.add_url_rule('/demo_data', view_func=demo_data)
+    app.add_url_rule('/model_config', view_func=model_config)
+    app.add_url_rule('/get_model_config', view_func=get_model_config, methods=['POST'])
+    app.add_url_rule('/generate', view_func=generate_synthetic_data, methods=['POST'])
+    app.add_url_rule('/evaluate', view_func=evaluate_data, methods=['POST'])
+    app.add_url_rule('/download/<filename>', view_func=download_file)
+    app.add_url_rule('/results', view_func=results)
+    app.add_url_rule('/batch', view_func=batch_processing)
+    app.add_url_rule('/get_session_data/<session_id>', view_func=get_session_data)
+
+def create_app(config=None):
+    """
+    创建应用
+
+    重量级依赖（sdgx、scipy、数据库驱动）均在首次使用时导入，启动时只加载
+    Flask 和蓝图。各启动阶段耗时记录在 ``STARTUP_TIMINGS`` 配置中。
+    """
+    started = time.perf_counter()
+    timings = {}
+    
+    app = Flask(__name__)
+    app.secret_key = 'sdg_web_interface_secret_key_2025'
+    if config:
+        app.config.update(config)
+    
+    # 创建必要的文件夹
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(RESULTS_FOLDER, exist_ok=True)
+    
+    # 导入并注册蓝图
+    phase = time.perf_counter()
+    from api import api_bp
+    from auth_routes import auth_bp, login_required, role_required
+    timings['import_blueprints'] = round(time.perf_counter() - phase, 4)
+    
+    app.register_blueprint(api_bp)
+    app.register_blueprint(auth_bp)
+    register_routes(app)
+    
+    # 请求耗时、并发数、数据库查询数等指标，通过 /metrics 暴露
+    instrument_app(app)
+    # 按需采样分析（默认关闭，设置 PROFILER_ENABLED 后仅管理员可用）
+    register_profiler(app, login_required, role_required('admin'))
+    
+    timings['total'] = round(time.perf_counter() - started, 4)
+    app.config['STARTUP_TIMINGS'] = timings
+    logger.info(f"应用启动完成，耗时 {timings['total']:.3f}s（导入蓝图 {timings['import_blueprints']:.3f}s）")
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -130,21 +130,25 @@ def not_found(error):
 def internal_error(error):
     return render_template('500.html'), 500
 
-# 清理过期数据的定时任务（简化版）
-@app.before_request
-def cleanup_expired_data():
-    """清理过期数据"""
-    try:
-        # 每100个请求清理一次，避免频繁清理
-        if not hasattr(cleanup_expired_data, 'counter'):
-            cleanup_expired_data.counter = 0
-        
-        cleanup_expired_data.counter += 1
-        if cleanup_expired_data.counter % 100 == 0:
-            auth_db.cleanup_expired_data()
-    except Exception as e:
-        # 清理失败不影响主要功能
-        pass
+# 后台定时清理过期的会话、邮箱验证和密码重置记录
+auth_db.start_sweeper(interval=60)
+
+@app.route('/api/maintenance/sweeper')
+def api_sweeper_metrics():
+    """过期数据清理指标API（仅管理员）"""
+    # 与管理员页面相同，按数据库中的用户角色检查权限
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+    
+    user = auth_db.users.get_user_by_id(user_id)
+    if not user or user.role != 'admin':
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+    
+    return jsonify({
+        'success': True,
+        'metrics': auth_db.sweeper.metrics()
+    })
 
 if __name__ == '__main__':
     print("🚀 启动SDG Web界面认证系统...")
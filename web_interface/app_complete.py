@@ -7,22 +7,28 @@ SDG多账号控制系统 - 完整版
 集成前端和后端的完整应用
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, make_response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, make_response, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from flask_mail import Mail, Message
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_mail import Mail
+from werkzeug.http import is_resource_modified
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
 import json
 import secrets
-import string
-import io
-import base64
-from PIL import Image, ImageDraw, ImageFont
+import atexit
 
 # 导入演示数据服务
-from services.demo_data_service import DemoDataService
+from services.demo_data_service import DemoDataService, PREVIEW_SEED, PREVIEW_MAX_ROWS
+from services.demo_data_engine import demo_anchor
+from services.login_throttle import LoginThrottle
+from services.captcha_service import CaptchaService
+from password_hasher import password_hasher, HashingOverloaded
+from mail_queue import MailQueue, SMTPBackend, DebugBackend
+from metrics import instrument_app, instrument_sqlalchemy, request_elapsed
+from profiler import register_profiler
+from utils.decorators import admin_required
 
 # 创建Flask应用
 app = Flask(__name__)
@@ -53,59 +59,28 @@ db = SQLAlchemy(app)
 login_manager = LoginManager(app)
 mail = Mail(app)
 
-# 初始化演示数据服务
+# 请求指标（/metrics），数据库查询数按 SQLAlchemy 执行的语句统计
+instrument_app(app)
+instrument_sqlalchemy()
+# 按需采样分析（默认关闭，设置 PROFILER_ENABLED 后仅管理员可用）
+register_profiler(app, login_required, admin_required)
+
+# 异步发件队列：测试或禁止发信时使用调试后端
+if app.config.get('TESTING') or app.config.get('MAIL_SUPPRESS_SEND'):
+    mail_backend = DebugBackend()
+else:
+    mail_backend = SMTPBackend.from_flask_config(app.config)
+mail_queue = MailQueue(os.path.join(instance_dir, 'mail_queue.db'), mail_backend)
+mail_queue.start()
+
+# 初始化演示数据服务；大数据量流式生成时可使用多个进程
 demo_service = DemoDataService()
+demo_service.warm_previews()
+DEMO_GENERATION_WORKERS = int(os.environ.get('DEMO_GENERATION_WORKERS') or 1)
+atexit.register(demo_service.shutdown)
 
-# 图形验证码生成函数
-def generate_captcha():
-    """生成图形验证码"""
-    # 生成4位随机字符
-    captcha_text = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(4))
-    
-    # 创建图片
-    width, height = 120, 40
-    image = Image.new('RGB', (width, height), color='white')
-    draw = ImageDraw.Draw(image)
-    
-    # 绘制背景干扰线
-    import random
-    for _ in range(5):
-        x1 = random.randint(0, width)
-        y1 = random.randint(0, height)
-        x2 = random.randint(0, width)
-        y2 = random.randint(0, height)
-        draw.line([(x1, y1), (x2, y2)], fill='lightgray', width=1)
-    
-    # 绘制验证码文字
-    try:
-        # 尝试使用系统字体
-        font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 20)
-    except:
-        # 使用默认字体
-        font = ImageFont.load_default()
-    
-    # 计算文字位置
-    text_width = draw.textlength(captcha_text, font=font)
-    text_height = 20
-    x = (width - text_width) // 2
-    y = (height - text_height) // 2
-    
-    # 绘制文字
-    draw.text((x, y), captcha_text, fill='black', font=font)
-    
-    # 添加干扰点
-    for _ in range(50):
-        x = random.randint(0, width)
-        y = random.randint(0, height)
-        draw.point((x, y), fill='lightgray')
-    
-    # 转换为base64
-    buffer = io.BytesIO()
-    image.save(buffer, format='PNG')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode()
-    
-    return captcha_text, image_base64
+# 初始化图形验证码服务（预渲染池 + 内存存储）
+captcha_service = CaptchaService()
 
 # 配置登录管理器
 login_manager.login_view = 'login'
@@ -127,10 +102,14 @@ class User(UserMixin, db.Model):
     last_login = db.Column(db.DateTime)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """校验密码；哈希参数变化时顺带更新为新哈希（由调用方提交）"""
+        valid, new_hash = password_hasher.verify_and_update(password, self.password_hash)
+        if new_hash:
+            self.password_hash = new_hash
+        return valid
     
     def is_admin(self):
         """检查是否为管理员"""
@@ -251,33 +230,12 @@ class SystemConfig(db.Model):
             'description': self.description
         }
 
-class CaptchaSession(db.Model):
-    """图形验证码会话模型"""
-    __tablename__ = 'captcha_sessions'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.String(64), unique=True, nullable=False, index=True)
-    captcha_code = db.Column(db.String(10), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    expires_at = db.Column(db.DateTime, nullable=False)
-    used = db.Column(db.Boolean, default=False)
-    
-    def __init__(self, session_id, captcha_code):
-        self.session_id = session_id
-        self.captcha_code = captcha_code
-        self.expires_at = datetime.utcnow() + timedelta(minutes=5)  # 5分钟有效期
-    
-    def is_valid(self):
-        """检查验证码是否有效"""
-        return not self.used and datetime.utcnow() < self.expires_at
-    
-    def use(self):
-        """标记验证码为已使用"""
-        self.used = True
-
 class LoginAttempt(db.Model):
     """登录尝试记录模型"""
     __tablename__ = 'login_attempts'
+    __table_args__ = (
+        db.Index('ix_login_attempts_email_success_created', 'email', 'success', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(100), nullable=False, index=True)
@@ -317,6 +275,21 @@ class DataSource(db.Model):
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# 登录限流：失败次数在内存滑动窗口中统计，登录记录后台批量写库
+LOGIN_WINDOW_MINUTES = 15
+LOGIN_IP_CAPTCHA_THRESHOLD = 10
+
+def _save_login_attempts(batch):
+    """批量写入登录尝试记录"""
+    with app.app_context():
+        db.session.bulk_insert_mappings(LoginAttempt, batch)
+        db.session.commit()
+
+login_throttle = LoginThrottle(window_seconds=LOGIN_WINDOW_MINUTES * 60,
+                               writer=_save_login_attempts)
+login_throttle.start()
+atexit.register(login_throttle.stop, 5)
+
 # 基础路由
 @app.route('/')
 def index():
@@ -374,14 +347,10 @@ def login():
             return jsonify({'success': False, 'message': '邮箱和密码不能为空'}), 400
         
         # 检查登录失败次数
-        recent_attempts = LoginAttempt.query.filter(
-            LoginAttempt.email == email,
-            LoginAttempt.success == False,
-            LoginAttempt.created_at > datetime.utcnow() - timedelta(minutes=15)
-        ).count()
-        
-        # 如果失败次数大于等于1，需要验证码
-        if recent_attempts >= 1:
+        recent_failures = login_throttle.failure_count(email=email, ip_address=request.remote_addr)
+        
+        # 如果该邮箱失败次数大于等于1，或该IP失败次数过多，需要验证码
+        if recent_failures['email'] >= 1 or recent_failures['ip'] >= LOGIN_IP_CAPTCHA_THRESHOLD:
             if not captcha_session_id or not captcha_code:
                 return jsonify({
                     'success': False, 
@@ -389,40 +358,37 @@ def login():
                     'require_captcha': True
                 }), 400
             
-            # 验证图形验证码
-            captcha_session = CaptchaSession.query.filter_by(session_id=captcha_session_id).first()
-            if not captcha_session or not captcha_session.is_valid():
+            # 验证图形验证码（通过后标记为已使用）
+            captcha_status = captcha_service.verify(captcha_session_id, captcha_code)
+            if captcha_status in (CaptchaService.MISSING, CaptchaService.EXPIRED):
                 return jsonify({'success': False, 'message': '图形验证码已过期'}), 400
             
-            if captcha_session.captcha_code.upper() != captcha_code.upper():
+            if captcha_status == CaptchaService.MISMATCH:
                 return jsonify({'success': False, 'message': '图形验证码错误'}), 400
-            
-            # 标记验证码为已使用
-            captcha_session.use()
         
         # 查找用户
         user = User.query.filter_by(email=email).first()
         
         # 记录登录尝试
-        login_attempt = LoginAttempt(
-            email=email,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent', ''),
-            success=False
-        )
+        def record_attempt(success):
+            login_throttle.record(
+                email,
+                request.remote_addr,
+                success,
+                user_agent=request.headers.get('User-Agent', '')[:500],
+                created_at=datetime.utcnow()
+            )
         
         if user and user.check_password(password):
             if user.status == 'banned':
-                login_attempt.success = False
-                db.session.add(login_attempt)
+                record_attempt(False)
                 db.session.commit()
                 return jsonify({'success': False, 'message': '账号已被禁用'}), 401
             
             # 登录成功
             login_user(user)
             user.last_login = datetime.utcnow()
-            login_attempt.success = True
-            db.session.add(login_attempt)
+            record_attempt(True)
             db.session.commit()
             
             return jsonify({
@@ -432,10 +398,12 @@ def login():
             })
         else:
             # 登录失败
-            db.session.add(login_attempt)
+            record_attempt(False)
             db.session.commit()
             return jsonify({'success': False, 'message': '邮箱或密码错误'}), 401
     
+    except HashingOverloaded as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'message': '登录失败'}), 500
 
@@ -489,11 +457,11 @@ def register():
             return jsonify({'success': False, 'message': '邮箱验证码错误或已过期'}), 400
         
         # 验证图形验证码
-        captcha_session = CaptchaSession.query.filter_by(session_id=captcha_session_id).first()
-        if not captcha_session or not captcha_session.is_valid():
+        captcha_status = captcha_service.verify(captcha_session_id, captcha_code, consume=False)
+        if captcha_status in (CaptchaService.MISSING, CaptchaService.EXPIRED):
             return jsonify({'success': False, 'message': '图形验证码已过期'}), 400
         
-        if captcha_session.captcha_code.upper() != captcha_code.upper():
+        if captcha_status == CaptchaService.MISMATCH:
             return jsonify({'success': False, 'message': '图形验证码错误'}), 400
         
         # 检查用户名是否已存在
@@ -521,8 +489,10 @@ def register():
         if invite_required and invite_code:
             invite.use(user.id)
         
-        # 标记图形验证码为已使用
-        captcha_session.use()
+        # 标记图形验证码为已使用（并发提交同一验证码时只有一次能成功）
+        if captcha_service.verify(captcha_session_id, captcha_code) != CaptchaService.OK:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': '图形验证码已过期'}), 400
         
         # 删除邮箱验证码记录
         db.session.delete(email_verification)
@@ -673,6 +643,21 @@ def admin_stats():
         return jsonify({'success': False, 'message': '获取失败'}), 500
 
 # 演示数据API
+# 一次性返回 JSON 的最大行数，更大的数据量需使用 ndjson/csv 流式格式
+DEMO_JSON_MAX_ROWS = 100000
+DEMO_STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+def stream_demo_chunks(chunks, output_format):
+    """将数据块逐块编码为 NDJSON 或 CSV 文本"""
+    header = True
+    for chunk in chunks:
+        if output_format == 'csv':
+            yield chunk.to_csv(index=False, header=header, date_format='%Y-%m-%d %H:%M:%S')
+            header = False
+        elif len(chunk):
+            text = chunk.to_json(orient='records', lines=True, date_format='iso', force_ascii=False)
+            yield text if text.endswith('\n') else text + '\n'
+
 @app.route('/api/demo/industries')
 @login_required
 def api_demo_industries():
@@ -689,16 +674,27 @@ def api_demo_industries():
             'message': f'获取行业列表失败: {str(e)}'
         }), 500
 
+def cached_json_response(entry, **payload):
+    """返回带 ETag/Last-Modified 的 JSON 响应，客户端缓存未变化时返回 304（不序列化响应体）"""
+    if is_resource_modified(request.environ, etag=entry.etag, last_modified=entry.last_modified):
+        response = jsonify(payload)
+    else:
+        response = Response(status=304)
+    response.set_etag(entry.etag)
+    response.last_modified = entry.last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 @app.route('/api/demo/datasets/<industry_id>')
 @login_required
 def api_demo_datasets(industry_id):
     """获取指定行业的演示数据集列表"""
     try:
-        datasets = demo_service.get_demo_datasets(industry_id)
-        return jsonify({
-            'success': True,
-            'datasets': datasets
-        })
+        if industry_id not in demo_service.demo_configs:
+            return jsonify({'success': True, 'datasets': []})
+        entry = demo_service.get_demo_datasets_entry(industry_id)
+        return cached_json_response(entry, success=True, datasets=entry.data)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -711,11 +707,30 @@ def api_demo_data(industry_id, dataset_id):
     """获取演示数据样本"""
     try:
         sample_size = request.args.get('sample_size', 10, type=int)
-        sample_data = demo_service.get_data_sample(industry_id, dataset_id, sample_size)
-        return jsonify({
-            'success': True,
-            'data': sample_data
-        })
+        seed = request.args.get('seed', PREVIEW_SEED, type=int)
+        
+        if not 1 <= sample_size <= PREVIEW_MAX_ROWS:
+            return jsonify({
+                'success': False,
+                'message': f'sample_size 必须在 1 到 {PREVIEW_MAX_ROWS} 之间'
+            }), 400
+        
+        if seed < 0:
+            return jsonify({
+                'success': False,
+                'message': 'seed 必须是非负整数'
+            }), 400
+        
+        try:
+            anchor = demo_anchor(request.args.get('anchor'))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'anchor 必须是 ISO 8601 格式的日期或时间'
+            }), 400
+        
+        entry = demo_service.get_data_sample_entry(industry_id, dataset_id, sample_size, seed, anchor)
+        return cached_json_response(entry, success=True, data=entry.data)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -731,6 +746,8 @@ def api_demo_generate():
         industry_id = data.get('industry_id')
         dataset_id = data.get('dataset_id')
         size = data.get('size', 1000)
+        seed = data.get('seed')
+        output_format = data.get('format', 'json')
         
         if not industry_id or not dataset_id:
             return jsonify({
@@ -738,15 +755,61 @@ def api_demo_generate():
                 'message': '缺少必要参数'
             }), 400
         
+        if seed is None:
+            seed = secrets.randbits(63)
+        elif not isinstance(seed, int) or isinstance(seed, bool) or seed < 0:
+            return jsonify({
+                'success': False,
+                'message': 'seed 必须是非负整数'
+            }), 400
+        
+        # 时间列的基准时间随 seed 一起返回，两者相同即可复现同一份数据
+        anchor = data.get('anchor')
+        try:
+            if anchor is not None and not isinstance(anchor, str):
+                raise ValueError(anchor)
+            anchor = demo_anchor(anchor)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'anchor 必须是 ISO 8601 格式的日期或时间'
+            }), 400
+
+        if output_format in DEMO_STREAM_FORMATS:
+            # 流式输出：逐块生成、逐块编码，内存占用与总行数无关
+            chunks = demo_service.iter_demo_data(industry_id, dataset_id, size, seed,
+                                                 workers=DEMO_GENERATION_WORKERS, anchor=anchor)
+            response = Response(stream_with_context(stream_demo_chunks(chunks, output_format)),
+                                mimetype=DEMO_STREAM_FORMATS[output_format])
+            response.headers['X-Demo-Seed'] = str(seed)
+            response.headers['X-Demo-Anchor'] = str(anchor)
+            response.headers['Content-Disposition'] = \
+                f'attachment; filename={industry_id}_{dataset_id}.{output_format}'
+            return response
+        
+        if output_format != 'json':
+            return jsonify({
+                'success': False,
+                'message': f'不支持的输出格式: {output_format}'
+            }), 400
+        
+        if size and size > DEMO_JSON_MAX_ROWS:
+            return jsonify({
+                'success': False,
+                'message': f'JSON格式最多返回{DEMO_JSON_MAX_ROWS}条数据，请使用 ndjson 或 csv 格式'
+            }), 400
+        
         # 生成演示数据
-        df = demo_service.generate_demo_data(industry_id, dataset_id, size)
+        df = demo_service.generate_demo_data(industry_id, dataset_id, size, seed, anchor=anchor)
         
         # 转换为JSON格式
         result_data = {
             'columns': df.columns.tolist(),
             'types': df.dtypes.astype(str).to_dict(),
             'data': df.to_dict('records'),
-            'total_rows': len(df)
+            'total_rows': len(df),
+            'seed': seed,
+            'anchor': str(anchor)
         }
         
         return jsonify({
@@ -803,17 +866,14 @@ def send_verification_code():
         # 发送邮件（测试模式：打印验证码到控制台）
         print(f"📧 邮箱验证码已生成: {email} -> {verification.code}")
         
-        try:
-            msg = Message(
-                subject='SDG系统邮箱验证码',
-                recipients=[email],
-                body=f'您的验证码是: {verification.code}\n\n验证码有效期为10分钟，请及时使用。\n\nSDG多账号控制系统'
-            )
-            mail.send(msg)
-            print(f"✅ 邮件发送成功: {email}")
-        except Exception as e:
-            print(f"⚠️  邮件发送失败: {str(e)}")
-            print(f"📋 测试模式：验证码为 {verification.code}")
+        # 加入发送队列失败时由外层返回错误，不提示发送成功
+        msg = EmailMessage()
+        msg['Subject'] = 'SDG系统邮箱验证码'
+        msg['From'] = app.config['MAIL_DEFAULT_SENDER']
+        msg['To'] = email
+        msg.set_content(f'您的验证码是: {verification.code}\n\n验证码有效期为10分钟，请及时使用。\n\nSDG多账号控制系统', cte='base64')
+        mail_queue.enqueue(msg)
+        print(f"✅ 邮件已加入发送队列: {email}")
         
         return jsonify({
             'success': True,
@@ -1020,7 +1080,7 @@ def generate_synthetic_data():
                 'data_amount': data_amount,
                 'similarity': similarity
             },
-            'processing_time': 2.5
+            'processing_time': request_elapsed()
         }
         
         return jsonify({
@@ -1118,7 +1178,7 @@ def generate_synthetic_from_demo():
                 'synthetic_amount': synthetic_amount,
                 'similarity': similarity
             },
-            'processing_time': 1.5
+            'processing_time': request_elapsed()
         }
         
         return jsonify({
@@ -1142,8 +1202,23 @@ def create_app():
         with app.app_context():
             print("🔧 创建数据库表...")
             db.create_all()
+            # 已存在的表不会被 create_all 补建索引
+            for index in LoginAttempt.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
             print("✅ 数据库表创建成功")
             
+            # 从近期失败记录预热登录限流窗口
+            since = datetime.utcnow() - timedelta(minutes=LOGIN_WINDOW_MINUTES)
+            recent_failures = LoginAttempt.query.filter(
+                LoginAttempt.success == False,
+                LoginAttempt.created_at > since
+            ).order_by(LoginAttempt.created_at).all()
+            login_throttle.load_failures({
+                'email': attempt.email,
+                'ip_address': attempt.ip_address,
+                'timestamp': attempt.created_at.replace(tzinfo=timezone.utc).timestamp()
+            } for attempt in recent_failures)
+            
             # 创建测试数据
             create_test_data()
             
@@ -1496,25 +1571,29 @@ def register_with_invite():
 def generate_captcha_api():
     """生成图形验证码"""
     try:
-        # 生成验证码
-        captcha_text, image_base64 = generate_captcha()
-        
-        # 生成会话ID
-        session_id = secrets.token_urlsafe(32)
-        
-        # 保存验证码到数据库
-        captcha_session = CaptchaSession(session_id=session_id, captcha_code=captcha_text)
-        db.session.add(captcha_session)
-        db.session.commit()
+        # 从预渲染池签发验证码，图片通过单独的接口以 PNG 返回
+        session_id = captcha_service.issue()
         
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'image': f'data:image/png;base64,{image_base64}'
+            'image': url_for('captcha_image_api', session_id=session_id)
         })
     except Exception as e:
         return jsonify({'success': False, 'message': f'生成验证码失败: {str(e)}'}), 500
 
+@app.route('/api/captcha/image/<session_id>', methods=['GET'])
+def captcha_image_api(session_id):
+    """获取图形验证码图片"""
+    png = captcha_service.get_image(session_id)
+    if png is None:
+        return jsonify({'success': False, 'message': '验证码已过期'}), 404
+    
+    response = make_response(png)
+    response.headers['Content-Type'] = 'image/png'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @app.route('/api/captcha/verify', methods=['POST'])
 def verify_captcha_api():
     """验证图形验证码"""
@@ -1526,19 +1605,16 @@ def verify_captcha_api():
         if not session_id or not captcha_code:
             return jsonify({'success': False, 'message': '参数不完整'}), 400
         
-        # 查找验证码会话
-        captcha_session = CaptchaSession.query.filter_by(session_id=session_id).first()
+        # 验证验证码
+        captcha_status = captcha_service.verify(session_id, captcha_code)
         
-        if not captcha_session:
+        if captcha_status == CaptchaService.MISSING:
             return jsonify({'success': False, 'message': '验证码会话不存在'}), 404
         
-        if not captcha_session.is_valid():
+        if captcha_status == CaptchaService.EXPIRED:
             return jsonify({'success': False, 'message': '验证码已过期'}), 400
         
-        # 验证验证码
-        if captcha_session.captcha_code.upper() == captcha_code.upper():
-            captcha_session.use()
-            db.session.commit()
+        if captcha_status == CaptchaService.OK:
             return jsonify({'success': True, 'message': '验证码正确'})
         else:
             return jsonify({'success': False, 'message': '验证码错误'}), 400
@@ -22,13 +22,14 @@ import sys
 sdg_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'synthetic-data-generator')
 sys.path.append(sdg_path)
 
-# 添加utils目录到Python路径
-utils_path = os.path.join(os.path.dirname(__file__), 'utils')
-sys.path.append(utils_path)
-from database_connector import DatabaseConnector
+# 数据库连接器依赖 utils 包内的方言插件，需按包导入
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils.database_connector import DatabaseConnector, MAX_PARTITIONS, connection_config
+from metrics import instrument_app
 
 app = Flask(__name__)
 app.secret_key = 'sdg_web_interface_secret_key_2025'
+instrument_app(app)
 
 # 配置
 UPLOAD_FOLDER = 'uploads'
@@ -635,6 +636,95 @@ def get_table_data():
             'error': f'获取表数据失败: {str(e)}'
         }), 500
 
+@app.route('/api/datasource/extract', methods=['POST'])
+def extract_table_data():
+    """将表数据批量抽取到列式缓存"""
+    try:
+        data = request.get_json()
+        
+        # 验证必需参数
+        required_fields = ['type', 'database', 'table_name']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({
+                    'success': False,
+                    'error': f'缺少必需参数: {field}'
+                }), 400
+        
+        # 抽取表数据（可选按数值列分区并行读取）
+        partitions = max(1, min(int(data.get('partitions', 1)), MAX_PARTITIONS))
+        result = db_connector.extract_to_cache(
+            connection_config(data), data['table_name'],
+            refresh=bool(data.get('refresh', False)),
+            batch_size=data.get('batch_size'),
+            partition_on=data.get('partition_on'),
+            partitions=partitions,
+            limit=data.get('limit')
+        )
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        print(f"抽取表数据错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'抽取表数据失败: {str(e)}'
+        }), 500
+
+@app.route('/api/datasource/load', methods=['POST'])
+def load_extracted_data():
+    """读取已抽取到列式缓存的表数据，创建会话供生成、评估和下载使用"""
+    try:
+        data = request.get_json()
+
+        # 验证必需参数
+        required_fields = ['type', 'database', 'table_name']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({
+                    'success': False,
+                    'error': f'缺少必需参数: {field}'
+                }), 400
+
+        try:
+            df = db_connector.read_cached(
+                connection_config(data), data['table_name'],
+                limit=data.get('limit'), columns=data.get('columns')
+            )
+        except PermissionError as e:
+            return jsonify({'success': False, 'error': str(e)}), 403
+
+        if df is None:
+            return jsonify({
+                'success': False,
+                'error': '表数据尚未抽取，请先调用 /api/datasource/extract'
+            }), 404
+
+        # 与上传文件相同的会话结构
+        data_info = get_data_info(df)
+        session_id = str(uuid.uuid4())
+        session_data[session_id] = {
+            'file_path': f"datasource:{data['table_name']}",
+            'filename': f"{secure_filename(data['table_name']) or 'table'}.csv",
+            'data_info': data_info,
+            'dataframe': df,
+            'created_at': datetime.now()
+        }
+
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'data_info': dict(data_info, dtypes={col: str(dtype) for col, dtype in data_info['dtypes'].items()}),
+            'message': '表数据加载成功'
+        })
+
+    except Exception as e:
+        print(f"加载表数据错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'加载表数据失败: {str(e)}'
+        }), 500
+
 if __name__ == '__main__':
     print("🚀 启动SDG Web界面简化版...")
     print("📱 访问地址: http://localhost:5000")
@@ -15,6 +15,7 @@ from typing import Dict, Any
 from models import User, UserSession, EmailVerification, PasswordReset, PasswordUtils, TokenUtils
 from database import auth_db
 from email_service import email_service
+from password_hasher import HashingOverloaded
 
 # 创建认证蓝图
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -157,9 +158,12 @@ def login():
         if not user:
             return jsonify({'success': False, 'message': '用户不存在'})
         
-        # 验证密码
-        if not PasswordUtils.verify_password(password, user.password_hash):
+        # 验证密码（参数变化时顺带重新哈希，随后与登录时间一起保存）
+        password_valid, new_password_hash = PasswordUtils.verify_and_update(password, user.password_hash)
+        if not password_valid:
             return jsonify({'success': False, 'message': '密码错误'})
+        if new_password_hash:
+            user.password_hash = new_password_hash
         
         # 检查邮箱是否已验证
         if not user.is_verified:
@@ -201,6 +205,8 @@ def login():
             }
         })
         
+    except HashingOverloaded as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'message': f'登录失败: {str(e)}'})
 
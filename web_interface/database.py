@@ -9,12 +9,14 @@
 
 import os
 import json
+import time
 import threading
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from pathlib import Path
 
 from models import User, UserSession, EmailVerification, PasswordReset
+from log_store import LogStore, open_store
 
 class FileDatabase:
     """基于文件的简单数据库"""
@@ -29,9 +31,6 @@ class FileDatabase:
         self.verifications_file = self.data_dir / "email_verifications.json"
         self.password_resets_file = self.data_dir / "password_resets.json"
         
-        # 线程锁
-        self.lock = threading.Lock()
-        
         # 初始化数据文件
         self._init_data_files()
     
@@ -49,47 +48,39 @@ class FileDatabase:
                 with open(file_path, 'w', encoding='utf-8') as f:
                     json.dump({}, f, ensure_ascii=False, indent=2)
     
-    def _read_json(self, file_path: Path) -> Dict[str, Any]:
-        """读取JSON文件"""
-        with self.lock:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                return {}
-    
-    def _write_json(self, file_path: Path, data: Dict[str, Any]):
-        """写入JSON文件"""
-        with self.lock:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    def _store(self, file_path: Path) -> LogStore:
+        """获取数据文件对应的存储（每个文件独立加锁）"""
+        return open_store(file_path)
 
 class UserDatabase(FileDatabase):
     """用户数据库管理"""
     
+    def __init__(self, data_dir: str = "data"):
+        super().__init__(data_dir)
+        self.store = self._store(self.users_file)
+        self.store.add_index('username', lambda record: record.get('username'))
+        self.store.add_index('user_id', lambda record: record.get('user_id'))
+    
     def create_user(self, user: User) -> bool:
         """创建用户"""
-        users = self._read_json(self.users_file)
-        
-        # 检查邮箱是否已存在
-        if user.email in users:
-            return False
-        
-        # 检查用户名是否已存在
-        for existing_user in users.values():
-            if existing_user['username'] == user.username:
+        # 在跨进程锁内完成唯一性检查和写入，避免多个进程同时注册同一邮箱或用户名
+        with self.store.process_lock():
+            # 检查邮箱是否已存在
+            if self.store.contains(user.email):
                 return False
-        
-        users[user.email] = user.to_dict()
-        users[user.email]['password_hash'] = user.password_hash
-        
-        self._write_json(self.users_file, users)
+            
+            # 检查用户名是否已存在
+            if self.store.find_keys('username', user.username):
+                return False
+            
+            user_dict = user.to_dict()
+            user_dict['password_hash'] = user.password_hash
+            self.store.set(user.email, user_dict)
         return True
     
     def get_user_by_email(self, email: str) -> Optional[User]:
         """通过邮箱获取用户"""
-        users = self._read_json(self.users_file)
-        user_data = users.get(email.lower().strip())
+        user_data = self.store.get(email.lower().strip())
         
         if user_data:
             return User.from_dict(user_data)
@@ -97,53 +88,40 @@ class UserDatabase(FileDatabase):
     
     def get_user_by_username(self, username: str) -> Optional[User]:
         """通过用户名获取用户"""
-        users = self._read_json(self.users_file)
+        user_data = self.store.find_one('username', username)
         
-        for user_data in users.values():
-            if user_data['username'] == username:
-                return User.from_dict(user_data)
+        if user_data:
+            return User.from_dict(user_data)
         return None
     
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """通过用户ID获取用户"""
-        users = self._read_json(self.users_file)
+        user_data = self.store.find_one('user_id', user_id)
         
-        for user_data in users.values():
-            if user_data['user_id'] == user_id:
-                return User.from_dict(user_data)
+        if user_data:
+            return User.from_dict(user_data)
         return None
     
     def update_user(self, user: User) -> bool:
         """更新用户信息"""
-        users = self._read_json(self.users_file)
-        
-        if user.email not in users:
-            return False
-        
-        user_dict = user.to_dict()
-        user_dict['password_hash'] = user.password_hash
-        users[user.email] = user_dict
-        
-        self._write_json(self.users_file, users)
+        with self.store.lock:
+            if not self.store.contains(user.email):
+                return False
+            
+            user_dict = user.to_dict()
+            user_dict['password_hash'] = user.password_hash
+            self.store.set(user.email, user_dict)
         return True
     
     def delete_user(self, email: str) -> bool:
         """删除用户"""
-        users = self._read_json(self.users_file)
-        
-        if email.lower().strip() not in users:
-            return False
-        
-        del users[email.lower().strip()]
-        self._write_json(self.users_file, users)
-        return True
+        return self.store.delete(email.lower().strip())
     
     def list_users(self, role: Optional[str] = None) -> List[User]:
         """列出用户"""
-        users = self._read_json(self.users_file)
         user_list = []
         
-        for user_data in users.values():
+        for user_data in self.store.values():
             if role is None or user_data.get('role') == role:
                 user_list.append(User.from_dict(user_data))
         
@@ -152,18 +130,20 @@ class UserDatabase(FileDatabase):
 class SessionDatabase(FileDatabase):
     """会话数据库管理"""
     
+    def __init__(self, data_dir: str = "data"):
+        super().__init__(data_dir)
+        self.store = self._store(self.sessions_file)
+        self.store.add_expiry_index('expires_at')
+        self.store.add_index('user_id', lambda record: record.get('user_id'))
+    
     def create_session(self, session: UserSession) -> bool:
         """创建会话"""
-        sessions = self._read_json(self.sessions_file)
-        
-        sessions[session.session_token] = session.to_dict()
-        self._write_json(self.sessions_file, sessions)
+        self.store.set(session.session_token, session.to_dict())
         return True
     
     def get_session(self, session_token: str) -> Optional[UserSession]:
         """获取会话"""
-        sessions = self._read_json(self.sessions_file)
-        session_data = sessions.get(session_token)
+        session_data = self.store.get(session_token)
         
         if session_data:
             session = UserSession.from_dict(session_data)
@@ -175,76 +155,48 @@ class SessionDatabase(FileDatabase):
     
     def update_session(self, session: UserSession) -> bool:
         """更新会话"""
-        sessions = self._read_json(self.sessions_file)
-        
-        if session.session_token not in sessions:
-            return False
-        
-        sessions[session.session_token] = session.to_dict()
-        self._write_json(self.sessions_file, sessions)
+        with self.store.lock:
+            if not self.store.contains(session.session_token):
+                return False
+            
+            self.store.set(session.session_token, session.to_dict())
         return True
     
     def delete_session(self, session_token: str) -> bool:
         """删除会话"""
-        sessions = self._read_json(self.sessions_file)
-        
-        if session_token not in sessions:
-            return False
-        
-        del sessions[session_token]
-        self._write_json(self.sessions_file, sessions)
-        return True
+        return self.store.delete(session_token)
     
     def delete_user_sessions(self, user_id: str) -> int:
         """删除用户的所有会话"""
-        sessions = self._read_json(self.sessions_file)
         deleted_count = 0
         
-        tokens_to_delete = []
-        for token, session_data in sessions.items():
-            if session_data['user_id'] == user_id:
-                tokens_to_delete.append(token)
-        
-        for token in tokens_to_delete:
-            del sessions[token]
-            deleted_count += 1
+        with self.store.lock:
+            for token in self.store.find_keys('user_id', user_id):
+                if self.store.delete(token):
+                    deleted_count += 1
         
-        self._write_json(self.sessions_file, sessions)
         return deleted_count
     
     def cleanup_expired_sessions(self) -> int:
         """清理过期会话"""
-        sessions = self._read_json(self.sessions_file)
-        expired_tokens = []
-        
-        for token, session_data in sessions.items():
-            expires_at = datetime.fromisoformat(session_data['expires_at'])
-            if datetime.now() > expires_at:
-                expired_tokens.append(token)
-        
-        for token in expired_tokens:
-            del sessions[token]
-        
-        if expired_tokens:
-            self._write_json(self.sessions_file, sessions)
-        
-        return len(expired_tokens)
+        return _cleanup_expired(self.store)
 
 class VerificationDatabase(FileDatabase):
     """邮箱验证数据库管理"""
     
+    def __init__(self, data_dir: str = "data"):
+        super().__init__(data_dir)
+        self.store = self._store(self.verifications_file)
+        self.store.add_expiry_index('expires_at')
+    
     def create_verification(self, verification: EmailVerification) -> bool:
         """创建邮箱验证"""
-        verifications = self._read_json(self.verifications_file)
-        
-        verifications[verification.token] = verification.to_dict()
-        self._write_json(self.verifications_file, verifications)
+        self.store.set(verification.token, verification.to_dict())
         return True
     
     def get_verification(self, token: str) -> Optional[EmailVerification]:
         """获取邮箱验证"""
-        verifications = self._read_json(self.verifications_file)
-        verification_data = verifications.get(token)
+        verification_data = self.store.get(token)
         
         if verification_data:
             verification = EmailVerification.from_dict(verification_data)
@@ -256,59 +208,32 @@ class VerificationDatabase(FileDatabase):
     
     def mark_verification_used(self, token: str) -> bool:
         """标记验证为已使用"""
-        verifications = self._read_json(self.verifications_file)
-        
-        if token not in verifications:
-            return False
-        
-        verifications[token]['is_used'] = True
-        self._write_json(self.verifications_file, verifications)
-        return True
+        return _mark_used(self.store, token)
     
     def delete_verification(self, token: str) -> bool:
         """删除验证"""
-        verifications = self._read_json(self.verifications_file)
-        
-        if token not in verifications:
-            return False
-        
-        del verifications[token]
-        self._write_json(self.verifications_file, verifications)
-        return True
+        return self.store.delete(token)
     
     def cleanup_expired_verifications(self) -> int:
         """清理过期验证"""
-        verifications = self._read_json(self.verifications_file)
-        expired_tokens = []
-        
-        for token, verification_data in verifications.items():
-            expires_at = datetime.fromisoformat(verification_data['expires_at'])
-            if datetime.now() > expires_at:
-                expired_tokens.append(token)
-        
-        for token in expired_tokens:
-            del verifications[token]
-        
-        if expired_tokens:
-            self._write_json(self.verifications_file, verifications)
-        
-        return len(expired_tokens)
+        return _cleanup_expired(self.store)
 
 class PasswordResetDatabase(FileDatabase):
     """密码重置数据库管理"""
     
+    def __init__(self, data_dir: str = "data"):
+        super().__init__(data_dir)
+        self.store = self._store(self.password_resets_file)
+        self.store.add_expiry_index('expires_at')
+    
     def create_reset(self, reset: PasswordReset) -> bool:
         """创建密码重置"""
-        resets = self._read_json(self.password_resets_file)
-        
-        resets[reset.token] = reset.to_dict()
-        self._write_json(self.password_resets_file, resets)
+        self.store.set(reset.token, reset.to_dict())
         return True
     
     def get_reset(self, token: str) -> Optional[PasswordReset]:
         """获取密码重置"""
-        resets = self._read_json(self.password_resets_file)
-        reset_data = resets.get(token)
+        reset_data = self.store.get(token)
         
         if reset_data:
             reset = PasswordReset.from_dict(reset_data)
@@ -320,43 +245,118 @@ class PasswordResetDatabase(FileDatabase):
     
     def mark_reset_used(self, token: str) -> bool:
         """标记重置为已使用"""
-        resets = self._read_json(self.password_resets_file)
-        
-        if token not in resets:
-            return False
-        
-        resets[token]['is_used'] = True
-        self._write_json(self.password_resets_file, resets)
-        return True
+        return _mark_used(self.store, token)
     
     def delete_reset(self, token: str) -> bool:
         """删除重置"""
-        resets = self._read_json(self.password_resets_file)
-        
-        if token not in resets:
-            return False
-        
-        del resets[token]
-        self._write_json(self.password_resets_file, resets)
-        return True
+        return self.store.delete(token)
     
     def cleanup_expired_resets(self) -> int:
         """清理过期重置"""
-        resets = self._read_json(self.password_resets_file)
-        expired_tokens = []
-        
-        for token, reset_data in resets.items():
-            expires_at = datetime.fromisoformat(reset_data['expires_at'])
-            if datetime.now() > expires_at:
-                expired_tokens.append(token)
-        
-        for token in expired_tokens:
-            del resets[token]
-        
-        if expired_tokens:
-            self._write_json(self.password_resets_file, resets)
+        return _cleanup_expired(self.store)
+
+def _mark_used(store: LogStore, token: str) -> bool:
+    """将令牌记录标记为已使用"""
+    with store.lock:
+        record = store.get(token)
+        if record is None:
+            return False
         
-        return len(expired_tokens)
+        record = dict(record)
+        record['is_used'] = True
+        store.set(token, record)
+    return True
+
+def _cleanup_expired(store: LogStore) -> int:
+    """通过过期索引删除已到期的记录"""
+    expired_count = 0
+    
+    with store.lock:
+        for token in store.pop_expired():
+            if store.delete(token):
+                expired_count += 1
+    
+    return expired_count
+
+class ExpirySweeper:
+    """后台过期数据清理线程"""
+    
+    def __init__(self, auth_db: 'AuthDatabase', interval: float = 60.0):
+        self.auth_db = auth_db
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'runs': 0,
+            'errors': 0,
+            'removed_total': 0,
+            'removed': {
+                'expired_sessions': 0,
+                'expired_verifications': 0,
+                'expired_resets': 0
+            },
+            'last_run_at': None,
+            'last_duration_ms': 0.0,
+            'last_error': None
+        }
+    
+    def start(self):
+        """启动清理线程（重复调用无副作用）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='expiry-sweeper', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None):
+        """停止清理线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+    
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+    
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sweep()
+    
+    def sweep(self) -> Dict[str, int]:
+        """执行一次清理并记录指标"""
+        started = time.perf_counter()
+        try:
+            result = self.auth_db.cleanup_expired_data()
+        except Exception as e:
+            with self._metrics_lock:
+                self._metrics['errors'] += 1
+                self._metrics['last_error'] = str(e)
+            return {}
+        
+        duration_ms = (time.perf_counter() - started) * 1000
+        with self._metrics_lock:
+            self._metrics['runs'] += 1
+            self._metrics['last_run_at'] = datetime.now().isoformat()
+            self._metrics['last_duration_ms'] = round(duration_ms, 3)
+            for name, count in result.items():
+                self._metrics['removed'][name] += count
+                self._metrics['removed_total'] += count
+        return result
+    
+    def metrics(self) -> Dict[str, Any]:
+        """返回清理指标"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            metrics['removed'] = dict(self._metrics['removed'])
+        
+        metrics['running'] = self.is_running()
+        metrics['interval_seconds'] = self.interval
+        metrics['pending'] = {
+            'sessions': self.auth_db.sessions.store.expiry_size(),
+            'verifications': self.auth_db.verifications.store.expiry_size(),
+            'resets': self.auth_db.password_resets.store.expiry_size()
+        }
+        return metrics
 
 class AuthDatabase:
     """认证数据库管理器"""
@@ -366,6 +366,13 @@ class AuthDatabase:
         self.sessions = SessionDatabase(data_dir)
         self.verifications = VerificationDatabase(data_dir)
         self.password_resets = PasswordResetDatabase(data_dir)
+        self.sweeper = ExpirySweeper(self)
+    
+    def start_sweeper(self, interval: Optional[float] = None):
+        """启动后台过期数据清理"""
+        if interval is not None:
+            self.sweeper.interval = interval
+        self.sweeper.start()
     
     def cleanup_expired_data(self) -> Dict[str, int]:
         """清理过期数据"""
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+邮件模板引擎
+============
+
+每个邮件模板只编译一次：
+
+- 模板中的应用名等静态字段在编译时直接替换，剩余的 ``${field}`` 占位符
+  拆分为 静态片段 + 字段名 列表，渲染时只做一次拼接
+- 邮件头、multipart 分隔符和各部分的头部预先编码为字节，渲染时只填入
+  收件人和正文（base64 编码）
+
+``TemplateEngine.render_bulk`` 可一次渲染大量收件人的邮件，供批量发送使用。
+"""
+
+import base64
+import html
+import re
+import secrets
+import threading
+from email.header import Header
+from email.utils import formataddr
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+_FIELD_PATTERN = re.compile(r'\$\{(\w+)\}')
+CRLF = b'\r\n'
+
+
+class CompiledTemplate:
+    """编译后的文本模板"""
+
+    def __init__(self, source: str, static_fields: Optional[Dict[str, str]] = None,
+                 escape: bool = False):
+        self.escape = escape
+        static_fields = static_fields or {}
+
+        # 先替换静态字段，再拆分为 [文本, 字段, 文本, 字段, ..., 文本]
+        def substitute_static(match):
+            name = match.group(1)
+            if name in static_fields:
+                value = static_fields[name]
+                return html.escape(value) if escape else value
+            return match.group(0)
+
+        parts = _FIELD_PATTERN.split(_FIELD_PATTERN.sub(substitute_static, source))
+        self._literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    def render(self, fields: Dict[str, Any]) -> str:
+        """填充字段并返回渲染结果"""
+        literals = self._literals
+        chunks = [literals[0]]
+        for i, name in enumerate(self.fields):
+            value = str(fields[name])
+            chunks.append(html.escape(value) if self.escape else value)
+            chunks.append(literals[i + 1])
+        return ''.join(chunks)
+
+
+def _encode_address(address: str) -> bytes:
+    """编码收件人地址：域名按 IDNA 转换，本地部分仍含非 ASCII 字符时按 RFC 2047 编码"""
+    local, _, domain = address.rpartition('@')
+    if local:
+        try:
+            address = local + '@' + domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            pass
+    try:
+        return formataddr(('', address)).encode('ascii')
+    except UnicodeEncodeError:
+        return Header(address, 'utf-8').encode(linesep='\r\n').encode('ascii')
+
+
+def _encode_body(text: str) -> bytes:
+    """按 MIMEText(..., 'utf-8') 的方式 base64 编码正文"""
+    return base64.encodebytes(text.encode('utf-8')).replace(b'\n', CRLF)
+
+
+class EmailTemplate:
+    """带有预编码 MIME 结构的邮件模板"""
+
+    def __init__(self, subject: str, text: str, html_source: str,
+                 from_name: str, from_email: str,
+                 static_fields: Optional[Dict[str, str]] = None):
+        static_fields = static_fields or {}
+        self.subject = CompiledTemplate(subject, static_fields).render({})
+        self.text = CompiledTemplate(text, static_fields)
+        self.html = CompiledTemplate(html_source, static_fields, escape=True)
+
+        boundary = ('=' * 15 + secrets.token_hex(12) + '==').encode('ascii')
+        part_head = (
+            b'MIME-Version: 1.0' + CRLF +
+            b'Content-Transfer-Encoding: base64' + CRLF + CRLF
+        )
+
+        # 预编码的静态部分
+        self._head = CRLF.join([
+            b'Content-Type: multipart/alternative; boundary="' + boundary + b'"',
+            b'MIME-Version: 1.0',
+            b'Subject: ' + Header(self.subject, 'utf-8').encode(linesep='\r\n').encode('ascii'),
+            b'From: ' + formataddr((from_name, from_email)).encode('ascii'),
+            b'To: '
+        ])
+        self._text_head = (
+            CRLF + CRLF + b'--' + boundary + CRLF +
+            b'Content-Type: text/plain; charset="utf-8"' + CRLF + part_head
+        )
+        self._html_head = (
+            b'--' + boundary + CRLF +
+            b'Content-Type: text/html; charset="utf-8"' + CRLF + part_head
+        )
+        self._tail = b'--' + boundary + b'--' + CRLF
+
+    def render(self, to_email: str, fields: Dict[str, Any]) -> bytes:
+        """渲染一封邮件的原始字节"""
+        return b''.join([
+            self._head,
+            _encode_address(to_email),
+            self._text_head,
+            _encode_body(self.text.render(fields)),
+            self._html_head,
+            _encode_body(self.html.render(fields)),
+            self._tail
+        ])
+
+
+class TemplateEngine:
+    """邮件模板引擎：按名称编译并缓存模板"""
+
+    def __init__(self, from_name: str, from_email: str,
+                 templates: Optional[Dict[str, Dict[str, str]]] = None):
+        self.from_name = from_name
+        self.from_email = from_email
+        self.sources = templates if templates is not None else TEMPLATES
+        self._compiled: Dict[str, EmailTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> EmailTemplate:
+        """获取编译后的模板（首次使用时编译）"""
+        template = self._compiled.get(name)
+        if template is None:
+            with self._lock:
+                template = self._compiled.get(name)
+                if template is None:
+                    source = self.sources[name]
+                    template = EmailTemplate(
+                        subject=source['subject'],
+                        text=source['text'],
+                        html_source=source['html'],
+                        from_name=self.from_name,
+                        from_email=self.from_email,
+                        static_fields={'app_name': self.from_name}
+                    )
+                    self._compiled[name] = template
+        return template
+
+    def render(self, name: str, to_email: str, **fields: Any) -> bytes:
+        """渲染单封邮件"""
+        return self.get(name).render(to_email, fields)
+
+    def render_bulk(self, name: str,
+                    recipients: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, bytes]]:
+        """批量渲染邮件，recipients 中每项需包含 email 及模板字段"""
+        template = self.get(name)
+        for recipient in recipients:
+            yield recipient['email'], template.render(recipient['email'], recipient)
+
+
+# ----------------------------------------------------------------------
+# 模板源
+# ----------------------------------------------------------------------
+
+VERIFICATION_HTML = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <title>邮箱验证</title>
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }
+                .content { background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }
+                .button { display: inline-block; background: #007bff; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; margin: 20px 0; }
+                .footer { text-align: center; margin-top: 30px; color: #666; font-size: 12px; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>🎉 欢迎加入 ${app_name}！</h1>
+                </div>
+                <div class="content">
+                    <h2>亲爱的 ${username}，</h2>
+                    <p>感谢您注册我们的服务！为了确保您的账户安全，请点击下面的按钮验证您的邮箱地址：</p>
+                    
+                    <div style="text-align: center;">
+                        <a href="${verification_url}" class="button">验证邮箱</a>
+                    </div>
+                    
+                    <p>如果按钮无法点击，您也可以复制以下链接到浏览器中打开：</p>
+                    <p style="word-break: break-all; background: #eee; padding: 10px; border-radius: 5px;">
+                        ${verification_url}
+                    </p>
+                    
+                    <p><strong>注意事项：</strong></p>
+                    <ul>
+                        <li>此验证链接将在24小时后失效</li>
+                        <li>如果您没有注册此账户，请忽略此邮件</li>
+                        <li>验证完成后，您就可以正常使用我们的服务了</li>
+                    </ul>
+                </div>
+                <div class="footer">
+                    <p>此邮件由系统自动发送，请勿回复</p>
+                    <p>&copy; 2025 ${app_name}. All rights reserved.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+VERIFICATION_TEXT = """
+        欢迎加入 ${app_name}！
+        
+        亲爱的 ${username}，
+        
+        感谢您注册我们的服务！为了确保您的账户安全，请点击以下链接验证您的邮箱地址：
+        
+        ${verification_url}
+        
+        注意事项：
+        - 此验证链接将在24小时后失效
+        - 如果您没有注册此账户，请忽略此邮件
+        - 验证完成后，您就可以正常使用我们的服务了
+        
+        此邮件由系统自动发送，请勿回复。
+        
+        © 2025 ${app_name}. All rights reserved.
+        """
+
+PASSWORD_RESET_HTML = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <title>密码重置</title>
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background: linear-gradient(135deg, #ff6b6b 0%, #ee5a24 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }
+                .content { background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }
+                .button { display: inline-block; background: #dc3545; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; margin: 20px 0; }
+                .footer { text-align: center; margin-top: 30px; color: #666; font-size: 12px; }
+                .warning { background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 20px 0; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>🔒 密码重置请求</h1>
+                </div>
+                <div class="content">
+                    <h2>亲爱的 ${username}，</h2>
+                    <p>我们收到了您的密码重置请求。如果您确实需要重置密码，请点击下面的按钮：</p>
+                    
+                    <div style="text-align: center;">
+                        <a href="${reset_url}" class="button">重置密码</a>
+                    </div>
+                    
+                    <p>如果按钮无法点击，您也可以复制以下链接到浏览器中打开：</p>
+                    <p style="word-break: break-all; background: #eee; padding: 10px; border-radius: 5px;">
+                        ${reset_url}
+                    </p>
+                    
+                    <div class="warning">
+                        <strong>⚠️ 安全提醒：</strong>
+                        <ul>
+                            <li>此重置链接将在1小时后失效</li>
+                            <li>如果您没有请求重置密码，请忽略此邮件</li>
+                            <li>为了您的账户安全，请不要将此链接分享给他人</li>
+                        </ul>
+                    </div>
+                </div>
+                <div class="footer">
+                    <p>此邮件由系统自动发送，请勿回复</p>
+                    <p>&copy; 2025 ${app_name}. All rights reserved.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+PASSWORD_RESET_TEXT = """
+        密码重置请求 - ${app_name}
+        
+        亲爱的 ${username}，
+        
+        我们收到了您的密码重置请求。如果您确实需要重置密码，请点击以下链接：
+        
+        ${reset_url}
+        
+        安全提醒：
+        - 此重置链接将在1小时后失效
+        - 如果您没有请求重置密码，请忽略此邮件
+        - 为了您的账户安全，请不要将此链接分享给他人
+        
+        此邮件由系统自动发送，请勿回复。
+        
+        © 2025 ${app_name}. All rights reserved.
+        """
+
+WELCOME_HTML = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <title>欢迎使用</title>
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+                .header { background: linear-gradient(135deg, #28a745 0%, #20c997 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }
+                .content { background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }
+                .feature { background: white; padding: 20px; margin: 15px 0; border-radius: 8px; border-left: 4px solid #28a745; }
+                .footer { text-align: center; margin-top: 30px; color: #666; font-size: 12px; }
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>🎉 欢迎使用 ${app_name}！</h1>
+                </div>
+                <div class="content">
+                    <h2>亲爱的 ${username}，</h2>
+                    <p>恭喜！您的邮箱验证成功，现在可以正常使用我们的服务了。</p>
+                    
+                    <h3>🚀 主要功能</h3>
+                    <div class="feature">
+                        <h4>📊 数据源对接</h4>
+                        <p>支持多种数据格式，包括CSV、Excel等，轻松导入您的数据。</p>
+                    </div>
+                    
+                    <div class="feature">
+                        <h4>🤖 智能模型配置</h4>
+                        <p>提供CTGAN、GPT等多种合成数据生成模型，满足不同场景需求。</p>
+                    </div>
+                    
+                    <div class="feature">
+                        <h4>📈 质量评估</h4>
+                        <p>全面的数据质量评估工具，确保生成数据的质量和可靠性。</p>
+                    </div>
+                    
+                    <div class="feature">
+                        <h4>⚡ 批量处理</h4>
+                        <p>支持批量数据处理，提高工作效率。</p>
+                    </div>
+                    
+                    <p>如果您有任何问题或建议，请随时联系我们的技术支持团队。</p>
+                    
+                    <p>祝您使用愉快！</p>
+                </div>
+                <div class="footer">
+                    <p>此邮件由系统自动发送，请勿回复</p>
+                    <p>&copy; 2025 ${app_name}. All rights reserved.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+WELCOME_TEXT = """
+        欢迎使用 ${app_name}！
+        
+        亲爱的 ${username}，
+        
+        恭喜！您的邮箱验证成功，现在可以正常使用我们的服务了。
+        
+        主要功能：
+        
+        📊 数据源对接
+        - 支持多种数据格式，包括CSV、Excel等，轻松导入您的数据
+        
+        🤖 智能模型配置
+        - 提供CTGAN、GPT等多种合成数据生成模型，满足不同场景需求
+        
+        📈 质量评估
+        - 全面的数据质量评估工具，确保生成数据的质量和可靠性
+        
+        ⚡ 批量处理
+        - 支持批量数据处理，提高工作效率
+        
+        如果您有任何问题或建议，请随时联系我们的技术支持团队。
+        
+        祝您使用愉快！
+        
+        此邮件由系统自动发送，请勿回复。
+        
+        © 2025 ${app_name}. All rights reserved.
+        """
+
+TEMPLATES = {
+    'verification': {
+        'subject': '欢迎注册 ${app_name} - 请验证您的邮箱',
+        'text': VERIFICATION_TEXT,
+        'html': VERIFICATION_HTML
+    },
+    'password_reset': {
+        'subject': '${app_name} - 密码重置请求',
+        'text': PASSWORD_RESET_TEXT,
+        'html': PASSWORD_RESET_HTML
+    },
+    'welcome': {
+        'subject': '欢迎使用 ${app_name}！',
+        'text': WELCOME_TEXT,
+        'html': WELCOME_HTML
+    }
+}
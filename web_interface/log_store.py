@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追加日志存储引擎
+================
+
+为文件数据库提供 快照 + 追加日志 的存储方式:
+
+- ``<name>.json``  压缩后的完整快照（与旧版文件格式兼容）
+- ``<name>.log``   每行一条 JSON 变更记录（set / del）
+
+单条写入只追加一行日志，成本与总记录数无关；日志累积到一定
+规模后自动压缩回快照。内存中保存完整数据及二级索引，每个文件
+使用独立的锁。
+
+读取走内存缓存，每次访问前只对快照和日志做一次 ``stat``：
+快照被替换（其他进程压缩）时整体重新加载，日志变长时只回放
+新增的尾部，从而能正确感知其他进程的写入。
+
+带有过期时间的数据可以注册过期索引（最小堆），清理时只弹出
+已到期的记录，复杂度为 O(k log n)。
+"""
+
+import os
+import json
+import heapq
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from metrics import record_db_query
+
+try:
+    import fcntl
+except ImportError:  # Windows 下无跨进程文件锁，仅保留进程内锁
+    fcntl = None
+
+# 日志条目数超过 max(最小阈值, 记录数 * 倍数) 时触发压缩
+COMPACT_MIN_ENTRIES = 1000
+COMPACT_RATIO = 2
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """返回文件的 (inode, mtime_ns, size)，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class LogStore:
+    """基于追加日志的键值存储"""
+
+    def __init__(self, snapshot_file: Path,
+                 compact_min_entries: int = COMPACT_MIN_ENTRIES,
+                 compact_ratio: int = COMPACT_RATIO):
+        self.snapshot_file = Path(snapshot_file)
+        self.log_file = self.snapshot_file.with_suffix('.log')
+        self.lock_file = self.snapshot_file.with_suffix('.lock')
+        self.compact_min_entries = compact_min_entries
+        self.compact_ratio = compact_ratio
+
+        # 每个文件独立的可重入锁
+        self.lock = threading.RLock()
+
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self._index_data: Dict[str, Dict[Any, Set[str]]] = {}
+        self._log_entries = 0
+
+        # 过期索引: 最小堆 (时间戳, 主键) 及主键到当前过期时间的映射
+        self._expiry_field: Optional[str] = None
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._expiry_ts: Dict[str, float] = {}
+
+        # 缓存校验状态
+        self._snapshot_sig: Optional[Tuple[int, int, int]] = None
+        self._log_inode: Optional[int] = None
+        self._log_offset = 0
+
+        # 跨进程锁的重入深度（受 self.lock 保护）
+        self._process_lock_depth = 0
+
+        # 缓存统计
+        self.stats = {'hits': 0, 'reloads': 0, 'tail_reads': 0}
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # 加载与缓存校验
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        """加载快照并回放日志"""
+        with self.lock:
+            self._snapshot_sig = _file_signature(self.snapshot_file)
+            self._data = self._read_snapshot()
+            self._log_entries = 0
+            self._log_inode = None
+            self._log_offset = 0
+
+            self._rebuild_indexes()
+            self._read_log_tail()
+            self.stats['reloads'] += 1
+
+    def _read_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """读取快照文件"""
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _read_log_tail(self):
+        """从上次读取位置回放新增的完整日志行"""
+        try:
+            with open(self.log_file, 'rb') as f:
+                self._log_inode = os.fstat(f.fileno()).st_ino
+                f.seek(self._log_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+
+        # 其他进程可能正写到一半，只处理到最后一个换行符
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return
+
+        for line in chunk[:end].decode('utf-8').splitlines():
+            if self._apply_line(line):
+                self._log_entries += 1
+        self._log_offset += end
+
+    def refresh(self):
+        """根据文件状态校验内存缓存，必要时重新加载或回放日志尾部"""
+        with self.lock:
+            snapshot_sig = _file_signature(self.snapshot_file)
+            log_sig = _file_signature(self.log_file)
+
+            if snapshot_sig != self._snapshot_sig:
+                # 快照被替换，说明发生了压缩
+                self._load()
+                return
+
+            if log_sig is None:
+                if self._log_offset:
+                    self._load()
+                else:
+                    self.stats['hits'] += 1
+                return
+
+            log_inode, _, log_size = log_sig
+            if (self._log_inode is not None and log_inode != self._log_inode) \
+                    or log_size < self._log_offset:
+                # 日志被截断或替换
+                self._load()
+            elif log_size > self._log_offset:
+                self._read_log_tail()
+                self.stats['tail_reads'] += 1
+            else:
+                self.stats['hits'] += 1
+
+    def _apply_line(self, line: str) -> bool:
+        """将一行日志应用到内存数据，返回是否有效"""
+        line = line.strip()
+        if not line:
+            return False
+
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            # 进程崩溃可能留下半行日志，直接忽略
+            return False
+
+        op = entry.get('op')
+        key = entry.get('key')
+        old = self._data.get(key)
+        if op == 'set':
+            self._data[key] = entry['value']
+            self._reindex(key, old, entry['value'])
+        elif op == 'del':
+            if old is not None:
+                del self._data[key]
+                self._reindex(key, old, None)
+        else:
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def process_lock(self) -> Iterator[None]:
+        """
+        持有进程内锁和跨进程文件锁（可重入）
+
+        先检查再写入的复合操作（如唯一性校验后插入）需要在此锁内完成，
+        否则其他进程可能在检查和写入之间插入相同的记录。
+        """
+        with self.lock:
+            if self._process_lock_depth:
+                self._process_lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._process_lock_depth -= 1
+                return
+
+            with open(self.lock_file, 'a') as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                self._process_lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._process_lock_depth = 0
+
+    def _append(self, entry: Dict[str, Any]):
+        """追加一条日志，并回放到内存"""
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self.process_lock():
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+
+            # 与其他进程的写入按文件顺序一起回放
+            self.refresh()
+
+            if self._log_entries > max(self.compact_min_entries,
+                                       len(self._data) * self.compact_ratio):
+                self._compact()
+
+    def compact(self):
+        """将内存数据写回快照并清空日志"""
+        with self.process_lock():
+            self.refresh()
+            self._compact()
+
+    def _compact(self):
+        tmp_file = self.snapshot_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+
+        # 快照落盘后用新的空文件替换日志（而不是原地截断）：日志的 inode 随之改变，
+        # 其他进程即使持有过期的读取位置、且新日志已增长超过该位置，也会整体重新加载
+        tmp_log = self.log_file.with_suffix('.log.tmp')
+        with open(tmp_log, 'w', encoding='utf-8'):
+            pass
+        os.replace(tmp_log, self.log_file)
+
+        self._snapshot_sig = _file_signature(self.snapshot_file)
+        self._log_inode = None
+        self._log_offset = 0
+        self._log_entries = 0
+
+    # ------------------------------------------------------------------
+    # 二级索引
+    # ------------------------------------------------------------------
+
+    def add_index(self, name: str, key_func: Callable[[Dict[str, Any]], Any]):
+        """注册二级索引，key_func 从记录中提取索引值"""
+        with self.lock:
+            self._indexes[name] = key_func
+            self._index_data[name] = {}
+            for key, record in self._data.items():
+                self._index_add(name, key, record)
+
+    def _rebuild_indexes(self):
+        """重建全部二级索引"""
+        for name in self._indexes:
+            self._index_data[name] = {}
+            for key, record in self._data.items():
+                self._index_add(name, key, record)
+        self._rebuild_expiry()
+
+    def _index_add(self, name: str, key: str, record: Dict[str, Any]):
+        value = self._indexes[name](record)
+        if value is not None:
+            self._index_data[name].setdefault(value, set()).add(key)
+
+    def _index_remove(self, name: str, key: str, record: Dict[str, Any]):
+        value = self._indexes[name](record)
+        keys = self._index_data[name].get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._index_data[name][value]
+
+    def _reindex(self, key: str, old: Optional[Dict[str, Any]],
+                 new: Optional[Dict[str, Any]]):
+        for name in self._indexes:
+            if old is not None:
+                self._index_remove(name, key, old)
+            if new is not None:
+                self._index_add(name, key, new)
+        if self._expiry_field is not None:
+            self._expiry_update(key, new)
+
+    # ------------------------------------------------------------------
+    # 过期索引
+    # ------------------------------------------------------------------
+
+    def add_expiry_index(self, field: str = 'expires_at'):
+        """按记录中的 ISO 时间字段建立过期索引"""
+        with self.lock:
+            self._expiry_field = field
+            self._rebuild_expiry()
+
+    def _rebuild_expiry(self):
+        self._expiry_heap = []
+        self._expiry_ts = {}
+        if self._expiry_field is None:
+            return
+        for key, record in self._data.items():
+            ts = self._parse_expiry(record)
+            if ts is not None:
+                self._expiry_ts[key] = ts
+                self._expiry_heap.append((ts, key))
+        heapq.heapify(self._expiry_heap)
+
+    def _parse_expiry(self, record: Dict[str, Any]) -> Optional[float]:
+        value = record.get(self._expiry_field)
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    def _expiry_update(self, key: str, record: Optional[Dict[str, Any]]):
+        """更新单条记录的过期时间；堆中旧条目延迟到弹出时丢弃"""
+        ts = self._parse_expiry(record) if record is not None else None
+        if ts is None:
+            self._expiry_ts.pop(key, None)
+        elif self._expiry_ts.get(key) != ts:
+            self._expiry_ts[key] = ts
+            heapq.heappush(self._expiry_heap, (ts, key))
+
+        # 失效条目过多时重建，避免堆无限增长
+        if len(self._expiry_heap) > 2 * len(self._expiry_ts) + self.compact_min_entries:
+            self._expiry_heap = [(ts, key) for key, ts in self._expiry_ts.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def pop_expired(self, now: Optional[float] = None) -> List[str]:
+        """弹出所有已到期记录的主键（不删除记录本身）"""
+        if now is None:
+            now = datetime.now().timestamp()
+
+        with self.lock:
+            self.refresh()
+            due = []
+            while self._expiry_heap and self._expiry_heap[0][0] < now:
+                ts, key = heapq.heappop(self._expiry_heap)
+                if self._expiry_ts.get(key) == ts:
+                    del self._expiry_ts[key]
+                    due.append(key)
+            return due
+
+    def expiry_size(self) -> int:
+        """过期索引中有效记录数"""
+        with self.lock:
+            return len(self._expiry_ts)
+
+    def find_keys(self, index_name: str, value: Any) -> List[str]:
+        """通过二级索引查找主键"""
+        record_db_query('file')
+        with self.lock:
+            self.refresh()
+            return list(self._index_data[index_name].get(value, ()))
+
+    def find_one(self, index_name: str, value: Any) -> Optional[Dict[str, Any]]:
+        """通过二级索引查找单条记录"""
+        record_db_query('file')
+        with self.lock:
+            self.refresh()
+            for key in self._index_data[index_name].get(value, ()):
+                return self._data[key]
+            return None
+
+    # ------------------------------------------------------------------
+    # 读写接口
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取记录"""
+        record_db_query('file')
+        with self.lock:
+            self.refresh()
+            return self._data.get(key)
+
+    def contains(self, key: str) -> bool:
+        """检查主键是否存在"""
+        record_db_query('file')
+        with self.lock:
+            self.refresh()
+            return key in self._data
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """写入记录"""
+        record_db_query('file')
+        with self.lock:
+            self._append({'op': 'set', 'key': key, 'value': value})
+
+    def delete(self, key: str) -> bool:
+        """删除记录"""
+        record_db_query('file')
+        with self.lock:
+            self.refresh()
+            if key not in self._data:
+                return False
+            self._append({'op': 'del', 'key': key})
+            return True
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """返回全部记录的副本"""
+        record_db_query('file')
+        with self.lock:
+            self.refresh()
+            return list(self._data.items())
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """遍历全部记录"""
+        for _, value in self.items():
+            yield value
+
+    def __len__(self) -> int:
+        with self.lock:
+            self.refresh()
+            return len(self._data)
+
+
+# 同一文件在进程内只打开一次，保证多个数据库对象共享数据与锁
+_stores: Dict[str, LogStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(snapshot_file: Path) -> LogStore:
+    """获取（或创建）指定文件对应的存储实例"""
+    path = str(Path(snapshot_file).resolve())
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = LogStore(Path(snapshot_file))
+            _stores[path] = store
+        return store
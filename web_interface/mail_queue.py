@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步邮件发送队列
+================
+
+邮件先写入本地 SQLite 发件箱（进程重启不丢失），由后台线程批量发送：
+
+- ``SMTPBackend``  复用同一个 SMTP 连接发送多封邮件，空闲过久或断开时重连
+- ``DebugBackend`` 不连接真实服务器，只记录到日志并保存在 ``outbox`` 中，供测试使用
+
+发送前先在一个 ``BEGIN IMMEDIATE`` 事务中把到期邮件标记为 ``sending`` 并设置租约，
+多个线程或进程共享同一个发件箱时不会重复发送；持有租约的进程异常退出后，
+租约过期的邮件重新回到 ``pending``。
+
+发送失败按指数退避（带随机抖动）重试，超过最大次数后标记为 dead。
+"""
+
+import json
+import logging
+import random
+import smtplib
+import sqlite3
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.message import Message
+from email.utils import getaddresses, parseaddr
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPBackend:
+    """保持长连接的 SMTP 发送后端"""
+
+    def __init__(self, host: str, port: int, username: str = '', password: str = '',
+                 use_ssl: bool = False, use_tls: bool = True,
+                 timeout: float = 30.0, idle_timeout: float = 60.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.use_tls = use_tls and not use_ssl
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self._connection: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    @classmethod
+    def from_flask_config(cls, config: Dict[str, Any]) -> 'SMTPBackend':
+        """根据 Flask-Mail 风格的配置创建后端"""
+        return cls(
+            host=config.get('MAIL_SERVER', 'localhost'),
+            port=int(config.get('MAIL_PORT', 25)),
+            username=config.get('MAIL_USERNAME') or '',
+            password=config.get('MAIL_PASSWORD') or '',
+            use_ssl=bool(config.get('MAIL_USE_SSL', False)),
+            use_tls=bool(config.get('MAIL_USE_TLS', False))
+        )
+
+    def _connect(self) -> smtplib.SMTP:
+        context = ssl.create_default_context()
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                connection.starttls(context=context)
+        if self.username and self.password:
+            connection.login(self.username, self.password)
+        return connection
+
+    def _get_connection(self) -> smtplib.SMTP:
+        """获取可用连接，空闲超时后先用 NOOP 探活"""
+        if self._connection is not None and time.time() - self._last_used > self.idle_timeout:
+            try:
+                self._connection.noop()
+            except smtplib.SMTPException:
+                self.close()
+            except OSError:
+                self.close()
+
+        if self._connection is None:
+            self._connection = self._connect()
+        return self._connection
+
+    def send(self, from_addr: str, to_addrs: List[str], raw: bytes):
+        """发送一封邮件，连接断开时重连一次"""
+        try:
+            self._get_connection().sendmail(from_addr, to_addrs, raw)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self._get_connection().sendmail(from_addr, to_addrs, raw)
+        self._last_used = time.time()
+
+    def close(self):
+        """关闭连接"""
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._connection = None
+
+
+class DebugBackend:
+    """调试用发送后端：记录日志并保存到内存"""
+
+    def __init__(self):
+        self.outbox: List[Dict[str, Any]] = []
+
+    def send(self, from_addr: str, to_addrs: List[str], raw: bytes):
+        self.outbox.append({'from': from_addr, 'to': list(to_addrs), 'raw': raw})
+        logger.info(f"[DebugBackend] 邮件: {from_addr} -> {', '.join(to_addrs)} ({len(raw)} bytes)")
+
+    def close(self):
+        pass
+
+
+class MailQueue:
+    """持久化的异步邮件发送队列"""
+
+    def __init__(self, db_path: str, backend, batch_size: int = 50,
+                 max_attempts: int = 5, retry_base: float = 10.0,
+                 retry_max: float = 3600.0, poll_interval: float = 5.0,
+                 lease_timeout: float = 600.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'enqueued': 0, 'sent': 0, 'retried': 0, 'dead': 0, 'batches': 0,
+                      'lease_expired': 0}
+
+        self._init_db()
+
+    # ------------------------------------------------------------------
+    # 存储
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        """打开数据库连接，退出时提交并关闭"""
+        with self._lock:
+            connection = sqlite3.connect(str(self.db_path), timeout=30)
+            connection.row_factory = sqlite3.Row
+            try:
+                with connection:
+                    yield connection
+            finally:
+                connection.close()
+
+    def _init_db(self):
+        with self._db() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    from_addr TEXT NOT NULL,
+                    to_addrs TEXT NOT NULL,
+                    raw BLOB NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_error TEXT,
+                    lease_until REAL
+                )
+            ''')
+            columns = {row['name'] for row in connection.execute('PRAGMA table_info(outbox)')}
+            if 'lease_until' not in columns:
+                connection.execute('ALTER TABLE outbox ADD COLUMN lease_until REAL')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_outbox_status_next ON outbox (status, next_attempt_at)'
+            )
+
+    def enqueue(self, message: Message, to_addrs: Optional[List[str]] = None,
+                from_addr: Optional[str] = None) -> int:
+        """将邮件加入发送队列，返回队列ID"""
+        if from_addr is None:
+            from_addr = parseaddr(message.get('From', ''))[1]
+        if to_addrs is None:
+            to_addrs = [addr for _, addr in getaddresses(
+                message.get_all('To', []) + message.get_all('Cc', []) + message.get_all('Bcc', [])
+            ) if addr]
+        if not to_addrs:
+            raise ValueError('邮件没有收件人')
+
+        # Bcc 只用于信封，不写入邮件头
+        del message['Bcc']
+
+        # SMTP 要求 CRLF 换行，sendmail 不会转换 bytes 中的换行符
+        raw = message.as_bytes(policy=message.policy.clone(linesep='\r\n'))
+        return self.enqueue_raw(from_addr, to_addrs, raw)
+
+    def enqueue_raw(self, from_addr: str, to_addrs: List[str], raw: bytes) -> int:
+        """将已编码的邮件加入发送队列，返回队列ID"""
+        now = time.time()
+        with self._db() as connection:
+            cursor = connection.execute(
+                'INSERT INTO outbox (from_addr, to_addrs, raw, next_attempt_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (from_addr, json.dumps(to_addrs), raw, now, now)
+            )
+            message_id = cursor.lastrowid
+
+        self.stats['enqueued'] += 1
+        self.start()
+        self._wakeup.set()
+        return message_id
+
+    def enqueue_many(self, from_addr: str, messages: Iterable[Tuple[List[str], bytes]]) -> int:
+        """在一个事务中批量入队 (收件人列表, 原始邮件) ，返回入队数量"""
+        now = time.time()
+        rows = [(from_addr, json.dumps(to_addrs), raw, now, now) for to_addrs, raw in messages]
+        if not rows:
+            return 0
+
+        with self._db() as connection:
+            connection.executemany(
+                'INSERT INTO outbox (from_addr, to_addrs, raw, next_attempt_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+
+        self.stats['enqueued'] += len(rows)
+        self.start()
+        self._wakeup.set()
+        return len(rows)
+
+    def _claim_due(self) -> List[sqlite3.Row]:
+        """领取一批到期邮件：在写事务中标记为 sending 并设置租约"""
+        now = time.time()
+        with self._db() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            expired = connection.execute(
+                "UPDATE outbox SET status = 'pending', lease_until = NULL "
+                "WHERE status = 'sending' AND lease_until <= ?",
+                (now,)
+            ).rowcount
+            rows = connection.execute(
+                "SELECT id, from_addr, to_addrs, raw, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, self.batch_size)
+            ).fetchall()
+            connection.executemany(
+                "UPDATE outbox SET status = 'sending', lease_until = ? WHERE id = ?",
+                [(now + self.lease_timeout, row['id']) for row in rows]
+            )
+        if expired:
+            logger.warning(f"{expired} 封邮件的发送租约已过期，重新加入队列")
+            self.stats['lease_expired'] += expired
+        return rows
+
+    def _record_results(self, sent: List[int], failed: List[Tuple[int, int, str]]):
+        now = time.time()
+        with self._db() as connection:
+            if sent:
+                connection.executemany('DELETE FROM outbox WHERE id = ?', [(i,) for i in sent])
+            for message_id, attempts, error in failed:
+                if attempts >= self.max_attempts:
+                    connection.execute(
+                        "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ?, "
+                        "lease_until = NULL WHERE id = ?",
+                        (attempts, error, message_id)
+                    )
+                    self.stats['dead'] += 1
+                else:
+                    delay = min(self.retry_max, self.retry_base * (2 ** (attempts - 1)))
+                    delay *= random.uniform(0.8, 1.2)
+                    connection.execute(
+                        "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, "
+                        "last_error = ?, lease_until = NULL WHERE id = ?",
+                        (attempts, now + delay, error, message_id)
+                    )
+                    self.stats['retried'] += 1
+        self.stats['sent'] += len(sent)
+
+    # ------------------------------------------------------------------
+    # 发送
+    # ------------------------------------------------------------------
+
+    def process_batch(self) -> int:
+        """发送一批到期邮件，返回本批处理的数量"""
+        rows = self._claim_due()
+        if not rows:
+            return 0
+
+        sent, failed = [], []
+        for row in rows:
+            try:
+                self.backend.send(row['from_addr'], json.loads(row['to_addrs']), row['raw'])
+                sent.append(row['id'])
+            except Exception as e:
+                logger.error(f"发送邮件失败(id={row['id']}): {str(e)}")
+                failed.append((row['id'], row['attempts'] + 1, str(e)))
+                # 连接可能已损坏，下一封重新建立
+                self.backend.close()
+
+        self._record_results(sent, failed)
+        self.stats['batches'] += 1
+        return len(rows)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                processed = self.process_batch()
+            except Exception as e:
+                logger.error(f"邮件队列处理失败: {str(e)}")
+                processed = 0
+
+            if processed < self.batch_size:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+        self.backend.close()
+
+    def start(self):
+        """启动后台发送线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='mail-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台发送线程"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def pending_count(self) -> int:
+        """待发送的邮件数量（含正在发送的）"""
+        with self._db() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()[0]
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求性能指标
+============
+
+在进程内聚合请求级性能指标，并以 Prometheus 文本格式通过 ``/metrics`` 暴露:
+
+- ``sdg_http_request_duration_seconds``  各路由的请求耗时直方图（按方法、路由模板、状态码）
+- ``sdg_http_requests_in_flight``        各路由正在处理的请求数
+- ``sdg_http_request_size_bytes`` / ``sdg_http_response_size_bytes``  请求和响应体大小
+- ``sdg_http_request_db_queries``        每个请求执行的数据库查询数
+- ``sdg_db_queries_total``               数据库查询总数（按后端）
+- ``sdg_stage_duration_seconds``         训练、采样、评估、序列化等阶段耗时
+
+直方图使用固定分桶，记录一次观测只需一次二分查找和几次加法，开销可以忽略。
+指标保存在各进程内存中，多进程部署（gunicorn 多 worker）时由采集端按实例汇总。
+
+用法::
+
+    instrument_app(app)
+
+    with stage('fit'):
+        synthesizer.fit()
+
+    processing_time = request_elapsed()
+"""
+
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# 256B - 64MB
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """固定分桶的直方图"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        # 最后一个桶对应 +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """进程内指标注册表（计数器、仪表、直方图）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 指标名 -> (类型, 说明, 分桶)
+        self._meta: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {}
+        self._values: Dict[str, Dict[LabelKey, Any]] = {}
+
+    def _declare(self, kind: str, name: str, help_text: str, buckets: Optional[Sequence[float]] = None):
+        with self._lock:
+            if name not in self._meta:
+                self._meta[name] = (kind, help_text, tuple(buckets) if buckets else None)
+                self._values[name] = {}
+
+    def counter(self, name: str, help_text: str):
+        self._declare('counter', name, help_text)
+
+    def gauge(self, name: str, help_text: str):
+        self._declare('gauge', name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self._declare('histogram', name, help_text, buckets)
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器或仪表加上 value"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """设置仪表的值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[name][key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """直方图记录一次观测"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._meta[name][2])
+            histogram.observe(value)
+
+    def get(self, name: str, **labels) -> Any:
+        """读取单个序列的当前值（直方图返回 Histogram）"""
+        with self._lock:
+            return self._values[name].get(self._key(labels))
+
+    def reset(self):
+        """清空所有序列（保留指标定义）"""
+        with self._lock:
+            for series in self._values.values():
+                series.clear()
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in self._meta.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in sorted(self._values[name].items()):
+                    if kind != 'histogram':
+                        lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + (float('inf'),), value.counts):
+                        cumulative += count
+                        le = ('le', _format_value(bound))
+                        lines.append(f'{name}_bucket{_format_labels(labels, le)} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value.sum)}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+metrics.histogram('sdg_http_request_duration_seconds', '请求处理耗时（秒）')
+metrics.gauge('sdg_http_requests_in_flight', '正在处理的请求数')
+metrics.histogram('sdg_http_request_size_bytes', '请求体大小（字节）', SIZE_BUCKETS)
+metrics.histogram('sdg_http_response_size_bytes', '响应体大小（字节）', SIZE_BUCKETS)
+metrics.histogram('sdg_http_request_db_queries', '每个请求执行的数据库查询数', COUNT_BUCKETS)
+metrics.counter('sdg_db_queries_total', '数据库查询总数')
+metrics.histogram('sdg_stage_duration_seconds', '处理阶段耗时（秒）')
+
+
+# ----------------------------------------------------------------------
+# 当前请求的统计（不在请求中时为 None）
+# ----------------------------------------------------------------------
+
+_request_stats: ContextVar[Optional[Dict[str, Any]]] = ContextVar('sdg_request_stats', default=None)
+
+
+def request_stats() -> Optional[Dict[str, Any]]:
+    """当前请求的开始时间、数据库查询数和各阶段耗时"""
+    return _request_stats.get()
+
+
+def request_elapsed() -> Optional[float]:
+    """当前请求已处理的时间（秒），不在请求中时返回 None"""
+    stats = _request_stats.get()
+    if stats is None:
+        return None
+    return round(time.perf_counter() - stats['started'], 3)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """记录一个处理阶段（fit / sample / evaluate / serialize 等）的耗时"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe('sdg_stage_duration_seconds', elapsed, stage=name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats['stages'][name] = round(stats['stages'].get(name, 0) + elapsed, 4)
+
+
+def record_db_query(backend: str):
+    """记录一次数据库查询"""
+    metrics.inc('sdg_db_queries_total', backend=backend)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats['db_queries'] += 1
+
+
+_sqlalchemy_instrumented = False
+
+
+def instrument_sqlalchemy():
+    """统计所有 SQLAlchemy 引擎执行的语句"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        record_db_query('sqlalchemy')
+
+    _sqlalchemy_instrumented = True
+
+
+# ----------------------------------------------------------------------
+# Flask 集成
+# ----------------------------------------------------------------------
+
+def instrument_app(app, path: str = '/metrics'):
+    """
+    为 Flask 应用注册请求指标中间件和指标接口
+
+    路由标签使用路由模板（如 ``/api/v1/sessions/<session_id>``），未匹配的请求
+    记为 ``unmatched``，避免序列数随 URL 增长。配置了 ``METRICS_TOKEN``
+    （应用配置或环境变量）时，访问指标接口需要携带 ``Authorization: Bearer <token>``。
+    """
+    from flask import Response, g, request
+
+    def route_label() -> str:
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @app.before_request
+    def _start_request_metrics():
+        route = route_label()
+        token = _request_stats.set({'started': time.perf_counter(), 'db_queries': 0, 'stages': {}})
+        g._metrics = (token, route)
+        metrics.inc('sdg_http_requests_in_flight', route=route)
+        if request.content_length:
+            metrics.observe('sdg_http_request_size_bytes', request.content_length, route=route)
+
+    @app.after_request
+    def _record_request_metrics(response):
+        state = g.get('_metrics')
+        stats = _request_stats.get()
+        if state is None or stats is None:
+            return response
+
+        route = state[1]
+        metrics.observe(
+            'sdg_http_request_duration_seconds', time.perf_counter() - stats['started'],
+            method=request.method, route=route, status=response.status_code
+        )
+        metrics.observe('sdg_http_request_db_queries', stats['db_queries'], route=route)
+        if response.content_length is not None:
+            metrics.observe('sdg_http_response_size_bytes', response.content_length, route=route)
+        return response
+
+    @app.teardown_request
+    def _end_request_metrics(exc=None):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return
+        token, route = state
+        metrics.inc('sdg_http_requests_in_flight', -1, route=route)
+        try:
+            _request_stats.reset(token)
+        except ValueError:
+            # 在其他上下文中结束（例如流式响应），直接清空
+            _request_stats.set(None)
+
+    def metrics_endpoint():
+        expected = app.config.get('METRICS_TOKEN') or os.environ.get('METRICS_TOKEN')
+        if expected and request.headers.get('Authorization') != f'Bearer {expected}':
+            return Response('unauthorized\n', status=401, mimetype='text/plain')
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule(path, 'metrics', metrics_endpoint)
+    return app
@@ -8,12 +8,13 @@
 """
 
 from datetime import datetime, timedelta
-import hashlib
 import secrets
 import uuid
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import json
 
+from password_hasher import password_hasher
+
 class User:
     """用户模型"""
     
@@ -217,29 +218,18 @@ class PasswordUtils:
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """哈希密码"""
-        salt = secrets.token_hex(16)
-        pwd_hash = hashlib.pbkdf2_hmac('sha256', 
-                                       password.encode('utf-8'), 
-                                       salt.encode('utf-8'), 
-                                       100000)
-        return salt + pwd_hash.hex()
+        """哈希密码（在密码哈希进程池中执行）"""
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(password: str, password_hash: str) -> bool:
-        """验证密码"""
-        try:
-            salt = password_hash[:32]  # 前32个字符是salt
-            stored_hash = password_hash[32:]
-            
-            pwd_hash = hashlib.pbkdf2_hmac('sha256',
-                                          password.encode('utf-8'),
-                                          salt.encode('utf-8'),
-                                          100000)
-            
-            return pwd_hash.hex() == stored_hash
-        except:
-            return False
+        """验证密码（在密码哈希进程池中执行）"""
+        return password_hasher.verify(password, password_hash)
+    
+    @staticmethod
+    def verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """验证密码，哈希参数变化时返回新的哈希"""
+        return password_hasher.verify_and_update(password, password_hash)
     
     @staticmethod
     def validate_password_strength(password: str) -> Dict[str, Any]:
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+密码哈希服务
+============
+
+将 PBKDF2 等高成本的密码哈希计算放到独立的进程池中执行，避免登录
+高峰占满请求线程。排队任务数有上限，超出时直接拒绝（负载削减）。
+
+哈希格式为 ``pbkdf2_sha256$<迭代次数>$<salt>$<hash>``；同时兼容旧版
+``PasswordUtils`` 格式（32位salt + 十六进制哈希）和 werkzeug 格式，
+登录成功时若参数已变化会自动重新哈希。
+"""
+
+import os
+import hmac
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+ALGORITHM = 'pbkdf2_sha256'
+DEFAULT_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS') or 100000)
+DEFAULT_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 64)
+DEFAULT_TIMEOUT = 10.0
+
+
+class HashingOverloaded(Exception):
+    """哈希队列已满，请求被拒绝"""
+
+
+# ----------------------------------------------------------------------
+# 进程池中执行的函数（需为模块级函数以便序列化）
+# ----------------------------------------------------------------------
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'),
+                               salt.encode('utf-8'), iterations).hex()
+
+
+def hash_password(password: str, iterations: int = DEFAULT_ITERATIONS) -> str:
+    """生成密码哈希"""
+    salt = secrets.token_hex(16)
+    return f'{ALGORITHM}${iterations}${salt}${_pbkdf2(password, salt, iterations)}'
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """校验密码，支持当前格式、旧版格式和 werkzeug 格式"""
+    try:
+        if password_hash.startswith(ALGORITHM + '$'):
+            _, iterations, salt, stored_hash = password_hash.split('$', 3)
+            return hmac.compare_digest(_pbkdf2(password, salt, int(iterations)), stored_hash)
+
+        if '$' in password_hash:
+            from werkzeug.security import check_password_hash
+            return check_password_hash(password_hash, password)
+
+        # 旧版格式: 前32个字符是salt，固定100000次迭代
+        salt, stored_hash = password_hash[:32], password_hash[32:]
+        return hmac.compare_digest(_pbkdf2(password, salt, 100000), stored_hash)
+    except Exception:
+        return False
+
+
+# ----------------------------------------------------------------------
+# 进程池服务
+# ----------------------------------------------------------------------
+
+class PasswordHasher:
+    """基于有界进程池的密码哈希服务"""
+
+    def __init__(self, iterations: int = DEFAULT_ITERATIONS,
+                 max_workers: Optional[int] = None,
+                 max_pending: int = DEFAULT_MAX_PENDING,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.iterations = iterations
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+        self.stats = {'submitted': 0, 'rejected': 0, 'rehashed': 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # 延迟创建，避免在导入或 fork 之前启动子进程
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _run(self, fn, *args):
+        """提交到进程池并等待结果；队列已满时抛出 HashingOverloaded"""
+        if not self._slots.acquire(blocking=False):
+            self.stats['rejected'] += 1
+            raise HashingOverloaded('密码校验服务繁忙，请稍后重试')
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        self.stats['submitted'] += 1
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password: str) -> str:
+        """生成密码哈希"""
+        return self._run(hash_password, password, self.iterations)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """校验密码"""
+        if not password_hash:
+            return False
+        return self._run(verify_password, password, password_hash)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """判断哈希是否使用了旧的格式或参数"""
+        if not password_hash.startswith(ALGORITHM + '$'):
+            return True
+        try:
+            return int(password_hash.split('$', 2)[1]) != self.iterations
+        except ValueError:
+            return True
+
+    def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """校验密码，若需要则返回按当前参数重新生成的哈希"""
+        if not self.verify(password, password_hash):
+            return False, None
+
+        if self.needs_rehash(password_hash):
+            self.stats['rehashed'] += 1
+            return True, self.hash(password)
+        return True, None
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+# 全局密码哈希服务实例
+password_hasher = PasswordHasher()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按需采样分析器
+==============
+
+生产环境中定位慢请求用的采样分析器，由管理员按需开启:
+
+- 对当前 worker 的所有线程采样 N 秒
+- 对下一个匹配路径前缀的请求采样（只采集处理该请求的线程）
+
+采样线程按固定间隔读取 ``sys._current_frames()`` 中的调用栈并计数，结果为
+火焰图工具（flamegraph.pl、speedscope 等）可直接读取的折叠栈格式::
+
+    thread:MainThread;app:generate_synthetic_data;sdgx.synthesizer:Synthesizer.fit 42
+
+与基于信号（SIGPROF）的采样相比，不需要在主线程注册信号处理函数，
+也能采集多线程 worker 中的任意线程。
+
+默认关闭：未设置 ``PROFILER_ENABLED`` 时不注册任何接口和请求钩子；开启后
+空闲状态下每个请求只多一次属性读取。
+"""
+
+import os
+import sys
+import time
+import uuid
+import threading
+from collections import Counter, OrderedDict
+from types import CodeType, FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_INTERVAL = 0.01
+MIN_INTERVAL = 0.001
+MAX_SECONDS = 120
+# 等待匹配请求的默认时长（秒）
+DEFAULT_ARM_TIMEOUT = 300
+# 内存中保留的分析结果数
+MAX_PROFILES = 20
+
+_labels: Dict[CodeType, str] = {}
+
+
+def _frame_label(frame: FrameType) -> str:
+    """栈帧名称 ``模块:函数``（同一代码对象只计算一次）"""
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+        name = getattr(code, 'co_qualname', code.co_name)
+        label = _labels[code] = f'{module}:{name}'.replace(';', ':').replace(' ', '_')
+    return label
+
+
+class StackSampler:
+    """在后台线程中定时采集调用栈，按折叠栈计数"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_id: Optional[int] = None):
+        self.interval = max(MIN_INTERVAL, interval)
+        # 为 None 时采集除采样线程外的所有线程
+        self.thread_id = thread_id
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'StackSampler':
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'StackSampler':
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self.started_at is not None:
+            self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frame = frames.get(self.thread_id)
+                items = [(self.thread_id, frame)] if frame is not None else []
+                names = None
+            else:
+                items = [(ident, frame) for ident, frame in frames.items() if ident != own]
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            for ident, frame in items:
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if names is not None:
+                    stack.append(f'thread:{names.get(ident, ident)}')
+                self.counts[';'.join(reversed(stack))] += 1
+            del frames, items
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """折叠栈格式的结果（每行 ``栈 次数``）"""
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.counts.items()))
+
+
+class Profiler:
+    """管理按需分析任务和分析结果"""
+
+    def __init__(self, max_profiles: int = MAX_PROFILES):
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._profiles: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # 等待匹配请求的分析任务
+        self._armed: Optional[Dict[str, Any]] = None
+
+    def _add(self, profile: Dict[str, Any]):
+        with self._lock:
+            self._profiles[profile['id']] = profile
+            while len(self._profiles) > self.max_profiles:
+                oldest = next(iter(self._profiles))
+                if self._profiles[oldest]['status'] in ('running', 'armed'):
+                    break
+                del self._profiles[oldest]
+
+    @staticmethod
+    def _new(mode: str, interval: float, **extra) -> Dict[str, Any]:
+        return {
+            'id': uuid.uuid4().hex,
+            'mode': mode,
+            'status': 'running',
+            'interval': max(MIN_INTERVAL, interval),
+            'created_at': time.time(),
+            'samples': 0,
+            'duration': None,
+            '_sampler': None,
+            **extra
+        }
+
+    @staticmethod
+    def _finish(profile: Dict[str, Any], sampler: StackSampler):
+        sampler.stop()
+        profile['samples'] = sampler.samples
+        profile['duration'] = round(sampler.duration, 3)
+        profile['status'] = 'completed'
+
+    def sample(self, seconds: float, interval: float = DEFAULT_INTERVAL) -> Dict[str, Any]:
+        """在后台对所有线程采样 seconds 秒"""
+        seconds = min(float(seconds), MAX_SECONDS)
+        if seconds <= 0:
+            raise ValueError('seconds 必须大于 0')
+
+        profile = self._new('sample', interval, seconds=seconds)
+        sampler = profile['_sampler'] = StackSampler(interval).start()
+        self._add(profile)
+
+        timer = threading.Timer(seconds, self._finish, (profile, sampler))
+        timer.daemon = True
+        timer.start()
+        return self.describe(profile)
+
+    def arm(self, path: str, method: Optional[str] = None, timeout: float = DEFAULT_ARM_TIMEOUT,
+            interval: float = DEFAULT_INTERVAL) -> Dict[str, Any]:
+        """对下一个路径以 path 开头（且方法匹配）的请求采样；同一时间只能等待一个请求"""
+        profile = self._new(
+            'request', interval,
+            path=path, method=method.upper() if method else None,
+            expires_at=time.time() + min(float(timeout), 24 * 3600),
+            request=None
+        )
+        profile['status'] = 'armed'
+        with self._lock:
+            if self._armed is not None:
+                self._armed['status'] = 'cancelled'
+            self._armed = profile
+        self._add(profile)
+        return self.describe(profile)
+
+    def disarm(self) -> bool:
+        with self._lock:
+            profile, self._armed = self._armed, None
+        if profile is None:
+            return False
+        profile['status'] = 'cancelled'
+        return True
+
+    def request_started(self, path: str, method: str) -> Optional[Tuple[Dict[str, Any], StackSampler]]:
+        """请求开始时调用；匹配等待中的任务时开始采集当前线程"""
+        profile = self._armed
+        if profile is None:
+            return None
+        if not path.startswith(profile['path']) or (profile['method'] and profile['method'] != method):
+            return None
+
+        with self._lock:
+            if self._armed is not profile:
+                return None
+            self._armed = None
+        if time.time() > profile['expires_at']:
+            profile['status'] = 'expired'
+            return None
+
+        profile['status'] = 'running'
+        profile['request'] = {'method': method, 'path': path, 'status': None}
+        sampler = profile['_sampler'] = StackSampler(profile['interval'], threading.get_ident()).start()
+        return profile, sampler
+
+    def request_finished(self, state: Tuple[Dict[str, Any], StackSampler], status: Optional[int] = None):
+        profile, sampler = state
+        profile['request']['status'] = status
+        self._finish(profile, sampler)
+
+    def describe(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        if profile['status'] == 'armed' and time.time() > profile['expires_at']:
+            with self._lock:
+                if self._armed is profile:
+                    self._armed = None
+            profile['status'] = 'expired'
+        return {key: value for key, value in profile.items() if not key.startswith('_')}
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        profile = self._profiles.get(profile_id)
+        return None if profile is None else self.describe(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [self.describe(profile) for profile in reversed(profiles)]
+
+    def collapsed(self, profile_id: str) -> Optional[str]:
+        """已完成任务的折叠栈结果"""
+        profile = self._profiles.get(profile_id)
+        if profile is None or profile['status'] != 'completed':
+            return None
+        return profile['_sampler'].collapsed()
+
+    def delete(self, profile_id: str) -> bool:
+        with self._lock:
+            profile = self._profiles.pop(profile_id, None)
+        if profile is None:
+            return False
+        if profile['status'] == 'running' and profile['mode'] == 'sample':
+            profile['_sampler'].stop()
+        return True
+
+
+profiler = Profiler()
+
+
+def profiler_enabled(app) -> bool:
+    value = app.config.get('PROFILER_ENABLED', os.environ.get('PROFILER_ENABLED', ''))
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+# ----------------------------------------------------------------------
+# Flask 集成
+# ----------------------------------------------------------------------
+
+def register_profiler(app, *decorators, url_prefix: str = '/api/admin/profiler'):
+    """
+    注册分析器接口和请求钩子（仅在开启 PROFILER_ENABLED 时）
+
+    decorators 依次套在每个接口上，用于限制为管理员访问。
+
+    - ``POST   {url_prefix}/sample``                 对 worker 采样 {seconds, interval_ms}
+    - ``POST   {url_prefix}/arm``                    分析下一个匹配请求 {path, method, timeout, interval_ms}
+    - ``DELETE {url_prefix}/arm``                    取消等待中的任务
+    - ``GET    {url_prefix}/profiles``               任务列表
+    - ``GET    {url_prefix}/profiles/<id>``          任务状态
+    - ``GET    {url_prefix}/profiles/<id>/collapsed`` 下载折叠栈文件
+    - ``DELETE {url_prefix}/profiles/<id>``          删除任务
+    """
+    if not profiler_enabled(app):
+        return app
+
+    from flask import Blueprint, Response, g, jsonify, request
+
+    @app.before_request
+    def _start_request_profile():
+        if profiler._armed is None or request.path.startswith(url_prefix):
+            return
+        state = profiler.request_started(request.path, request.method)
+        if state is not None:
+            g._profile = state
+
+    @app.after_request
+    def _record_profile_status(response):
+        if '_profile' in g:
+            g._profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_request_profile(exc=None):
+        state = g.pop('_profile', None)
+        if state is not None:
+            profiler.request_finished(state, g.pop('_profile_status', 500))
+
+    bp = Blueprint('profiler', __name__, url_prefix=url_prefix)
+
+    def interval_from(data: Dict[str, Any]) -> float:
+        return float(data.get('interval_ms', DEFAULT_INTERVAL * 1000)) / 1000
+
+    def start_sample():
+        """对当前 worker 采样"""
+        try:
+            data = request.get_json(silent=True) or {}
+            profile = profiler.sample(float(data.get('seconds', 10)), interval_from(data))
+            return jsonify({'success': True, 'profile': profile})
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+    def arm_request():
+        """分析下一个匹配的请求"""
+        try:
+            data = request.get_json(silent=True) or {}
+            if not data.get('path'):
+                return jsonify({'success': False, 'error': '缺少必需参数: path'}), 400
+            profile = profiler.arm(
+                data['path'], data.get('method'),
+                float(data.get('timeout', DEFAULT_ARM_TIMEOUT)), interval_from(data)
+            )
+            return jsonify({'success': True, 'profile': profile})
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+    def disarm_request():
+        """取消等待中的任务"""
+        return jsonify({'success': True, 'cancelled': profiler.disarm()})
+
+    def list_profiles():
+        """任务列表"""
+        return jsonify({'success': True, 'profiles': profiler.list()})
+
+    def get_profile(profile_id):
+        """任务状态"""
+        profile = profiler.get(profile_id)
+        if profile is None:
+            return jsonify({'success': False, 'error': '分析任务不存在'}), 404
+        return jsonify({'success': True, 'profile': profile})
+
+    def download_collapsed(profile_id):
+        """下载折叠栈文件"""
+        profile = profiler.get(profile_id)
+        if profile is None:
+            return jsonify({'success': False, 'error': '分析任务不存在'}), 404
+        content = profiler.collapsed(profile_id)
+        if content is None:
+            return jsonify({'success': False, 'error': f"分析任务尚未完成: {profile['status']}"}), 409
+        return Response(content, mimetype='text/plain', headers={
+            'Content-Disposition': f'attachment; filename=profile-{profile_id[:8]}.collapsed'
+        })
+
+    def delete_profile(profile_id):
+        """删除任务"""
+        if not profiler.delete(profile_id):
+            return jsonify({'success': False, 'error': '分析任务不存在'}), 404
+        return jsonify({'success': True})
+
+    def protect(view):
+        for decorator in reversed(decorators):
+            view = decorator(view)
+        return view
+
+    bp.add_url_rule('/sample', view_func=protect(start_sample), methods=['POST'])
+    bp.add_url_rule('/arm', view_func=protect(arm_request), methods=['POST'])
+    bp.add_url_rule('/arm', view_func=protect(disarm_request), methods=['DELETE'])
+    bp.add_url_rule('/profiles', view_func=protect(list_profiles))
+    bp.add_url_rule('/profiles/<profile_id>', view_func=protect(get_profile))
+    bp.add_url_rule('/profiles/<profile_id>/collapsed', view_func=protect(download_collapsed))
+    bp.add_url_rule('/profiles/<profile_id>', view_func=protect(delete_profile), methods=['DELETE'])
+    app.register_blueprint(bp)
+    return app
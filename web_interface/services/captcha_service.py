@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图形验证码服务
+==============
+
+字体只加载一次，后台线程预先渲染验证码图片放入池中，请求时直接
+取用；验证码状态保存在带过期时间的内存存储中，不再写数据库。
+
+内存存储只在当前进程内可见：签发验证码和校验验证码的请求必须落在同一个
+进程上。部署时使用单个 worker（可用多线程，如 ``gunicorn -w 1 --threads 8``），
+或在反向代理上配置会话粘滞；多个 worker 轮询分发请求时校验会随机失败。
+"""
+
+import io
+import queue
+import random
+import secrets
+import string
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# 依次尝试的系统字体路径（macOS / Linux / Windows）
+FONT_CANDIDATES = [
+    '/System/Library/Fonts/Arial.ttf',
+    '/System/Library/Fonts/Supplemental/Arial.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    'C:\\Windows\\Fonts\\arial.ttf',
+]
+
+CAPTCHA_CHARS = string.ascii_uppercase + string.digits
+
+
+def _load_font(size: int = 20):
+    """加载验证码字体"""
+    for path in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(path, size)
+        except (OSError, IOError):
+            continue
+    return ImageFont.load_default()
+
+
+class CaptchaService:
+    """预渲染验证码池 + 过期内存存储"""
+
+    # verify() 的返回状态
+    OK = 'ok'
+    MISSING = 'missing'
+    EXPIRED = 'expired'
+    MISMATCH = 'mismatch'
+
+    def __init__(self, pool_size: int = 200, ttl_seconds: int = 300,
+                 max_sessions: int = 100000, length: int = 4,
+                 width: int = 120, height: int = 40):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.length = length
+        self.width = width
+        self.height = height
+        self.font = _load_font()
+
+        self._pool: 'queue.Queue[Tuple[str, bytes]]' = queue.Queue(maxsize=pool_size)
+        self._refill_thread: Optional[threading.Thread] = None
+        self._random = random.Random()
+
+        # session_id -> (code, png, expires_at, used)；TTL 固定，插入顺序即过期顺序
+        self._sessions: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {'issued': 0, 'pool_misses': 0, 'expired': 0}
+
+    # ------------------------------------------------------------------
+    # 渲染
+    # ------------------------------------------------------------------
+
+    def render(self) -> Tuple[str, bytes]:
+        """渲染一张验证码，返回 (文本, PNG字节)"""
+        rng = self._random
+        width, height = self.width, self.height
+        captcha_text = ''.join(secrets.choice(CAPTCHA_CHARS) for _ in range(self.length))
+
+        image = Image.new('RGB', (width, height), color='white')
+        draw = ImageDraw.Draw(image)
+
+        # 绘制背景干扰线
+        for _ in range(5):
+            draw.line([(rng.randint(0, width), rng.randint(0, height)),
+                       (rng.randint(0, width), rng.randint(0, height))],
+                      fill='lightgray', width=1)
+
+        # 绘制验证码文字
+        text_width = draw.textlength(captcha_text, font=self.font)
+        x = (width - text_width) // 2
+        y = (height - 20) // 2
+        draw.text((x, y), captcha_text, fill='black', font=self.font)
+
+        # 添加干扰点
+        for _ in range(50):
+            draw.point((rng.randint(0, width), rng.randint(0, height)), fill='lightgray')
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return captcha_text, buffer.getvalue()
+
+    def _refill(self):
+        """后台补充验证码池（池满时阻塞）"""
+        while True:
+            try:
+                self._pool.put(self.render())
+            except Exception as e:
+                print(f"❌ 验证码预渲染失败: {e}")
+                time.sleep(1)
+
+    def start(self):
+        """启动后台补充线程"""
+        if self._refill_thread and self._refill_thread.is_alive():
+            return
+        self._refill_thread = threading.Thread(target=self._refill, name='captcha-refill', daemon=True)
+        self._refill_thread.start()
+
+    def _take(self) -> Tuple[str, bytes]:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            self.stats['pool_misses'] += 1
+            return self.render()
+
+    # ------------------------------------------------------------------
+    # 会话存储
+    # ------------------------------------------------------------------
+
+    def _purge(self, now: float):
+        """移除已过期的会话，并为新会话腾出容量"""
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if entry[2] > now and len(self._sessions) < self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self.stats['expired'] += 1
+
+    def issue(self) -> str:
+        """签发新验证码，返回会话ID"""
+        self.start()
+        captcha_text, png = self._take()
+        session_id = secrets.token_urlsafe(32)
+        now = time.time()
+
+        with self._lock:
+            self._purge(now)
+            self._sessions[session_id] = [captcha_text, png, now + self.ttl_seconds, False]
+            self.stats['issued'] += 1
+        return session_id
+
+    def get_image(self, session_id: str) -> Optional[bytes]:
+        """获取验证码图片，会话不存在或过期时返回 None"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[2] <= time.time():
+                return None
+            return entry[1]
+
+    def verify(self, session_id: str, captcha_code: str, consume: bool = True) -> str:
+        """校验验证码，返回 OK / MISSING / EXPIRED / MISMATCH"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return self.MISSING
+
+            code, _, expires_at, used = entry
+            if used or expires_at <= time.time():
+                return self.EXPIRED
+
+            if code.upper() != (captcha_code or '').upper():
+                return self.MISMATCH
+
+            if consume:
+                entry[3] = True
+            return self.OK
@@ -7,22 +7,72 @@
 提供不同行业的演示数据生成功能
 """
 
+import hashlib
+import json
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
-from typing import Dict, List, Any
-import json
-import os
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+from .demo_data_engine import GenerationPlan, demo_anchor, generate_chunk
+
+# 分块生成时每块的行数
+DEFAULT_CHUNK_SIZE = 100000
+
+# 预览缓存：默认 seed、最多缓存的条目数和单个预览的最大行数
+PREVIEW_SEED = 0
+PREVIEW_CACHE_SIZE = 256
+PREVIEW_MAX_CACHED_ROWS = 1000
+# 预览允许的最大行数，更多数据使用 /api/demo/generate 的流式格式
+PREVIEW_MAX_ROWS = 10000
+
+
+class CachedResponse:
+    """缓存的响应数据，附带 ETag 和生成时间"""
+    
+    __slots__ = ('data', 'etag', 'last_modified')
+    
+    def __init__(self, data: Any, etag: str, last_modified: datetime):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+    
+    @classmethod
+    def build(cls, data: Any) -> 'CachedResponse':
+        body = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        # HTTP 时间只精确到秒
+        return cls(data, etag, datetime.now(timezone.utc).replace(microsecond=0))
+
 
 class DemoDataService:
     """演示数据生成服务"""
     
     def __init__(self):
         self.demo_configs = self._load_demo_configs()
+        self._plans = {}
+        
+        # 预览和数据集列表的响应缓存
+        self._cache: 'OrderedDict[tuple, CachedResponse]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        # 并行生成使用的进程池，首次需要时创建
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_workers = 0
+        self._executor_lock = threading.Lock()
     
     def _load_demo_configs(self) -> Dict[str, Any]:
-        """加载演示数据配置"""
+        """加载演示数据配置；各数据集的列定义见 services.demo_data_engine"""
+        past_year = {'unit': 'D', 'min': -365, 'max': 0}
+        past_quarter = {'unit': 'D', 'min': -90, 'max': 0}
+        past_month = {'unit': 'D', 'min': -30, 'max': 0}
+        categories = ['electronics', 'clothing', 'books', 'home', 'sports', 'beauty']
+        subjects = ['Math', 'English', 'Science', 'History', 'Art', 'PE']
+        severities = ['None', 'Minor', 'Major', 'Critical']
+
         return {
             'finance': {
                 'name': '金融行业数据',
@@ -30,21 +80,46 @@ class DemoDataService:
                 'datasets': {
                     'bank_customers': {
                         'name': '银行客户数据',
-                        'fields': ['customer_id', 'age', 'income', 'credit_score', 'loan_history'],
                         'size': 2000,
-                        'types': ['int', 'int', 'float', 'int', 'int']
+                        'columns': [
+                            {'name': 'customer_id', 'type': 'int', 'sequence': True},
+                            {'name': 'age', 'type': 'int', 'distribution': 'normal',
+                             'params': {'loc': 35, 'scale': 10}, 'clip': (18, 80)},
+                            {'name': 'income', 'type': 'float', 'distribution': 'lognormal',
+                             'params': {'mean': 10, 'sigma': 0.5}},
+                            {'name': 'credit_score', 'type': 'int', 'distribution': 'normal',
+                             'params': {'loc': 650, 'scale': 100}, 'clip': (300, 850)},
+                            {'name': 'loan_history', 'type': 'int', 'distribution': 'poisson',
+                             'params': {'lam': 2}, 'clip': (0, 10)}
+                        ]
                     },
                     'stock_trades': {
                         'name': '股票交易数据',
-                        'fields': ['stock_code', 'price', 'volume', 'timestamp', 'trade_type'],
                         'size': 5000,
-                        'types': ['str', 'float', 'int', 'datetime', 'str']
+                        'columns': [
+                            {'name': 'stock_code', 'type': 'str',
+                             'choices': ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX']},
+                            {'name': 'price', 'type': 'float', 'distribution': 'uniform',
+                             'params': {'low': 10, 'high': 500}},
+                            {'name': 'volume', 'type': 'int', 'distribution': 'poisson',
+                             'params': {'lam': 1000}},
+                            {'name': 'timestamp', 'type': 'datetime', 'window': past_year},
+                            {'name': 'trade_type', 'type': 'str', 'choices': ['buy', 'sell', 'hold']}
+                        ]
                     },
                     'insurance_claims': {
                         'name': '保险理赔数据',
-                        'fields': ['policy_id', 'claim_amount', 'accident_type', 'process_time', 'status'],
                         'size': 1500,
-                        'types': ['str', 'float', 'str', 'datetime', 'str']
+                        'columns': [
+                            {'name': 'policy_id', 'type': 'str', 'pattern': 'POL{seq:06d}'},
+                            {'name': 'claim_amount', 'type': 'float', 'distribution': 'lognormal',
+                             'params': {'mean': 8, 'sigma': 1}},
+                            {'name': 'accident_type', 'type': 'str',
+                             'choices': ['car', 'home', 'health', 'life', 'travel']},
+                            {'name': 'process_time', 'type': 'datetime', 'window': past_quarter},
+                            {'name': 'status', 'type': 'str',
+                             'choices': ['pending', 'approved', 'rejected', 'processing']}
+                        ]
                     }
                 }
             },
@@ -54,21 +129,46 @@ class DemoDataService:
                 'datasets': {
                     'user_purchases': {
                         'name': '用户购买数据',
-                        'fields': ['user_id', 'product_category', 'purchase_amount', 'rating', 'purchase_date'],
                         'size': 3000,
-                        'types': ['int', 'str', 'float', 'int', 'datetime']
+                        'columns': [
+                            {'name': 'user_id', 'type': 'int', 'distribution': 'integers',
+                             'params': {'low': 1, 'high': 10000}},
+                            {'name': 'product_category', 'type': 'str', 'choices': categories},
+                            {'name': 'purchase_amount', 'type': 'float', 'distribution': 'lognormal',
+                             'params': {'mean': 4, 'sigma': 1}},
+                            {'name': 'rating', 'type': 'int', 'distribution': 'integers',
+                             'params': {'low': 1, 'high': 6}},
+                            {'name': 'purchase_date', 'type': 'datetime', 'window': past_year}
+                        ]
                     },
                     'product_info': {
                         'name': '商品信息数据',
-                        'fields': ['product_id', 'price', 'stock', 'sales', 'category', 'brand'],
                         'size': 1000,
-                        'types': ['str', 'float', 'int', 'int', 'str', 'str']
+                        'columns': [
+                            {'name': 'product_id', 'type': 'str', 'pattern': 'PROD{seq:06d}'},
+                            {'name': 'price', 'type': 'float', 'distribution': 'lognormal',
+                             'params': {'mean': 3, 'sigma': 1}},
+                            {'name': 'stock', 'type': 'int', 'distribution': 'poisson',
+                             'params': {'lam': 100}},
+                            {'name': 'sales', 'type': 'int', 'distribution': 'poisson',
+                             'params': {'lam': 50}},
+                            {'name': 'category', 'type': 'str', 'choices': categories},
+                            {'name': 'brand', 'type': 'str',
+                             'choices': ['BrandA', 'BrandB', 'BrandC', 'BrandD', 'BrandE']}
+                        ]
                     },
                     'order_logistics': {
                         'name': '订单物流数据',
-                        'fields': ['order_id', 'delivery_address', 'delivery_status', 'delivery_time', 'tracking_code'],
                         'size': 2500,
-                        'types': ['str', 'str', 'str', 'datetime', 'str']
+                        'columns': [
+                            {'name': 'order_id', 'type': 'str', 'pattern': 'ORD{seq:08d}'},
+                            {'name': 'delivery_address', 'type': 'str',
+                             'choices': ['Beijing', 'Shanghai', 'Guangzhou', 'Shenzhen', 'Hangzhou', 'Nanjing']},
+                            {'name': 'delivery_status', 'type': 'str',
+                             'choices': ['pending', 'shipped', 'delivered', 'cancelled']},
+                            {'name': 'delivery_time', 'type': 'datetime', 'window': past_month},
+                            {'name': 'tracking_code', 'type': 'str', 'pattern': 'TRK{seq:010d}'}
+                        ]
                     }
                 }
             },
@@ -78,21 +178,49 @@ class DemoDataService:
                 'datasets': {
                     'patient_records': {
                         'name': '患者病历数据',
-                        'fields': ['patient_id', 'age', 'gender', 'diagnosis', 'treatment_cost', 'admission_date'],
                         'size': 2000,
-                        'types': ['str', 'int', 'str', 'str', 'float', 'datetime']
+                        'columns': [
+                            {'name': 'patient_id', 'type': 'str', 'pattern': 'PAT{seq:06d}'},
+                            {'name': 'age', 'type': 'int', 'distribution': 'normal',
+                             'params': {'loc': 45, 'scale': 20}, 'clip': (0, 100)},
+                            {'name': 'gender', 'type': 'str', 'choices': ['Male', 'Female', 'Other']},
+                            {'name': 'diagnosis', 'type': 'str',
+                             'choices': ['Hypertension', 'Diabetes', 'Flu', 'Pneumonia', 'Fracture', 'Headache']},
+                            {'name': 'treatment_cost', 'type': 'float', 'distribution': 'lognormal',
+                             'params': {'mean': 6, 'sigma': 1}},
+                            {'name': 'admission_date', 'type': 'datetime', 'window': past_year}
+                        ]
                     },
                     'drug_info': {
                         'name': '药品信息数据',
-                        'fields': ['drug_name', 'specification', 'price', 'stock', 'side_effects', 'manufacturer'],
                         'size': 800,
-                        'types': ['str', 'str', 'float', 'int', 'str', 'str']
+                        'columns': [
+                            {'name': 'drug_name', 'type': 'str', 'pattern': 'Drug{alpha}{cycle}'},
+                            {'name': 'specification', 'type': 'str',
+                             'choices': ['100mg', '200mg', '500mg', '1g', '2ml', '5ml']},
+                            {'name': 'price', 'type': 'float', 'distribution': 'uniform',
+                             'params': {'low': 10, 'high': 500}},
+                            {'name': 'stock', 'type': 'int', 'distribution': 'poisson',
+                             'params': {'lam': 100}},
+                            {'name': 'side_effects', 'type': 'str',
+                             'choices': ['Drowsiness', 'Nausea', 'Headache', 'None', 'Rash']},
+                            {'name': 'manufacturer', 'type': 'str',
+                             'choices': ['PharmaA', 'PharmaB', 'PharmaC', 'PharmaD']}
+                        ]
                     },
                     'medical_equipment': {
                         'name': '医疗设备数据',
-                        'fields': ['equipment_id', 'model', 'maintenance_record', 'usage_hours', 'last_maintenance'],
                         'size': 500,
-                        'types': ['str', 'str', 'str', 'int', 'datetime']
+                        'columns': [
+                            {'name': 'equipment_id', 'type': 'str', 'pattern': 'EQ{seq:04d}'},
+                            {'name': 'model', 'type': 'str',
+                             'choices': ['ModelA', 'ModelB', 'ModelC', 'ModelD']},
+                            {'name': 'maintenance_record', 'type': 'str',
+                             'choices': ['Regular', 'Emergency', 'Preventive', 'Repair']},
+                            {'name': 'usage_hours', 'type': 'int', 'distribution': 'poisson',
+                             'params': {'lam': 1000}},
+                            {'name': 'last_maintenance', 'type': 'datetime', 'window': past_quarter}
+                        ]
                     }
                 }
             },
@@ -102,21 +230,46 @@ class DemoDataService:
                 'datasets': {
                     'student_grades': {
                         'name': '学生成绩数据',
-                        'fields': ['student_id', 'course', 'grade', 'attendance_rate', 'homework_completion'],
                         'size': 3000,
-                        'types': ['str', 'str', 'float', 'float', 'float']
+                        'columns': [
+                            {'name': 'student_id', 'type': 'str', 'pattern': 'STU{seq:06d}'},
+                            {'name': 'course', 'type': 'str', 'choices': subjects},
+                            {'name': 'grade', 'type': 'float', 'distribution': 'normal',
+                             'params': {'loc': 75, 'scale': 15}, 'clip': (0, 100)},
+                            {'name': 'attendance_rate', 'type': 'float', 'distribution': 'uniform',
+                             'params': {'low': 0.6, 'high': 1.0}},
+                            {'name': 'homework_completion', 'type': 'float', 'distribution': 'uniform',
+                             'params': {'low': 0.5, 'high': 1.0}}
+                        ]
                     },
                     'teacher_info': {
                         'name': '教师信息数据',
-                        'fields': ['teacher_id', 'subject', 'experience_years', 'student_rating', 'salary'],
                         'size': 200,
-                        'types': ['str', 'str', 'int', 'float', 'float']
+                        'columns': [
+                            {'name': 'teacher_id', 'type': 'str', 'pattern': 'TCH{seq:04d}'},
+                            {'name': 'subject', 'type': 'str', 'choices': subjects},
+                            {'name': 'experience_years', 'type': 'int', 'distribution': 'poisson',
+                             'params': {'lam': 10}},
+                            {'name': 'student_rating', 'type': 'float', 'distribution': 'uniform',
+                             'params': {'low': 3.0, 'high': 5.0}},
+                            {'name': 'salary', 'type': 'float', 'distribution': 'normal',
+                             'params': {'loc': 50000, 'scale': 15000}}
+                        ]
                     },
                     'course_schedule': {
                         'name': '课程安排数据',
-                        'fields': ['course_id', 'schedule_time', 'classroom', 'teacher_id', 'student_count'],
                         'size': 500,
-                        'types': ['str', 'datetime', 'str', 'str', 'int']
+                        'columns': [
+                            {'name': 'course_id', 'type': 'str', 'pattern': 'CRS{seq:04d}'},
+                            {'name': 'schedule_time', 'type': 'datetime',
+                             'window': {'unit': 'h', 'min': 8, 'max': 18}},
+                            {'name': 'classroom', 'type': 'str',
+                             'choices': ['Room101', 'Room102', 'Room103', 'Room201', 'Room202']},
+                            {'name': 'teacher_id', 'type': 'str', 'pattern': 'TCH{rand:04d}',
+                             'range': (1, 200)},
+                            {'name': 'student_count', 'type': 'int', 'distribution': 'poisson',
+                             'params': {'lam': 25}}
+                        ]
                     }
                 }
             },
@@ -126,26 +279,59 @@ class DemoDataService:
                 'datasets': {
                     'production_equipment': {
                         'name': '生产设备数据',
-                        'fields': ['equipment_id', 'operation_status', 'fault_record', 'maintenance_time', 'efficiency'],
                         'size': 1000,
-                        'types': ['str', 'str', 'str', 'datetime', 'float']
+                        'columns': [
+                            {'name': 'equipment_id', 'type': 'str', 'pattern': 'EQ{seq:04d}'},
+                            {'name': 'operation_status', 'type': 'str',
+                             'choices': ['Running', 'Stopped', 'Maintenance', 'Error']},
+                            {'name': 'fault_record', 'type': 'str', 'choices': severities},
+                            {'name': 'maintenance_time', 'type': 'datetime', 'window': past_month},
+                            {'name': 'efficiency', 'type': 'float', 'distribution': 'uniform',
+                             'params': {'low': 0.6, 'high': 1.0}}
+                        ]
                     },
                     'product_quality': {
                         'name': '产品质量数据',
-                        'fields': ['product_id', 'quality_result', 'defect_type', 'batch_number', 'inspection_date'],
                         'size': 2000,
-                        'types': ['str', 'str', 'str', 'str', 'datetime']
+                        'columns': [
+                            {'name': 'product_id', 'type': 'str', 'pattern': 'PROD{seq:06d}'},
+                            {'name': 'quality_result', 'type': 'str', 'choices': ['Pass', 'Fail', 'Rework']},
+                            {'name': 'defect_type', 'type': 'str', 'choices': severities},
+                            {'name': 'batch_number', 'type': 'str', 'pattern': 'BATCH{rand:03d}',
+                             'range': (1, 100)},
+                            {'name': 'inspection_date', 'type': 'datetime', 'window': past_month}
+                        ]
                     },
                     'supply_chain': {
                         'name': '供应链数据',
-                        'fields': ['supplier_id', 'material_type', 'price', 'delivery_time', 'quality_rating'],
                         'size': 800,
-                        'types': ['str', 'str', 'float', 'datetime', 'int']
+                        'columns': [
+                            {'name': 'supplier_id', 'type': 'str', 'pattern': 'SUP{seq:04d}'},
+                            {'name': 'material_type', 'type': 'str',
+                             'choices': ['Raw Material', 'Component', 'Assembly', 'Packaging']},
+                            {'name': 'price', 'type': 'float', 'distribution': 'lognormal',
+                             'params': {'mean': 3, 'sigma': 1}},
+                            {'name': 'delivery_time', 'type': 'datetime',
+                             'window': {'unit': 'D', 'min': 1, 'max': 30}},
+                            {'name': 'quality_rating', 'type': 'int', 'distribution': 'integers',
+                             'params': {'low': 1, 'high': 6}}
+                        ]
                     }
                 }
             }
         }
     
+    def register_dataset(self, industry_id: str, dataset_id: str, config: Dict[str, Any]):
+        """注册新的演示数据集，config 需包含 name、size 和 columns"""
+        if industry_id not in self.demo_configs:
+            raise ValueError(f"不支持的行业: {industry_id}")
+        
+        # 先编译，列定义有误时直接报错而不是在生成时才发现
+        plan = GenerationPlan(config['columns'])
+        self.demo_configs[industry_id]['datasets'][dataset_id] = config
+        self._plans[(industry_id, dataset_id)] = plan
+        self._invalidate(industry_id, dataset_id)
+    
     def get_demo_industries(self) -> List[Dict[str, str]]:
         """获取可用的演示行业列表"""
         return [
@@ -157,254 +343,204 @@ class DemoDataService:
         """获取指定行业的演示数据集列表"""
         if industry_id not in self.demo_configs:
             return []
+        return self.get_demo_datasets_entry(industry_id).data
+    
+    def get_demo_datasets_entry(self, industry_id: str) -> CachedResponse:
+        """获取指定行业的演示数据集列表（缓存，带 ETag）"""
+        if industry_id not in self.demo_configs:
+            raise ValueError(f"不支持的行业: {industry_id}")
         
-        industry_config = self.demo_configs[industry_id]
-        return [
+        return self._cached(('datasets', industry_id), lambda: [
             {
                 'id': dataset_id,
                 'name': dataset_config['name'],
-                'fields': dataset_config['fields'],
+                'fields': [column['name'] for column in dataset_config['columns']],
                 'size': dataset_config['size'],
-                'types': dataset_config['types']
+                'types': [column['type'] for column in dataset_config['columns']]
             }
-            for dataset_id, dataset_config in industry_config['datasets'].items()
-        ]
+            for dataset_id, dataset_config in self.demo_configs[industry_id]['datasets'].items()
+        ])
     
-    def generate_demo_data(self, industry_id: str, dataset_id: str, size: int = None) -> pd.DataFrame:
-        """生成演示数据"""
+    def _get_plan(self, industry_id: str, dataset_id: str) -> GenerationPlan:
+        """获取数据集的生成计划，首次使用时编译并缓存"""
         if industry_id not in self.demo_configs:
             raise ValueError(f"不支持的行业: {industry_id}")
         
         if dataset_id not in self.demo_configs[industry_id]['datasets']:
             raise ValueError(f"不支持的数据集: {dataset_id}")
         
-        dataset_config = self.demo_configs[industry_id]['datasets'][dataset_id]
-        actual_size = size or dataset_config['size']
-        
-        # 根据数据集类型生成数据
-        if industry_id == 'finance':
-            return self._generate_finance_data(dataset_id, actual_size)
-        elif industry_id == 'ecommerce':
-            return self._generate_ecommerce_data(dataset_id, actual_size)
-        elif industry_id == 'healthcare':
-            return self._generate_healthcare_data(dataset_id, actual_size)
-        elif industry_id == 'education':
-            return self._generate_education_data(dataset_id, actual_size)
-        elif industry_id == 'manufacturing':
-            return self._generate_manufacturing_data(dataset_id, actual_size)
-        else:
-            raise ValueError(f"不支持的行业: {industry_id}")
+        key = (industry_id, dataset_id)
+        plan = self._plans.get(key)
+        if plan is None:
+            dataset_config = self.demo_configs[industry_id]['datasets'][dataset_id]
+            plan = self._plans[key] = GenerationPlan(dataset_config['columns'])
+        return plan
     
-    def _generate_finance_data(self, dataset_id: str, size: int) -> pd.DataFrame:
-        """生成金融行业数据"""
-        if dataset_id == 'bank_customers':
-            data = {
-                'customer_id': range(1, size + 1),
-                'age': np.random.normal(35, 10, size).astype(int),
-                'income': np.random.lognormal(10, 0.5, size),
-                'credit_score': np.random.normal(650, 100, size).astype(int),
-                'loan_history': np.random.poisson(2, size)
-            }
-            # 确保年龄在合理范围内
-            data['age'] = np.clip(data['age'], 18, 80)
-            data['credit_score'] = np.clip(data['credit_score'], 300, 850)
-            data['loan_history'] = np.clip(data['loan_history'], 0, 10)
-            
-        elif dataset_id == 'stock_trades':
-            stock_codes = ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX']
-            trade_types = ['buy', 'sell', 'hold']
-            
-            data = {
-                'stock_code': np.random.choice(stock_codes, size),
-                'price': np.random.uniform(10, 500, size),
-                'volume': np.random.poisson(1000, size),
-                'timestamp': [datetime.now() - timedelta(days=random.randint(0, 365)) for _ in range(size)],
-                'trade_type': np.random.choice(trade_types, size)
-            }
-            
-        elif dataset_id == 'insurance_claims':
-            accident_types = ['car', 'home', 'health', 'life', 'travel']
-            statuses = ['pending', 'approved', 'rejected', 'processing']
-            
-            data = {
-                'policy_id': [f'POL{str(i).zfill(6)}' for i in range(1, size + 1)],
-                'claim_amount': np.random.lognormal(8, 1, size),
-                'accident_type': np.random.choice(accident_types, size),
-                'process_time': [datetime.now() - timedelta(days=random.randint(0, 90)) for _ in range(size)],
-                'status': np.random.choice(statuses, size)
-            }
+    def generate_demo_data(self, industry_id: str, dataset_id: str, size: int = None,
+                           seed: Optional[int] = None, workers: int = 1,
+                           anchor: Any = None) -> pd.DataFrame:
+        """
+        生成演示数据
         
-        return pd.DataFrame(data)
-    
-    def _generate_ecommerce_data(self, dataset_id: str, size: int) -> pd.DataFrame:
-        """生成电商行业数据"""
-        if dataset_id == 'user_purchases':
-            categories = ['electronics', 'clothing', 'books', 'home', 'sports', 'beauty']
-            
-            data = {
-                'user_id': np.random.randint(1, 10000, size),
-                'product_category': np.random.choice(categories, size),
-                'purchase_amount': np.random.lognormal(4, 1, size),
-                'rating': np.random.randint(1, 6, size),
-                'purchase_date': [datetime.now() - timedelta(days=random.randint(0, 365)) for _ in range(size)]
-            }
-            
-        elif dataset_id == 'product_info':
-            categories = ['electronics', 'clothing', 'books', 'home', 'sports', 'beauty']
-            brands = ['BrandA', 'BrandB', 'BrandC', 'BrandD', 'BrandE']
-            
-            data = {
-                'product_id': [f'PROD{str(i).zfill(6)}' for i in range(1, size + 1)],
-                'price': np.random.lognormal(3, 1, size),
-                'stock': np.random.poisson(100, size),
-                'sales': np.random.poisson(50, size),
-                'category': np.random.choice(categories, size),
-                'brand': np.random.choice(brands, size)
-            }
-            
-        elif dataset_id == 'order_logistics':
-            addresses = ['Beijing', 'Shanghai', 'Guangzhou', 'Shenzhen', 'Hangzhou', 'Nanjing']
-            statuses = ['pending', 'shipped', 'delivered', 'cancelled']
-            
-            data = {
-                'order_id': [f'ORD{str(i).zfill(8)}' for i in range(1, size + 1)],
-                'delivery_address': np.random.choice(addresses, size),
-                'delivery_status': np.random.choice(statuses, size),
-                'delivery_time': [datetime.now() - timedelta(days=random.randint(0, 30)) for _ in range(size)],
-                'tracking_code': [f'TRK{str(i).zfill(10)}' for i in range(1, size + 1)]
-            }
+        anchor 为时间列的基准时间（见 demo_anchor），默认当天零点（UTC）。
+        workers > 1 时在进程池中并行生成各数据块。相同 seed 和 anchor 的结果
+        与 workers 无关，也与 iter_demo_data 分块拼接的结果一致。
+        """
+        chunks = list(self._iter_chunk_columns(industry_id, dataset_id, size, seed,
+                                               DEFAULT_CHUNK_SIZE, workers, anchor))
+        if len(chunks) == 1:
+            return pd.DataFrame(chunks[0], copy=False)
         
-        return pd.DataFrame(data)
+        # 直接按列拼接数组，每列只复制一次
+        return pd.DataFrame({
+            name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]
+        }, copy=False)
     
-    def _generate_healthcare_data(self, dataset_id: str, size: int) -> pd.DataFrame:
-        """生成医疗行业数据"""
-        if dataset_id == 'patient_records':
-            genders = ['Male', 'Female', 'Other']
-            diagnoses = ['Hypertension', 'Diabetes', 'Flu', 'Pneumonia', 'Fracture', 'Headache']
-            
-            data = {
-                'patient_id': [f'PAT{str(i).zfill(6)}' for i in range(1, size + 1)],
-                'age': np.random.normal(45, 20, size).astype(int),
-                'gender': np.random.choice(genders, size),
-                'diagnosis': np.random.choice(diagnoses, size),
-                'treatment_cost': np.random.lognormal(6, 1, size),
-                'admission_date': [datetime.now() - timedelta(days=random.randint(0, 365)) for _ in range(size)]
-            }
-            data['age'] = np.clip(data['age'], 0, 100)
-            
-        elif dataset_id == 'drug_info':
-            specifications = ['100mg', '200mg', '500mg', '1g', '2ml', '5ml']
-            side_effects = ['Drowsiness', 'Nausea', 'Headache', 'None', 'Rash']
-            manufacturers = ['PharmaA', 'PharmaB', 'PharmaC', 'PharmaD']
-            
-            data = {
-                'drug_name': [f'Drug{chr(65 + i % 26)}{i // 26 + 1}' for i in range(size)],
-                'specification': np.random.choice(specifications, size),
-                'price': np.random.uniform(10, 500, size),
-                'stock': np.random.poisson(100, size),
-                'side_effects': np.random.choice(side_effects, size),
-                'manufacturer': np.random.choice(manufacturers, size)
-            }
-            
-        elif dataset_id == 'medical_equipment':
-            models = ['ModelA', 'ModelB', 'ModelC', 'ModelD']
-            maintenance_records = ['Regular', 'Emergency', 'Preventive', 'Repair']
-            
-            data = {
-                'equipment_id': [f'EQ{str(i).zfill(4)}' for i in range(1, size + 1)],
-                'model': np.random.choice(models, size),
-                'maintenance_record': np.random.choice(maintenance_records, size),
-                'usage_hours': np.random.poisson(1000, size),
-                'last_maintenance': [datetime.now() - timedelta(days=random.randint(0, 90)) for _ in range(size)]
-            }
+    def iter_demo_data(self, industry_id: str, dataset_id: str, size: int = None,
+                       seed: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       workers: int = 1, anchor: Any = None) -> Iterator[pd.DataFrame]:
+        """
+        分块生成演示数据，每块最多 chunk_size 行
         
-        return pd.DataFrame(data)
+        每块使用 SeedSequence(seed).spawn() 派生的独立随机流，分块结果只取决于
+        seed、anchor 和块序号，可单独或并行生成。参数在调用时即校验，不必等到迭代。
+        """
+        chunks = self._iter_chunk_columns(industry_id, dataset_id, size, seed, chunk_size,
+                                          workers, anchor)
+        return (pd.DataFrame(columns, copy=False) for columns in chunks)
     
-    def _generate_education_data(self, dataset_id: str, size: int) -> pd.DataFrame:
-        """生成教育行业数据"""
-        if dataset_id == 'student_grades':
-            courses = ['Math', 'English', 'Science', 'History', 'Art', 'PE']
-            
-            data = {
-                'student_id': [f'STU{str(i).zfill(6)}' for i in range(1, size + 1)],
-                'course': np.random.choice(courses, size),
-                'grade': np.random.normal(75, 15, size),
-                'attendance_rate': np.random.uniform(0.6, 1.0, size),
-                'homework_completion': np.random.uniform(0.5, 1.0, size)
-            }
-            data['grade'] = np.clip(data['grade'], 0, 100)
-            
-        elif dataset_id == 'teacher_info':
-            subjects = ['Math', 'English', 'Science', 'History', 'Art', 'PE']
-            
-            data = {
-                'teacher_id': [f'TCH{str(i).zfill(4)}' for i in range(1, size + 1)],
-                'subject': np.random.choice(subjects, size),
-                'experience_years': np.random.poisson(10, size),
-                'student_rating': np.random.uniform(3.0, 5.0, size),
-                'salary': np.random.normal(50000, 15000, size)
-            }
-            
-        elif dataset_id == 'course_schedule':
-            classrooms = ['Room101', 'Room102', 'Room103', 'Room201', 'Room202']
-            
-            data = {
-                'course_id': [f'CRS{str(i).zfill(4)}' for i in range(1, size + 1)],
-                'schedule_time': [datetime.now() + timedelta(hours=random.randint(8, 18)) for _ in range(size)],
-                'classroom': np.random.choice(classrooms, size),
-                'teacher_id': [f'TCH{str(random.randint(1, 200)).zfill(4)}' for _ in range(size)],
-                'student_count': np.random.poisson(25, size)
-            }
+    def _iter_chunk_columns(self, industry_id: str, dataset_id: str, size: Optional[int],
+                            seed: Optional[int], chunk_size: int, workers: int,
+                            anchor: Any = None) -> Iterator[Dict[str, np.ndarray]]:
+        """按顺序产出各数据块的列数组；校验在调用时完成"""
+        self._get_plan(industry_id, dataset_id)
+        dataset_config = self.demo_configs[industry_id]['datasets'][dataset_id]
+        actual_size = size or dataset_config['size']
+        if actual_size < 0:
+            raise ValueError(f"数据量无效: {actual_size}")
+        if workers < 1:
+            raise ValueError(f"并行进程数无效: {workers}")
         
-        return pd.DataFrame(data)
+        # 基准时间只在这里确定一次，随任务传给各数据块（包括进程池中的任务），
+        # 各块不再自行取当前时间
+        anchor = demo_anchor(anchor)
+        chunk_seeds = self._spawn_chunk_seeds(seed, actual_size, chunk_size)
+        columns = dataset_config['columns']
+        plan_key = repr(columns)
+        tasks = [
+            (plan_key, columns, min(chunk_size, actual_size - index * chunk_size),
+             chunk_seed, anchor, index * chunk_size)
+            for index, chunk_seed in enumerate(chunk_seeds)
+        ]
+        
+        if workers == 1 or len(tasks) == 1:
+            plan = self._plans[(industry_id, dataset_id)]
+            return (plan.generate_columns(rows, np.random.default_rng(chunk_seed), chunk_anchor, start)
+                    for _, _, rows, chunk_seed, chunk_anchor, start in tasks)
+        return self._run_parallel(tasks, workers)
     
-    def _generate_manufacturing_data(self, dataset_id: str, size: int) -> pd.DataFrame:
-        """生成制造业数据"""
-        if dataset_id == 'production_equipment':
-            statuses = ['Running', 'Stopped', 'Maintenance', 'Error']
-            fault_records = ['None', 'Minor', 'Major', 'Critical']
-            
-            data = {
-                'equipment_id': [f'EQ{str(i).zfill(4)}' for i in range(1, size + 1)],
-                'operation_status': np.random.choice(statuses, size),
-                'fault_record': np.random.choice(fault_records, size),
-                'maintenance_time': [datetime.now() - timedelta(days=random.randint(0, 30)) for _ in range(size)],
-                'efficiency': np.random.uniform(0.6, 1.0, size)
-            }
-            
-        elif dataset_id == 'product_quality':
-            quality_results = ['Pass', 'Fail', 'Rework']
-            defect_types = ['None', 'Minor', 'Major', 'Critical']
-            
-            data = {
-                'product_id': [f'PROD{str(i).zfill(6)}' for i in range(1, size + 1)],
-                'quality_result': np.random.choice(quality_results, size),
-                'defect_type': np.random.choice(defect_types, size),
-                'batch_number': [f'BATCH{str(random.randint(1, 100)).zfill(3)}' for _ in range(size)],
-                'inspection_date': [datetime.now() - timedelta(days=random.randint(0, 30)) for _ in range(size)]
-            }
-            
-        elif dataset_id == 'supply_chain':
-            material_types = ['Raw Material', 'Component', 'Assembly', 'Packaging']
-            
-            data = {
-                'supplier_id': [f'SUP{str(i).zfill(4)}' for i in range(1, size + 1)],
-                'material_type': np.random.choice(material_types, size),
-                'price': np.random.lognormal(3, 1, size),
-                'delivery_time': [datetime.now() + timedelta(days=random.randint(1, 30)) for _ in range(size)],
-                'quality_rating': np.random.randint(1, 6, size)
+    def _get_executor(self, workers: int) -> ProcessPoolExecutor:
+        # 延迟创建；需要更多进程时重建进程池
+        with self._executor_lock:
+            if self._executor is None or self._executor_workers < workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+                self._executor_workers = workers
+            return self._executor
+    
+    def _run_parallel(self, tasks: List[tuple], workers: int) -> Iterator[Dict[str, np.ndarray]]:
+        """在进程池中生成数据块，按块序号依次产出；同时在途的块数不超过 workers"""
+        executor = self._get_executor(workers)
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(executor.submit(generate_chunk, *task))
+                if len(pending) >= workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def shutdown(self):
+        """关闭并行生成使用的进程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                self._executor_workers = 0
+    
+    @staticmethod
+    def _spawn_chunk_seeds(seed: Optional[int], size: int, chunk_size: int) -> List[np.random.SeedSequence]:
+        """为每个数据块派生独立的随机种子"""
+        if chunk_size <= 0:
+            raise ValueError(f"分块大小无效: {chunk_size}")
+        n_chunks = max(1, -(-size // chunk_size))
+        return np.random.SeedSequence(seed).spawn(n_chunks)
+    
+    def get_data_sample(self, industry_id: str, dataset_id: str, sample_size: int = 10,
+                        seed: Optional[int] = PREVIEW_SEED, anchor: Any = None) -> Dict[str, Any]:
+        """获取数据样本（用于预览）"""
+        return self.get_data_sample_entry(industry_id, dataset_id, sample_size, seed, anchor).data
+    
+    def get_data_sample_entry(self, industry_id: str, dataset_id: str, sample_size: int = 10,
+                              seed: Optional[int] = PREVIEW_SEED, anchor: Any = None) -> CachedResponse:
+        """
+        获取数据样本（缓存，带 ETag）
+        
+        默认使用固定 seed，同一预览在同一基准时间下每次返回相同数据，可直接从
+        缓存读取；seed 为 None 或样本超过 PREVIEW_MAX_CACHED_ROWS 时每次重新生成。
+        sample_size 超出 1..PREVIEW_MAX_ROWS、seed 为负数或 anchor 格式无效时抛出 ValueError。
+        """
+        if not 1 <= sample_size <= PREVIEW_MAX_ROWS:
+            raise ValueError(f"样本行数必须在 1 到 {PREVIEW_MAX_ROWS} 之间: {sample_size}")
+        if seed is not None and seed < 0:
+            raise ValueError(f"seed 必须是非负整数: {seed}")
+        anchor = demo_anchor(anchor)
+        
+        def build():
+            df = self.generate_demo_data(industry_id, dataset_id, sample_size, seed, anchor=anchor)
+            return {
+                'columns': df.columns.tolist(),
+                'types': df.dtypes.astype(str).to_dict(),
+                'sample_data': df.head(sample_size).to_dict('records'),
+                'total_rows': len(df)
             }
         
-        return pd.DataFrame(data)
+        if seed is None or sample_size > PREVIEW_MAX_CACHED_ROWS:
+            return CachedResponse.build(build())
+        
+        self._get_plan(industry_id, dataset_id)
+        return self._cached(('sample', industry_id, dataset_id, sample_size, seed, anchor), build)
     
-    def get_data_sample(self, industry_id: str, dataset_id: str, sample_size: int = 10) -> Dict[str, Any]:
-        """获取数据样本（用于预览）"""
-        df = self.generate_demo_data(industry_id, dataset_id, sample_size)
+    def warm_previews(self, sample_size: int = 10):
+        """预先生成所有数据集列表和默认预览"""
+        for industry_id, industry_config in self.demo_configs.items():
+            self.get_demo_datasets_entry(industry_id)
+            for dataset_id in industry_config['datasets']:
+                self.get_data_sample_entry(industry_id, dataset_id, sample_size)
+    
+    def _cached(self, key: tuple, build: Callable[[], Any]) -> CachedResponse:
+        """从预览缓存读取，未命中时生成并写入（LRU）"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                return entry
         
-        return {
-            'columns': df.columns.tolist(),
-            'types': df.dtypes.astype(str).to_dict(),
-            'sample_data': df.head(sample_size).to_dict('records'),
-            'total_rows': len(df)
-        }
-
+        entry = CachedResponse.build(build())
+        with self._cache_lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > PREVIEW_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return entry
+    
+    def _invalidate(self, industry_id: str, dataset_id: str):
+        """数据集定义变化后清除相关缓存"""
+        with self._cache_lock:
+            for key in list(self._cache):
+                if key[1] == industry_id and (key[0] == 'datasets' or key[2] == dataset_id):
+                    del self._cache[key]
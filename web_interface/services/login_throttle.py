@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录限流服务
+============
+
+基于内存滑动窗口统计登录失败次数，按邮箱和IP分片加锁；
+登录尝试记录由后台线程批量写入数据库，不再阻塞登录请求。
+"""
+
+import time
+import queue
+import threading
+import zlib
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+
+class _Shard:
+    """滑动窗口分片"""
+
+    __slots__ = ('lock', 'windows')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.windows: Dict[str, Deque[float]] = {}
+
+
+class LoginThrottle:
+    """登录失败滑动窗口计数器 + 登录记录批量写入器"""
+
+    def __init__(self, window_seconds: int = 15 * 60, shards: int = 16,
+                 writer: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 batch_size: int = 100, flush_interval: float = 1.0):
+        self.window_seconds = window_seconds
+        self._shards = [_Shard() for _ in range(shards)]
+
+        # 批量写入
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'written': 0, 'batches': 0, 'write_errors': 0}
+
+    # ------------------------------------------------------------------
+    # 滑动窗口
+    # ------------------------------------------------------------------
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode('utf-8')) % len(self._shards)]
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return 'email:' + email.lower().strip()
+
+    @staticmethod
+    def _ip_key(ip_address: str) -> str:
+        return 'ip:' + ip_address
+
+    def _prune(self, window: Deque[float], now: float):
+        cutoff = now - self.window_seconds
+        while window and window[0] <= cutoff:
+            window.popleft()
+
+    def _add_failure(self, key: str, timestamp: float):
+        shard = self._shard(key)
+        with shard.lock:
+            window = shard.windows.setdefault(key, deque())
+            window.append(timestamp)
+            self._prune(window, timestamp)
+
+    def _count(self, key: str, now: float) -> int:
+        shard = self._shard(key)
+        with shard.lock:
+            window = shard.windows.get(key)
+            if not window:
+                return 0
+            self._prune(window, now)
+            if not window:
+                del shard.windows[key]
+                return 0
+            return len(window)
+
+    def failure_count(self, email: Optional[str] = None,
+                      ip_address: Optional[str] = None) -> Dict[str, int]:
+        """返回窗口内按邮箱和IP统计的失败次数"""
+        now = time.time()
+        return {
+            'email': self._count(self._email_key(email), now) if email else 0,
+            'ip': self._count(self._ip_key(ip_address), now) if ip_address else 0
+        }
+
+    def load_failures(self, attempts: Iterable[Dict[str, Any]]):
+        """从数据库中的近期失败记录预热窗口（需按时间升序）"""
+        for attempt in attempts:
+            timestamp = attempt['timestamp']
+            if attempt.get('email'):
+                self._add_failure(self._email_key(attempt['email']), timestamp)
+            if attempt.get('ip_address'):
+                self._add_failure(self._ip_key(attempt['ip_address']), timestamp)
+
+    def sweep(self) -> int:
+        """清理已无失败记录的窗口，返回清理的键数量"""
+        now = time.time()
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                for key in list(shard.windows):
+                    window = shard.windows[key]
+                    self._prune(window, now)
+                    if not window:
+                        del shard.windows[key]
+                        removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # 登录记录
+    # ------------------------------------------------------------------
+
+    def record(self, email: str, ip_address: Optional[str], success: bool,
+               **extra: Any):
+        """记录一次登录尝试；失败计入滑动窗口，记录异步写库"""
+        now = time.time()
+        if not success:
+            self._add_failure(self._email_key(email), now)
+            if ip_address:
+                self._add_failure(self._ip_key(ip_address), now)
+
+        if self.writer is not None:
+            attempt = {'email': email, 'ip_address': ip_address, 'success': success}
+            attempt.update(extra)
+            self._queue.put(attempt)
+
+    def start(self):
+        """启动后台写入线程"""
+        if self.writer is None or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='login-attempt-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台线程并写入剩余记录"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        last_sweep = time.time()
+        while not self._stop_event.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch)
+
+            if time.time() - last_sweep > self.window_seconds:
+                self.sweep()
+                last_sweep = time.time()
+
+    def _drain(self, block: bool) -> List[Dict[str, Any]]:
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def flush(self):
+        """立即写入队列中的全部记录"""
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            self.writer(batch)
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+        except Exception as e:
+            self.stats['write_errors'] += 1
+            print(f"❌ 登录记录写入失败: {e}")
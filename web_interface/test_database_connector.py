@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量抽取测试
+============
+
+使用本地 SQLite 数据库验证 Arrow 批量抽取:
+
+- 抽取到列式缓存后由 read_cached 读回完整的表数据
+- 凭据无效时不报告缓存命中，也不返回缓存数据
+- /api/datasource/load 从缓存创建会话，供生成、评估和下载使用
+- 安装 adbc-driver-sqlite 时经 ADBC 读取，前几批整列为空的文本和浮点列
+  仍得到声明的类型
+
+依赖 pyarrow（可选依赖），未安装时跳过；ADBC 测试另需 adbc-driver-sqlite。
+
+运行: python -m unittest test_database_connector
+"""
+
+import importlib.util
+import os
+from decimal import Decimal
+import sqlite3
+import tempfile
+import unittest
+
+import utils.columnar_cache as columnar_cache
+from utils.columnar_cache import ColumnarCache
+from utils.database_connector import DatabaseConnector
+from utils.dialects import register_dialect
+from utils.dialects.sqlite import SQLiteDialect
+
+
+class PasswordSQLiteDialect(SQLiteDialect):
+    """校验密码的 SQLite 方言，模拟需要认证的数据库"""
+
+    name = 'sqlite_auth'
+
+    def connect(self, config):
+        if config.get('password') != 'secret':
+            raise sqlite3.OperationalError('access denied')
+        return super().connect(config)
+
+
+register_dialect('sqlite_auth', PasswordSQLiteDialect)
+
+
+@unittest.skipUnless(importlib.util.find_spec('pyarrow'), '需要 pyarrow')
+class ExtractToCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'source.db')
+        connection = sqlite3.connect(self.database)
+        connection.execute('CREATE TABLE people (id INTEGER, name TEXT, score REAL)')
+        connection.executemany('INSERT INTO people VALUES (?, ?, ?)',
+                               [(i, f'用户{i}', i / 3) for i in range(500)])
+        connection.commit()
+        connection.close()
+
+        self.cache = ColumnarCache(os.path.join(self.tmp.name, 'cache'))
+        self.connector = DatabaseConnector()
+        self.config = {'type': 'sqlite_auth', 'database': self.database, 'password': 'secret'}
+
+    def tearDown(self):
+        self.connector.close()
+        self.tmp.cleanup()
+
+    def test_read_cached_returns_extracted_table(self):
+        self.assertIsNone(self.connector.read_cached(self.config, 'people', cache=self.cache))
+
+        result = self.connector.extract_to_cache(self.config, 'people', cache=self.cache, batch_size=64)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['rows'], 500)
+
+        df = self.connector.read_cached(self.config, 'people', cache=self.cache)
+        self.assertEqual(len(df), 500)
+        self.assertEqual(sorted(df['id']), list(range(500)))
+        self.assertEqual(df.loc[df['id'] == 7, 'name'].item(), '用户7')
+
+    def test_wrong_password_is_not_a_cache_hit(self):
+        self.assertTrue(self.connector.extract_to_cache(self.config, 'people', cache=self.cache)['success'])
+
+        wrong = dict(self.config, password='guess')
+        result = self.connector.extract_to_cache(wrong, 'people', cache=self.cache)
+        self.assertFalse(result['success'])
+        self.assertNotIn('key', result)
+        with self.assertRaises(PermissionError):
+            self.connector.read_cached(wrong, 'people', cache=self.cache)
+
+        result = self.connector.extract_to_cache(self.config, 'people', cache=self.cache)
+        self.assertTrue(result['cached'])
+
+    def test_rounded_key_range_keeps_boundary_rows(self):
+        # 模拟 NUMERIC 键转换为浮点数后下界偏大、上界偏小
+        original = PasswordSQLiteDialect.key_range
+        PasswordSQLiteDialect.key_range = lambda *args: (Decimal('0.0000001'), Decimal('498.9999999'))
+        try:
+            table = self.connector.read_arrow(self.config, 'people', partition_on='id', partitions=4)
+        finally:
+            PasswordSQLiteDialect.key_range = original
+        self.assertEqual(sorted(table.column('id').to_pylist()), list(range(500)))
+
+    def test_load_route_creates_session(self):
+        import app_simple
+
+        previous, columnar_cache._default_cache = columnar_cache._default_cache, self.cache
+        try:
+            client = app_simple.app.test_client()
+            request = dict(self.config, table_name='people')
+
+            self.assertEqual(client.post('/api/datasource/load', json=request).status_code, 404)
+            self.assertTrue(client.post('/api/datasource/extract', json=request).get_json()['success'])
+            self.assertEqual(client.post('/api/datasource/load',
+                                         json=dict(request, password='guess')).status_code, 403)
+
+            loaded = client.post('/api/datasource/load', json=request).get_json()
+            self.assertTrue(loaded['success'], loaded)
+            self.assertEqual(loaded['data_info']['shape'], [500, 3])
+
+            session = app_simple.session_data[loaded['session_id']]
+            self.assertEqual(len(session['dataframe']), 500)
+            self.assertEqual(session['filename'], 'people.csv')
+        finally:
+            columnar_cache._default_cache = previous
+
+
+@unittest.skipUnless(importlib.util.find_spec('pyarrow') and importlib.util.find_spec('adbc_driver_sqlite'),
+                     '需要 pyarrow 和 adbc-driver-sqlite')
+class SQLiteArrowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.tmp.name, 'source.db')
+        connection = sqlite3.connect(self.database)
+        connection.execute('CREATE TABLE t (id INTEGER, name TEXT, score REAL, amount NUMERIC, note)')
+        connection.executemany('INSERT INTO t VALUES (?, ?, ?, ?, ?)', [
+            (i, None if i < 30 else f'名称{i}', None if i < 30 else i / 3,
+             i if i < 60 else i + 0.5, None)
+            for i in range(100)
+        ])
+        connection.commit()
+        connection.close()
+
+        self.connector = DatabaseConnector()
+        self.config = {'type': 'sqlite', 'database': self.database}
+
+    def tearDown(self):
+        self.connector.close()
+        self.tmp.cleanup()
+
+    def read(self, **kwargs):
+        dialect = SQLiteDialect()
+        self.assertTrue(dialect.arrow_available())
+        # ADBC 路径不应退回游标读取
+        original = SQLiteDialect.iter_query
+        SQLiteDialect.iter_query = None
+        try:
+            return self.connector.read_arrow(self.config, 't', batch_size=10, **kwargs)
+        finally:
+            SQLiteDialect.iter_query = original
+
+    def test_leading_nulls_keep_declared_types(self):
+        for kwargs in ({}, {'partition_on': 'id', 'partitions': 4}, {'limit': 20}):
+            table = self.read(**kwargs)
+            expected_rows = kwargs.get('limit', 100)
+            self.assertEqual(table.num_rows, expected_rows, kwargs)
+            self.assertEqual([str(field.type) for field in table.schema][:4],
+                             ['int64', 'string', 'double', 'double'], kwargs)
+            if expected_rows == 100:
+                self.assertEqual(sorted(table.column('id').to_pylist()), list(range(100)))
+                self.assertEqual(table.column('name').null_count, 30)
+
+    def test_empty_table_keeps_schema(self):
+        connection = sqlite3.connect(self.database)
+        connection.execute('DELETE FROM t')
+        connection.commit()
+        connection.close()
+
+        table = self.read()
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(table.schema.names, ['id', 'name', 'score', 'amount', 'note'])
+
+
+if __name__ == '__main__':
+    unittest.main()
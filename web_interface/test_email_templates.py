@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+邮件模板测试
+============
+
+验证预编码的邮件字节:
+
+- 折行后的长标题和非 ASCII 收件人地址只使用 CRLF 换行，不出现裸 LF
+- 渲染结果可被 email 包解析回原始标题、收件人和正文
+
+运行: python -m unittest test_email_templates
+"""
+
+import re
+import unittest
+from email import message_from_bytes, policy
+
+from email_templates import EmailTemplate
+
+BARE_LF = re.compile(rb'(?<!\r)\n')
+
+
+class EmailTemplateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.subject = '欢迎加入合成数据平台，请在二十四小时内完成邮箱验证，' * 3
+        self.template = EmailTemplate(
+            subject=self.subject,
+            text='您好 ${username}，验证链接：${url}',
+            html_source='<p>您好 ${username}</p><a href="${url}">验证</a>',
+            from_name='合成数据平台',
+            from_email='noreply@example.com'
+        )
+
+    def render(self, to_email):
+        return self.template.render(to_email, {'username': '张三', 'url': 'https://example.com/v?t=1'})
+
+    def test_folded_headers_use_crlf(self):
+        for to_email in ('user@example.com', 'user@例子.中国', '非常长的用户名' * 8 + '@例子.中国'):
+            raw = self.render(to_email)
+            self.assertIsNone(BARE_LF.search(raw), to_email)
+
+    def test_message_round_trips(self):
+        message = message_from_bytes(self.render('user@例子.中国'), policy=policy.default)
+
+        self.assertEqual(str(message['Subject']), self.subject)
+        self.assertEqual(str(message['To']), 'user@xn--fsqu00a.xn--fiqs8s')
+        text = message.get_body(('plain',)).get_content()
+        self.assertIn('您好 张三', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GPT 采样管线测试
+================
+
+在本地启动一个模拟 OpenAI chat/completions 接口的 HTTP 服务，验证:
+
+- 429 按 Retry-After 重试后继续生成
+- 不符合原始数据结构的行被丢弃并计数
+- 401 等不可重试错误直接抛出，不再重试
+- 调用方提前停止迭代后不再发出新请求
+- 并发数超过声明的上限时被限制
+- 未指定种子时每次运行的提示词不同，使用的种子记录在 stats 中
+- 默认缓存所有请求，以相同种子重新运行时全部命中缓存，不再请求接口
+- 缓存超出容量时淘汰最久未访问的条目
+
+运行: python -m unittest test_llm_sampler
+"""
+
+import os
+import json
+import time
+import random
+import threading
+import tempfile
+import unittest
+import unittest.mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pandas as pd
+
+from utils.llm_cache import CompletionCache
+from utils.llm_sampler import GPTSampler, LLMRequestError
+from utils.model_manager import ModelManager
+
+CITIES = ['北京', '上海', '深圳']
+
+
+def make_rows(count, rng):
+    return [
+        {
+            'age': rng.randint(18, 80),
+            'city': rng.choice(CITIES),
+            'income': round(rng.uniform(1000, 9000), 2)
+        }
+        for _ in range(count)
+    ]
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """按 server.respond(请求序号, 行数) 的返回值回复 (状态码, 行列表, 额外响应头)"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][0]['content']
+        count = int(prompt.split('Generate ')[1].split()[0])
+
+        with self.server.lock:
+            self.server.calls += 1
+            self.server.prompts.append(prompt)
+            call = self.server.calls
+        status, rows, headers = self.server.respond(call, count)
+
+        if status != 200:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        content = '```json\n' + json.dumps(rows, ensure_ascii=False) + '\n```'
+        payload = json.dumps({
+            'choices': [{'message': {'content': content}}],
+            'usage': {'prompt_tokens': 100, 'completion_tokens': 200}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class GPTSamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.df = pd.DataFrame(make_rows(50, rng))
+        self.rng = random.Random(1)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), MockLLMHandler)
+        self.server.lock = threading.Lock()
+        self.server.calls = 0
+        self.server.prompts = []
+        self.server.respond = lambda call, count: (200, make_rows(count, self.rng), {})
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def sampler(self, **kwargs):
+        options = dict(api_key='test-key', api_url=f'http://127.0.0.1:{self.server.server_port}/v1/',
+                       query_batch=5, concurrency=2, requests_per_minute=6000, backoff=0.01,
+                       max_retries=3, timeout=5)
+        options.update(kwargs)
+        return GPTSampler(**options)
+
+    def test_retries_after_429(self):
+        def respond(call, count):
+            if call % 3 == 1:
+                return 429, [], {'Retry-After': '0'}
+            return 200, make_rows(count, self.rng), {}
+        self.server.respond = respond
+
+        sampler = self.sampler()
+        result = sampler.sample(self.df, 20, seed=1)
+
+        self.assertEqual(len(result), 20)
+        self.assertGreaterEqual(sampler.stats['retries'], 1)
+        self.assertEqual(sampler.stats['failed_requests'], 0)
+        self.assertEqual(sampler.stats['requests'], self.server.calls)
+
+    def test_invalid_rows_are_dropped(self):
+        def respond(call, count):
+            rows = make_rows(count, self.rng)
+            rows += [
+                {'age': 'abc', 'city': '北京', 'income': 1000.0},
+                {'age': 30, 'city': '火星', 'income': 1000.0},
+                {'age': 30, 'city': '北京'}
+            ]
+            return 200, rows, {}
+        self.server.respond = respond
+
+        sampler = self.sampler()
+        result = sampler.sample(self.df, 20, seed=1)
+
+        self.assertEqual(len(result), 20)
+        self.assertTrue(set(result['city']) <= set(CITIES))
+        self.assertEqual(str(result['age'].dtype), 'int64')
+        self.assertGreaterEqual(sampler.stats['rows_invalid'], 3)
+
+    def test_unauthorized_is_not_retried(self):
+        self.server.respond = lambda call, count: (401, [], {})
+
+        sampler = self.sampler(concurrency=1)
+        with self.assertRaises(LLMRequestError) as context:
+            sampler.sample(self.df, 20, seed=1)
+
+        self.assertFalse(context.exception.retryable)
+        self.assertEqual(self.server.calls, 1)
+        self.assertEqual(sampler.stats['retries'], 0)
+
+    def test_early_close_stops_requests(self):
+        def respond(call, count):
+            time.sleep(0.05)
+            return 200, make_rows(count, self.rng), {}
+        self.server.respond = respond
+
+        sampler = self.sampler()
+        batches = sampler.iter_rows(self.df, 1000, seed=1)
+        self.assertTrue(next(batches))
+        batches.close()
+
+        # 已发出的请求返回后不再有新请求
+        time.sleep(0.5)
+        calls = self.server.calls
+        time.sleep(0.5)
+        self.assertEqual(self.server.calls, calls)
+        self.assertLess(calls, 1000 // 5)
+
+    def test_unseeded_runs_use_different_examples(self):
+        sampler = self.sampler(concurrency=1)
+
+        sampler.sample(self.df, 5)
+        first_seed = sampler.stats['seed']
+        sampler.sample(self.df, 5)
+        sampler.sample(self.df, 5, seed=1)
+        self.assertEqual(sampler.stats['seed'], 1)
+        sampler.sample(self.df, 5, seed=1)
+
+        prompts = self.server.prompts
+        self.assertEqual(len(prompts), 4)
+        self.assertIsNotNone(first_seed)
+        self.assertNotEqual(prompts[0], prompts[1])
+        self.assertEqual(prompts[2], prompts[3])
+
+    def test_rerun_with_seed_hits_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CompletionCache(os.path.join(cache_dir, 'llm_cache.db'))
+            manager = ModelManager()
+            config = {'openai_API_key': 'test-key', 'query_batch': 5, 'concurrency': 1,
+                      'requests_per_minute': 6000,
+                      'openai_API_url': f'http://127.0.0.1:{self.server.server_port}/v1/'}
+            with unittest.mock.patch('utils.llm_cache.get_completion_cache', return_value=cache):
+                sampler = manager.create_gpt_sampler(config)
+            # 默认 temperature > 0 时也使用缓存
+            self.assertIs(sampler.cache, cache)
+
+            first = sampler.sample(self.df, 20)
+            calls = self.server.calls
+            self.assertEqual(sampler.stats['cache_hits'], 0)
+
+            second = sampler.sample(self.df, 20, seed=sampler.stats['seed'])
+            self.assertEqual(self.server.calls, calls)
+            self.assertEqual(sampler.stats['requests'], 0)
+            self.assertGreater(sampler.stats['cache_hits'], 0)
+            pd.testing.assert_frame_equal(first, second)
+
+            sampler = manager.create_gpt_sampler(dict(config, response_cache='off'))
+            self.assertIsNone(sampler.cache)
+
+    def test_cache_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            value = {'content': 'x' * 100}
+            size = len(json.dumps(value).encode('utf-8'))
+            cache = CompletionCache(os.path.join(cache_dir, 'llm_cache.db'), max_bytes=size * 3)
+
+            for key in ('a', 'b', 'c'):
+                cache.put(key, value)
+                time.sleep(0.01)
+            # 访问 a 后 b 成为最久未访问的条目
+            self.assertEqual(cache.get('a'), value)
+            time.sleep(0.01)
+            cache.put('d', value)
+
+            self.assertIsNone(cache.get('b'))
+            for key in ('a', 'c', 'd'):
+                self.assertEqual(cache.get(key), value)
+            info = cache.info()
+            self.assertEqual(info['entries'], 3)
+            self.assertEqual(info['evictions'], 1)
+            self.assertLessEqual(info['bytes'], info['max_bytes'])
+
+    def test_concurrency_is_clamped(self):
+        manager = ModelManager()
+        limits = manager.available_models['gpt']['parameters']['concurrency']
+
+        sampler = manager.create_gpt_sampler({'openai_API_key': 'test-key', 'concurrency': 10000,
+                                              'response_cache': 'off'})
+        self.assertEqual(sampler.concurrency, limits['max'])
+
+        sampler = manager.create_gpt_sampler({'openai_API_key': 'test-key', 'concurrency': 0,
+                                              'response_cache': 'off'})
+        self.assertEqual(sampler.concurrency, limits['min'])
+
+
+if __name__ == '__main__':
+    unittest.main()
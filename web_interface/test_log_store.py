@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追加日志存储测试
+================
+
+验证多个进程共享同一组快照和日志文件时:
+
+- 压缩后日志被替换，持有过期读取位置的读者整体重新加载，不会从半行处回放
+- 在 process_lock 内先检查再写入，多个进程插入同一主键时只有一个成功
+- process_lock 可重入，锁内的写入不会死锁
+
+运行: python -m unittest test_log_store
+"""
+
+import multiprocessing
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from log_store import LogStore, _file_signature
+
+
+def insert_if_absent(snapshot_file, key, worker, results):
+    store = LogStore(Path(snapshot_file))
+    with store.process_lock():
+        if not store.contains(key):
+            store.set(key, {'worker': worker})
+            results.put(worker)
+
+
+class LogStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshot_file = Path(self.tmp.name) / 'users.json'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reader_reloads_after_compaction(self):
+        writer = LogStore(self.snapshot_file)
+        for i in range(20):
+            writer.set(f'user{i}', {'name': f'用户{i}'})
+
+        reader = LogStore(self.snapshot_file)
+        self.assertEqual(len(reader), 20)
+        log_inode = reader._log_inode
+
+        writer.compact()
+        for i in range(40):
+            writer.set(f'new{i}', {'name': f'新用户{i}'})
+
+        # 即使快照签名恰好未变，日志 inode 变化也要触发整体重新加载
+        self.assertNotEqual(_file_signature(writer.log_file)[0], log_inode)
+        reader._snapshot_sig = _file_signature(self.snapshot_file)
+        reloads = reader.stats['reloads']
+
+        self.assertEqual(dict(reader.items()), dict(writer.items()))
+        self.assertEqual(reader.stats['reloads'], reloads + 1)
+
+    def test_process_lock_is_reentrant(self):
+        store = LogStore(self.snapshot_file)
+        with store.process_lock():
+            with store.process_lock():
+                store.set('a', {'value': 1})
+            store.compact()
+        self.assertEqual(store.get('a'), {'value': 1})
+
+    @unittest.skipUnless(hasattr(os, 'fork'), '需要 fork 启动进程')
+    def test_check_then_insert_across_processes(self):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=insert_if_absent,
+                            args=(str(self.snapshot_file), 'user@example.com', worker, results))
+            for worker in range(8)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+            self.assertEqual(process.exitcode, 0)
+
+        winners = []
+        while not results.empty():
+            winners.append(results.get())
+        self.assertEqual(len(winners), 1)
+
+        store = LogStore(self.snapshot_file)
+        self.assertEqual(store.get('user@example.com'), {'worker': winners[0]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+邮件队列测试
+============
+
+验证共享同一个发件箱的多个队列:
+
+- 并发处理时每封邮件只发送一次
+- 租约过期的邮件重新回到 pending 并被发送
+- 发送失败的邮件释放租约，按退避时间重试
+
+运行: python -m unittest test_mail_queue
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from email.message import EmailMessage
+
+from mail_queue import DebugBackend, MailQueue
+
+
+class FailingBackend(DebugBackend):
+
+    def send(self, from_addr, to_addrs, raw):
+        raise OSError('connection refused')
+
+
+class ManualQueue(MailQueue):
+    """不启动后台线程，由测试直接调用 process_batch"""
+
+    def start(self):
+        pass
+
+
+class MailQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'mail_queue.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def queue(self, backend=None, **kwargs):
+        return ManualQueue(self.db_path, backend or DebugBackend(), batch_size=10, **kwargs)
+
+    def test_concurrent_workers_send_each_message_once(self):
+        producer = self.queue()
+        producer.enqueue_many('noreply@example.com', (
+            ([f'user{i}@example.com'], f'message {i}'.encode('ascii')) for i in range(200)))
+
+        workers = [self.queue() for _ in range(4)]
+        barrier = threading.Barrier(len(workers))
+
+        def drain(queue):
+            barrier.wait()
+            while queue.process_batch():
+                pass
+
+        threads = [threading.Thread(target=drain, args=(queue,)) for queue in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sent = [message['raw'] for queue in workers for message in queue.backend.outbox]
+        self.assertEqual(len(sent), 200)
+        self.assertEqual(len(set(sent)), 200)
+        self.assertEqual(producer.pending_count(), 0)
+
+    def test_expired_lease_is_requeued(self):
+        message = EmailMessage()
+        message['From'] = 'noreply@example.com'
+        message['To'] = 'user@example.com'
+        message.set_content('hello')
+        self.queue().enqueue(message)
+
+        # 领取后不发送，模拟进程在发送前退出
+        crashed = self.queue(lease_timeout=-1)
+        self.assertEqual(len(crashed._claim_due()), 1)
+
+        worker = self.queue()
+        self.assertEqual(worker.process_batch(), 1)
+        self.assertEqual(worker.stats['lease_expired'], 1)
+        self.assertEqual(len(worker.backend.outbox), 1)
+        self.assertNotIn(b'\n', worker.backend.outbox[0]['raw'].replace(b'\r\n', b''))
+
+    def test_failed_send_releases_lease(self):
+        failing = self.queue(FailingBackend(), retry_base=0)
+        failing.enqueue_raw('noreply@example.com', ['user@example.com'], b'hello')
+        self.assertEqual(failing.process_batch(), 1)
+        self.assertEqual(failing.stats['retried'], 1)
+
+        worker = self.queue()
+        self.assertEqual(worker.process_batch(), 1)
+        self.assertEqual(worker.stats['lease_expired'], 0)
+        self.assertEqual(len(worker.backend.outbox), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求指标测试
+============
+
+验证 /metrics 接口:
+
+- Content-Type 符合 Prometheus 文本格式，且参数不重复
+- 配置 METRICS_TOKEN 后未携带令牌的请求返回 401
+- 业务请求按路由模板计数
+
+运行: python -m unittest test_metrics
+"""
+
+import unittest
+
+from flask import Flask
+
+from metrics import instrument_app
+
+
+class MetricsEndpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/items/<int:item_id>', 'item', lambda item_id: 'ok')
+        instrument_app(self.app)
+        self.client = self.app.test_client()
+
+    def test_content_type(self):
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+
+    def test_token_required(self):
+        self.app.config['METRICS_TOKEN'] = 'secret'
+
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_requests_labelled_by_route_template(self):
+        self.client.get('/items/1')
+        self.client.get('/items/2')
+
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('route="/items/<int:item_id>"', body)
+        self.assertNotIn('/items/1', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
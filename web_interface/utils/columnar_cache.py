@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式数据缓存
+============
+
+从数据库抽取的表数据以 Arrow IPC 文件保存在本地磁盘:
+
+- 写入时逐批追加 RecordBatch，不在内存中拼接整张表
+- 读取时内存映射文件，列数据零拷贝转为 Arrow Table / DataFrame
+- 总大小超过上限时按最近访问时间淘汰（LRU）
+
+依赖 pyarrow（可选依赖），首次使用时才导入。
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .lazy_imports import lazy_import
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_CACHE_DIR = os.environ.get('COLUMNAR_CACHE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'columnar_cache'
+)
+COLUMNAR_CACHE_MAX_BYTES = int(os.environ.get('COLUMNAR_CACHE_MAX_BYTES') or 1024 * 1024 * 1024)
+
+SUFFIX = '.arrow'
+
+
+def columnar_key(source: Dict[str, Any]) -> str:
+    """数据来源描述的 SHA-256 键（不含密码）"""
+    source = {key: value for key, value in source.items() if key != 'password'}
+    payload = json.dumps(source, sort_keys=True, ensure_ascii=False, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ColumnarCache:
+    """以 Arrow IPC 文件保存的列式数据缓存"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = COLUMNAR_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    def _path(self, key: str) -> Path:
+        if not key.isalnum():
+            raise ValueError(f"无效的缓存键: {key}")
+        return self.cache_dir / f'{key}{SUFFIX}'
+
+    def contains(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def write_batches(self, key: str, batches: Iterable['pa.RecordBatch']) -> Dict[str, Any]:
+        """逐批写入缓存（各批次结构须一致），返回行数、批次数和文件大小"""
+        pa = lazy_import('pyarrow')
+        path = self._path(key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+
+        rows = 0
+        count = 0
+        schema = None
+        writer = None
+        try:
+            for batch in batches:
+                if writer is None:
+                    schema = batch.schema
+                    writer = pa.ipc.new_file(str(tmp_path), schema)
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                count += 1
+
+            if writer is None:
+                raise ValueError('没有可写入的数据')
+            writer.close()
+            writer = None
+            os.replace(tmp_path, path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        self.stats['writes'] += 1
+        self._evict(keep=path)
+        return {
+            'rows': rows,
+            'batches': count,
+            'columns': schema.names,
+            'bytes': path.stat().st_size
+        }
+
+    def read(self, key: str, columns: Optional[List[str]] = None) -> Optional['pa.Table']:
+        """读取缓存（内存映射），未命中时返回 None"""
+        pa = lazy_import('pyarrow')
+        path = self._path(key)
+        try:
+            source = pa.memory_map(str(path), 'r')
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        os.utime(path)
+        self.stats['hits'] += 1
+        return table
+
+    def read_pandas(self, key: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """读取缓存并转换为 DataFrame，未命中时返回 None"""
+        table = self.read(key, columns)
+        return None if table is None else table.to_pandas()
+
+    def delete(self, key: str) -> bool:
+        try:
+            self._path(key).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.cache_dir.glob(f'*{SUFFIX}'):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _evict(self, keep: Optional[Path] = None):
+        """总大小超过上限时删除最久未访问的文件（刚写入的文件除外）"""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+            total = sum(stat.st_size for _, stat in entries)
+            for path, stat in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= stat.st_size
+                self.stats['evictions'] += 1
+                logger.debug(f"列式缓存淘汰: {path.name}")
+
+    def info(self) -> Dict[str, Any]:
+        """缓存条目数、总大小和命中统计"""
+        entries = self._entries()
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            'path': str(self.cache_dir),
+            'entries': len(entries),
+            'bytes': sum(stat.st_size for _, stat in entries),
+            'max_bytes': self.max_bytes,
+            'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else None,
+            **self.stats
+        }
+
+    def clear(self) -> int:
+        """清空缓存，返回删除的条目数"""
+        removed = 0
+        with self._lock:
+            for path, _ in self._entries():
+                try:
+                    path.unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+_default_cache: Optional[ColumnarCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_columnar_cache() -> ColumnarCache:
+    """进程内共享的默认缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ColumnarCache(COLUMNAR_CACHE_DIR)
+        return _default_cache
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可恢复的 CTGAN 训练
+===================
+
+在 sdgx 的 CTGAN 训练循环基础上增加:
+
+- 每 ``checkpoint_every`` 个 epoch 把生成器、判别器、优化器和随机数状态
+  写入模型注册表；同一运行ID重新训练时从最近的检查点继续
+- 每 ``validation_every`` 个 epoch 计算一次验证指标：在转换后的特征空间中，
+  比较生成样本与真实样本各列的均值和标准差差距。该指标只需一次生成器
+  前向计算，不需要还原数据
+- 验证指标连续 ``patience`` 次没有改善（幅度小于 ``min_delta``）时提前停止，
+  并恢复到指标最好时的生成器权重
+"""
+
+import random
+import zlib
+import logging
+from typing import Dict, Any, Optional
+
+import numpy as np
+import torch
+from torch import optim
+
+from sdgx.models.ml.single_table.ctgan import CTGANSynthesizerModel, Discriminator, Generator
+
+from .model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_EVERY = 10
+DEFAULT_VALIDATION_EVERY = 5
+DEFAULT_PATIENCE = 5
+DEFAULT_MIN_DELTA = 1e-3
+VALIDATION_ROWS = 2000
+
+
+def _seed_everything(seed: int):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def _rng_state() -> Dict[str, Any]:
+    return {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state()
+    }
+
+
+def _restore_rng_state(state: Dict[str, Any]):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+
+
+class CheckpointedCTGANSynthesizerModel(CTGANSynthesizerModel):
+    """支持检查点续训和提前停止的 CTGAN 模型"""
+
+    def __init__(self, run_id: str, registry: Optional[ModelRegistry] = None,
+                 checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+                 validation_every: int = DEFAULT_VALIDATION_EVERY,
+                 patience: int = DEFAULT_PATIENCE, min_delta: float = DEFAULT_MIN_DELTA,
+                 seed: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.run_id = run_id
+        self.registry = registry or ModelRegistry()
+        self.checkpoint_every = max(0, int(checkpoint_every))
+        self.validation_every = max(0, int(validation_every))
+        self.patience = max(0, int(patience))
+        self.min_delta = float(min_delta)
+        # 同一运行ID使用固定种子，重启后数据转换（GMM 拟合）结果一致
+        self.seed = seed if seed is not None else zlib.crc32(run_id.encode('utf-8'))
+        self.training_summary: Dict[str, Any] = {}
+        self._checkpoint = None
+
+    def fit(self, metadata, dataloader, epochs=None, *args, **kwargs):
+        self._checkpoint = self.registry.load_checkpoint(self.run_id)
+        if self._checkpoint is not None:
+            self.seed = self._checkpoint.get('seed', self.seed)
+        _seed_everything(self.seed)
+        try:
+            return super().fit(metadata, dataloader, epochs, *args, **kwargs)
+        finally:
+            self._checkpoint = None
+
+    def _build_networks(self, data_dim: int):
+        cond_dim = self._data_sampler.dim_cond_vec()
+        self._generator = Generator(
+            self._embedding_dim + cond_dim, self._generator_dim, data_dim
+        ).to(self._device)
+        discriminator = Discriminator(
+            data_dim + cond_dim, self._discriminator_dim, pac=self.pac
+        ).to(self._device)
+
+        optimizer_g = optim.Adam(
+            self._generator.parameters(), lr=self._generator_lr,
+            betas=(0.5, 0.9), weight_decay=self._generator_decay
+        )
+        optimizer_d = optim.Adam(
+            discriminator.parameters(), lr=self._discriminator_lr,
+            betas=(0.5, 0.9), weight_decay=self._discriminator_decay
+        )
+        return discriminator, optimizer_g, optimizer_d
+
+    def _restore(self, data_dim: int, discriminator, optimizer_g, optimizer_d) -> Optional[Dict[str, Any]]:
+        """从检查点恢复训练状态；数据维度不一致时（数据转换结果不同）重新训练"""
+        checkpoint = self._checkpoint
+        if checkpoint is None:
+            return None
+        if checkpoint.get('data_dim') != data_dim:
+            logger.warning(f"检查点与当前数据转换不一致，重新训练: {self.run_id}")
+            return None
+
+        self._generator.load_state_dict(checkpoint['generator'])
+        discriminator.load_state_dict(checkpoint['discriminator'])
+        optimizer_g.load_state_dict(checkpoint['optimizer_g'])
+        optimizer_d.load_state_dict(checkpoint['optimizer_d'])
+        _restore_rng_state(checkpoint['rng_state'])
+        logger.info(f"从第 {checkpoint['epoch']} 个 epoch 的检查点继续训练: {self.run_id}")
+        return checkpoint
+
+    def _train_step(self, discriminator, optimizer_g, optimizer_d, mean, std):
+        """一个训练步骤（与 sdgx CTGAN 的训练循环一致）"""
+        for _ in range(self._discriminator_steps):
+            fakez = torch.normal(mean=mean, std=std)
+
+            condvec = self._data_sampler.sample_condvec(self._batch_size)
+            if condvec is None:
+                c1, m1, col, opt = None, None, None, None
+                real = self._data_sampler.sample_data(self._batch_size, col, opt)
+            else:
+                c1, m1, col, opt = condvec
+                c1 = torch.from_numpy(c1).to(self._device)
+                m1 = torch.from_numpy(m1).to(self._device)
+                fakez = torch.cat([fakez, c1], dim=1)
+
+                perm = np.arange(self._batch_size)
+                np.random.shuffle(perm)
+                real = self._data_sampler.sample_data(self._batch_size, col[perm], opt[perm])
+                c2 = c1[perm]
+
+            fake = self._generator(fakez)
+            fakeact = self._apply_activate(fake)
+
+            real = torch.from_numpy(real.astype('float32')).to(self._device)
+
+            if c1 is not None:
+                fake_cat = torch.cat([fakeact, c1], dim=1)
+                real_cat = torch.cat([real, c2], dim=1)
+            else:
+                real_cat = real
+                fake_cat = fakeact
+
+            y_fake = discriminator(fake_cat)
+            y_real = discriminator(real_cat)
+
+            pen = discriminator.calc_gradient_penalty(real_cat, fake_cat, self._device, self.pac)
+            loss_d = -(torch.mean(y_real) - torch.mean(y_fake))
+
+            optimizer_d.zero_grad(set_to_none=False)
+            pen.backward(retain_graph=True)
+            loss_d.backward()
+            optimizer_d.step()
+
+        fakez = torch.normal(mean=mean, std=std)
+        condvec = self._data_sampler.sample_condvec(self._batch_size)
+
+        if condvec is None:
+            c1, m1 = None, None
+        else:
+            c1, m1, col, opt = condvec
+            c1 = torch.from_numpy(c1).to(self._device)
+            m1 = torch.from_numpy(m1).to(self._device)
+            fakez = torch.cat([fakez, c1], dim=1)
+
+        fake = self._generator(fakez)
+        fakeact = self._apply_activate(fake)
+
+        if c1 is not None:
+            y_fake = discriminator(torch.cat([fakeact, c1], dim=1))
+        else:
+            y_fake = discriminator(fakeact)
+
+        cross_entropy = 0 if condvec is None else self._cond_loss(fake, c1, m1)
+        loss_g = -torch.mean(y_fake) + cross_entropy
+
+        optimizer_g.zero_grad(set_to_none=False)
+        loss_g.backward()
+        optimizer_g.step()
+        return float(loss_g.detach().cpu()), float(loss_d.detach().cpu())
+
+    def _validation_distance(self, real: np.ndarray) -> float:
+        """生成样本与真实样本在转换空间中各列均值、标准差的平均差距（越小越好）"""
+        rows = len(real)
+        self._generator.eval()
+        try:
+            with torch.no_grad():
+                fakez = torch.normal(
+                    mean=torch.zeros(rows, self._embedding_dim, device=self._device),
+                    std=torch.ones(rows, self._embedding_dim, device=self._device)
+                )
+                condvec = self._data_sampler.sample_original_condvec(rows)
+                if condvec is not None:
+                    fakez = torch.cat([fakez, torch.from_numpy(condvec).to(self._device)], dim=1)
+                fake = self._apply_activate(self._generator(fakez)).cpu().numpy()
+        finally:
+            self._generator.train()
+
+        return float(
+            np.abs(real.mean(axis=0) - fake.mean(axis=0)).mean()
+            + np.abs(real.std(axis=0) - fake.std(axis=0)).mean()
+        )
+
+    def _save_checkpoint(self, epoch: int, data_dim: int, discriminator, optimizer_g,
+                         optimizer_d, state: Dict[str, Any], status: str):
+        self.registry.save_checkpoint(self.run_id, {
+            'epoch': epoch,
+            'seed': self.seed,
+            'data_dim': data_dim,
+            'generator': self._generator.state_dict(),
+            'discriminator': discriminator.state_dict(),
+            'optimizer_g': optimizer_g.state_dict(),
+            'optimizer_d': optimizer_d.state_dict(),
+            'rng_state': _rng_state(),
+            'best_generator': state['best_generator'],
+            'best_distance': state['best_distance'],
+            'best_epoch': state['best_epoch'],
+            'bad_checks': state['bad_checks'],
+            'history': state['history'],
+            'status': status
+        }, status=status, epochs=self._epochs, epoch=epoch,
+           best_epoch=state['best_epoch'], best_distance=state['best_distance'],
+           history=state['history'])
+
+    def _fit(self, data_size: int):
+        data_dim = self._transformer.output_dimensions
+        discriminator, optimizer_g, optimizer_d = self._build_networks(data_dim)
+
+        state = {'best_generator': None, 'best_distance': None, 'best_epoch': 0,
+                 'bad_checks': 0, 'history': []}
+        start_epoch = 0
+        status = 'running'
+
+        checkpoint = self._restore(data_dim, discriminator, optimizer_g, optimizer_d)
+        if checkpoint is not None:
+            start_epoch = checkpoint['epoch']
+            status = checkpoint.get('status', 'running')
+            for key in state:
+                state[key] = checkpoint[key]
+
+        # 验证用的真实样本在整个训练过程中保持不变
+        validation_real = None
+        if self.validation_every:
+            rng_state = _rng_state()
+            np.random.seed(self.seed)
+            validation_real = self._data_sampler.sample_data(
+                min(VALIDATION_ROWS, data_size), None, None
+            ).astype('float32')
+            _restore_rng_state(rng_state)
+
+        mean = torch.zeros(self._batch_size, self._embedding_dim, device=self._device)
+        std = mean + 1
+        steps_per_epoch = max(data_size // self._batch_size, 1)
+
+        epoch = start_epoch
+        if status == 'running':
+            self.registry.update_metadata(self.run_id, status='running', epochs=self._epochs,
+                                          resumed_from=start_epoch or None)
+
+        while status == 'running' and epoch < self._epochs:
+            for _ in range(steps_per_epoch):
+                loss_g, loss_d = self._train_step(discriminator, optimizer_g, optimizer_d, mean, std)
+            epoch += 1
+
+            if self.validation_every and epoch % self.validation_every == 0:
+                distance = self._validation_distance(validation_real)
+                state['history'].append({'epoch': epoch, 'distance': distance,
+                                         'loss_g': loss_g, 'loss_d': loss_d})
+
+                if state['best_distance'] is None or distance < state['best_distance'] - self.min_delta:
+                    state['best_distance'] = distance
+                    state['best_epoch'] = epoch
+                    state['bad_checks'] = 0
+                    state['best_generator'] = {
+                        k: v.detach().cpu().clone() for k, v in self._generator.state_dict().items()
+                    }
+                else:
+                    state['bad_checks'] += 1
+
+                if self.patience and state['bad_checks'] >= self.patience:
+                    status = 'stopped_early'
+                    logger.info(f"验证指标连续 {self.patience} 次未改善，在第 {epoch} 个 epoch 提前停止"
+                                f"（最佳 epoch: {state['best_epoch']}）")
+
+            if status != 'running' or epoch >= self._epochs:
+                break
+            if self.checkpoint_every and epoch % self.checkpoint_every == 0:
+                self._save_checkpoint(epoch, data_dim, discriminator, optimizer_g, optimizer_d,
+                                      state, status)
+
+        if status == 'running':
+            status = 'completed'
+
+        # 训练结束后使用验证指标最好的生成器
+        if state['best_generator'] is not None:
+            self._generator.load_state_dict(state['best_generator'])
+
+        if checkpoint is None or epoch > start_epoch or checkpoint.get('status') != status:
+            self._save_checkpoint(epoch, data_dim, discriminator, optimizer_g, optimizer_d,
+                                  state, status)
+
+        self.training_summary = {
+            'run_id': self.run_id,
+            'status': status,
+            'epochs': self._epochs,
+            'trained_epochs': epoch,
+            'resumed_from': start_epoch or None,
+            'best_epoch': state['best_epoch'] or None,
+            'best_distance': state['best_distance']
+        }
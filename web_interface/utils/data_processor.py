@@ -7,13 +7,39 @@
 提供数据预处理、清洗和转换功能
 """
 
+import importlib.util
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Any, Optional
 import logging
+import warnings
 
 logger = logging.getLogger(__name__)
 
+# 安装了 pyarrow 时文本列使用 Arrow 字符串类型
+ARROW_STRING_DTYPE = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else None
+
+# 只使用有符号类型，避免后续减法等运算时无符号整数回绕
+_INT_DTYPES = ['int8', 'int16', 'int32', 'int64']
+
+# 类型推断时先试解析的样本行数
+_PROBE_ROWS = 100
+
+
+def _is_text(series: pd.Series) -> bool:
+    """是否为 object 或字符串类型的列"""
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _smallest_int_dtype(min_value, max_value) -> Optional[str]:
+    """能容纳 [min_value, max_value] 的最窄整数类型"""
+    for name in _INT_DTYPES:
+        info = np.iinfo(name)
+        if info.min <= min_value and max_value <= info.max:
+            return name
+    return None
+
+
 class DataProcessor:
     """数据处理器类"""
     
@@ -147,7 +173,7 @@ class DataProcessor:
         
         # 数据类型转换
         if options.get('convert_dtypes', True):
-            cleaned_df = self._convert_dtypes(cleaned_df)
+            cleaned_df = self._convert_dtypes(cleaned_df, options.get('optimize_dtypes', True))
         
         return cleaned_df
     
@@ -189,69 +215,144 @@ class DataProcessor:
         
         return df
     
-    def _convert_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
-        """转换数据类型"""
-        # 尝试转换数值列
+    def _convert_dtypes(self, df: pd.DataFrame, optimize: bool = True) -> pd.DataFrame:
+        """转换数据类型；optimize 时按 dtype 规划压缩内存，节省情况见 df.attrs['memory_report']"""
         for col in df.columns:
-            if df[col].dtype == 'object':
-                # 尝试转换为数值
-                try:
-                    df[col] = pd.to_numeric(df[col], errors='ignore')
-                except:
-                    pass
-                
-                # 尝试转换为日期时间
-                if df[col].dtype == 'object':
-                    try:
-                        df[col] = pd.to_datetime(df[col], errors='ignore')
-                    except:
-                        pass
-        
+            if not _is_text(df[col]):
+                continue
+            
+            # 只有全部非空值都能解析时才转换，避免把少量异常值变成缺失值
+            non_null = df[col].notna().sum()
+            if non_null == 0:
+                continue
+            
+            # 先用少量样本试解析，明显不是数值/日期的列不做整列解析
+            probe = df[col].dropna().head(_PROBE_ROWS)
+            
+            if pd.to_numeric(probe, errors='coerce').notna().all():
+                numeric = pd.to_numeric(df[col], errors='coerce')
+                if numeric.notna().sum() == non_null:
+                    df[col] = numeric
+                    continue
+            
+            with warnings.catch_warnings():
+                # 无法推断统一格式时 pandas 会逐个解析并告警
+                warnings.simplefilter('ignore', UserWarning)
+                if pd.to_datetime(probe, errors='coerce').notna().all():
+                    parsed = pd.to_datetime(df[col], errors='coerce')
+                    if parsed.notna().sum() == non_null:
+                        df[col] = parsed
+        
+        if optimize:
+            df, report = self.optimize_dtypes(df)
+            df.attrs['memory_report'] = report
         return df
     
-    def prepare_for_synthesis(self, df: pd.DataFrame, target_columns: List[str] = None) -> pd.DataFrame:
-        """为合成数据生成准备数据"""
+    def plan_dtypes(self, df: pd.DataFrame, category_ratio: float = 0.5,
+                    max_categories: int = 10000) -> Dict[str, str]:
+        """
+        为各列规划最紧凑的数据类型
+        
+        - 整数列：取能容纳最小/最大值的最窄整数类型
+        - 浮点列：float32 可无损表示时降为 float32
+        - 字符串列：唯一值占比不超过 category_ratio 且不超过 max_categories 时
+          转为 category，否则在安装了 pyarrow 时使用 Arrow 字符串类型
+        
+        只返回需要转换的列。
+        """
+        plan = {}
+        for col in df.columns:
+            series = df[col]
+            dtype = series.dtype
+            
+            if pd.api.types.is_bool_dtype(dtype):
+                continue
+            
+            if pd.api.types.is_integer_dtype(dtype):
+                if len(series) == 0:
+                    continue
+                target = _smallest_int_dtype(series.min(), series.max())
+                if target is not None and np.dtype(target).itemsize < dtype.itemsize:
+                    plan[col] = target
+            
+            elif pd.api.types.is_float_dtype(dtype):
+                if dtype.itemsize > 4:
+                    values = series.to_numpy(dtype='float64', na_value=np.nan)
+                    if np.array_equal(values.astype('float32').astype('float64'), values, equal_nan=True):
+                        plan[col] = 'float32'
+            
+            elif _is_text(series):
+                values = series.dropna()
+                if len(values) == 0 or pd.api.types.infer_dtype(values, skipna=True) != 'string':
+                    continue
+                unique_count = values.nunique()
+                if unique_count <= max_categories and unique_count <= category_ratio * len(values):
+                    plan[col] = 'category'
+                elif ARROW_STRING_DTYPE is not None and str(dtype) != ARROW_STRING_DTYPE:
+                    plan[col] = ARROW_STRING_DTYPE
+        
+        return plan
+    
+    def optimize_dtypes(self, df: pd.DataFrame, plan: Dict[str, str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """按 dtype 规划转换各列，返回 (新数据, 内存节省报告)"""
+        if plan is None:
+            plan = self.plan_dtypes(df)
+        
+        before = df.memory_usage(deep=True)
+        optimized = df.astype(plan) if plan else df.copy()
+        after = optimized.memory_usage(deep=True)
+        
+        before_bytes = int(before.sum())
+        after_bytes = int(after.sum())
+        report = {
+            'before_bytes': before_bytes,
+            'after_bytes': after_bytes,
+            'saved_bytes': before_bytes - after_bytes,
+            'reduction_ratio': round(before_bytes / after_bytes, 2) if after_bytes else 0,
+            'columns': {
+                col: {
+                    'from': str(df[col].dtype),
+                    'to': target,
+                    'before_bytes': int(before[col]),
+                    'after_bytes': int(after[col])
+                }
+                for col, target in plan.items()
+            }
+        }
+        
+        logger.info(f"dtype优化: {before_bytes} -> {after_bytes} 字节 ({len(plan)} 列转换)")
+        return optimized, report
+    
+    def fit_encoder(self, df: pd.DataFrame) -> 'SynthesisEncoder':
+        """根据原始数据拟合可逆编码器"""
+        return SynthesisEncoder().fit(df)
+    
+    def prepare_for_synthesis(self, df: pd.DataFrame, target_columns: List[str] = None,
+                              encoder: 'SynthesisEncoder' = None) -> pd.DataFrame:
+        """
+        为合成数据生成准备数据
+        
+        分类变量编码为整数，日期时间变量转换为时间戳。传入 encoder 时使用
+        它的编码，以便之后用同一个 encoder 还原合成数据。
+        """
         prepared_df = df.copy()
         
         # 选择目标列
         if target_columns:
             prepared_df = prepared_df[target_columns]
         
-        # 处理分类变量
-        categorical_cols = prepared_df.select_dtypes(include=['object', 'category']).columns
-        for col in categorical_cols:
-            # 编码分类变量
-            prepared_df[col] = pd.Categorical(prepared_df[col]).codes
-        
-        # 处理日期时间变量
-        datetime_cols = prepared_df.select_dtypes(include=['datetime64']).columns
-        for col in datetime_cols:
-            # 转换为时间戳
-            prepared_df[col] = prepared_df[col].astype('int64') // 10**9
-        
-        return prepared_df
+        if encoder is None:
+            encoder = SynthesisEncoder().fit(prepared_df)
+        return encoder.transform(prepared_df)
     
-    def post_process_synthetic(self, synthetic_df: pd.DataFrame, original_df: pd.DataFrame) -> pd.DataFrame:
-        """后处理合成数据"""
-        processed_df = synthetic_df.copy()
-        
-        # 恢复分类变量
-        categorical_cols = original_df.select_dtypes(include=['object', 'category']).columns
-        for col in categorical_cols:
-            if col in processed_df.columns:
-                # 获取原始分类值
-                original_categories = original_df[col].cat.categories if hasattr(original_df[col], 'cat') else original_df[col].unique()
-                # 映射回原始值
-                processed_df[col] = processed_df[col].map(lambda x: original_categories[int(x)] if 0 <= int(x) < len(original_categories) else 'Unknown')
-        
-        # 恢复日期时间变量
-        datetime_cols = original_df.select_dtypes(include=['datetime64']).columns
-        for col in datetime_cols:
-            if col in processed_df.columns:
-                # 转换回日期时间
-                processed_df[col] = pd.to_datetime(processed_df[col], unit='s')
-        
-        return processed_df
+    def post_process_synthetic(self, synthetic_df: pd.DataFrame, original_df: pd.DataFrame = None,
+                               encoder: 'SynthesisEncoder' = None) -> pd.DataFrame:
+        """后处理合成数据；未传入 encoder 时根据原始数据重新拟合"""
+        if encoder is None:
+            if original_df is None:
+                raise ValueError('需要提供 encoder 或 original_df')
+            encoder = SynthesisEncoder().fit(original_df)
+        return encoder.inverse_transform(synthetic_df)
     
     def validate_synthetic_data(self, original_df: pd.DataFrame, synthetic_df: pd.DataFrame) -> Dict[str, Any]:
         """验证合成数据质量"""
@@ -292,3 +393,110 @@ class DataProcessor:
             validation_results['overall_score'] = np.mean(scores)
         
         return validation_results
+
+
+class SynthesisEncoder:
+    """
+    合成数据的可逆编码器
+    
+    fit 时记录分类列的类别数组和日期时间列的类型；transform 将分类编码为
+    整数、日期时间转换为秒级时间戳，inverse_transform 用向量化的数组索引
+    还原。to_dict/from_dict 可将编码器与训练好的模型一起保存。
+    """
+    
+    UNKNOWN = 'Unknown'
+    TIME_UNIT = 's'
+    
+    def __init__(self):
+        self.categories: Dict[str, np.ndarray] = {}
+        self.datetimes: Dict[str, str] = {}
+    
+    def fit(self, df: pd.DataFrame) -> 'SynthesisEncoder':
+        """记录各列的编码方式"""
+        self.categories = {}
+        self.datetimes = {}
+        for col in df.columns:
+            dtype = df[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                self.categories[col] = np.asarray(dtype.categories, dtype=object)
+            elif _is_text(df[col]):
+                self.categories[col] = np.asarray(pd.Categorical(df[col]).categories, dtype=object)
+            elif pd.api.types.is_datetime64_any_dtype(dtype):
+                self.datetimes[col] = str(dtype)
+        return self
+    
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """编码：分类 -> 类别下标（未知值为 -1），日期时间 -> 时间戳"""
+        encoded = df.copy()
+        for col, categories in self.categories.items():
+            if col in encoded.columns:
+                encoded[col] = pd.Categorical(encoded[col], categories=categories).codes
+        
+        for col in self.datetimes:
+            if col in encoded.columns:
+                values = encoded[col]
+                if getattr(values.dtype, 'tz', None) is not None:
+                    values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+                stamps = values.to_numpy(dtype=f'datetime64[{self.TIME_UNIT}]')
+                missing = np.isnat(stamps)
+                seconds = stamps.astype('int64')
+                encoded[col] = np.where(missing, np.nan, seconds) if missing.any() else seconds
+        return encoded
+    
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(df).transform(df)
+    
+    def inverse_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """解码：按类别下标取值（越界或缺失为 Unknown），时间戳还原为日期时间"""
+        decoded = df.copy()
+        for col, categories in self.categories.items():
+            if col not in decoded.columns:
+                continue
+            
+            values = pd.to_numeric(decoded[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            codes = np.rint(values)
+            invalid = ~((codes >= 0) & (codes < len(categories)))
+            codes = np.where(invalid, len(categories), codes).astype(np.intp)
+            
+            # 末尾追加 Unknown，越界下标统一指向它
+            lookup = np.append(categories, self.UNKNOWN)
+            decoded[col] = lookup.take(codes)
+        
+        for col, dtype in self.datetimes.items():
+            if col not in decoded.columns:
+                continue
+            
+            values = pd.to_numeric(decoded[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            missing = np.isnan(values)
+            stamps = np.where(missing, 0, np.rint(values)).astype('int64').astype(f'datetime64[{self.TIME_UNIT}]')
+            stamps[missing] = np.datetime64('NaT')
+            
+            # 在 numpy 中转换到原始精度，比 pandas 的 astype 快一个数量级
+            target = pd.api.types.pandas_dtype(dtype)
+            unit = target.unit if isinstance(target, pd.DatetimeTZDtype) else np.datetime_data(target)[0]
+            restored = pd.Series(stamps.astype(f'datetime64[{unit}]'), index=decoded.index)
+            if isinstance(target, pd.DatetimeTZDtype):
+                restored = restored.dt.tz_localize('UTC').dt.tz_convert(target.tz)
+            decoded[col] = restored
+        return decoded
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为可 JSON 序列化的字典"""
+        return {
+            'categories': {col: values.tolist() for col, values in self.categories.items()},
+            'datetimes': dict(self.datetimes),
+            'time_unit': self.TIME_UNIT
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SynthesisEncoder':
+        """从 to_dict 的结果恢复编码器"""
+        if data.get('time_unit', cls.TIME_UNIT) != cls.TIME_UNIT:
+            raise ValueError(f"不支持的时间单位: {data.get('time_unit')}")
+        
+        encoder = cls()
+        encoder.categories = {
+            col: np.asarray(values, dtype=object) for col, values in data.get('categories', {}).items()
+        }
+        encoder.datetimes = dict(data.get('datetimes', {}))
+        return encoder
@@ -4,415 +4,466 @@
 数据库连接器
 ============
 
-提供各种数据库的连接和查询功能
+提供各种数据库的连接和查询功能。
+
+各数据库的连接、表结构查询和数据读取由 ``utils.dialects`` 中的方言插件实现，
+驱动在首次使用对应类型时才导入。声明了 ``pooling`` 能力的方言会复用空闲连接。
+
+批量抽取（``iter_arrow_batches`` / ``extract_to_cache``）以 Arrow RecordBatch
+为单位读取数据，可按数值列拆分为多个范围查询并行执行，结果直接写入列式缓存，
+之后由 ``read_cached`` 读取为 DataFrame 供合成、预览和下载使用。缓存键不含密码，
+因此命中缓存前总是先用请求中的凭据连接一次数据库。
+已安装对应 ADBC 驱动时结果集不经过 Python 元组；否则退化为游标分批读取后转换。
 """
 
-import pandas as pd
-import pymysql
-import psycopg2
-import cx_Oracle
-import pymongo
-import pyodbc
-import sqlite3
-from sqlalchemy import create_engine, text
+import math
+import time
+import queue
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Any, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from .dialects import Dialect, get_dialect, available_dialects
+from .lazy_imports import lazy_import
+from .columnar_cache import ColumnarCache, columnar_key, get_columnar_cache
+
+if TYPE_CHECKING:
+    import pyarrow as pa
 
 logger = logging.getLogger(__name__)
 
+# 每个连接配置最多缓存的空闲连接数
+MAX_IDLE_CONNECTIONS = 4
+# 空闲超过该时间（秒）的连接复用前先检查是否可用
+PING_AFTER_IDLE = 60
+# 并行分区读取时每个分区最多缓冲的批次数
+PARTITION_QUEUE_SIZE = 2
+# 分区读取的最大并行数（每个分区占用一个线程和一个数据库连接）
+MAX_PARTITIONS = 8
+# 连接配置中的字段，其余字段（表名、抽取参数等）不参与连接和缓存键
+CONNECTION_FIELDS = ('type', 'host', 'port', 'database', 'username', 'password')
+# 列类型尚未确定（已读取的值全部为空）时最多缓冲的行数，超过后该列按字符串处理
+SCHEMA_PROBE_ROWS = 100_000
+
+
+def partition_bounds(low: Any, high: Any, partitions: int) -> List[Tuple[Any, Any]]:
+    """将 [low, high] 均分为最多 partitions 个区间；整数键的区间边界取整数"""
+    if isinstance(low, int) and isinstance(high, int):
+        step = max(1, math.ceil((high - low + 1) / partitions))
+        edges = list(range(low, high, step)) + [high]
+    else:
+        low, high = float(low), float(high)
+        step = (high - low) / partitions
+        edges = [low + step * i for i in range(partitions)] + [high]
+        edges = sorted(set(edges))
+    if len(edges) == 1:
+        return [(low, high)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def connection_config(data: Dict[str, Any]) -> Dict[str, Any]:
+    """从请求参数中取出连接配置字段"""
+    return {field: data[field] for field in CONNECTION_FIELDS if field in data}
+
+
+def _promote_null_fields(schema: 'pa.Schema', other: 'pa.Schema') -> 'pa.Schema':
+    """用 other 中对应列的具体类型替换 schema 中的空类型（null）列"""
+    pa = lazy_import('pyarrow')
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type) and not pa.types.is_null(other.field(i).type):
+            schema = schema.set(i, field.with_type(other.field(i).type))
+    return schema
+
+
+def _has_null_fields(schema: 'pa.Schema') -> bool:
+    pa = lazy_import('pyarrow')
+    return any(pa.types.is_null(field.type) for field in schema)
+
+
+def _conform(batch: 'pa.RecordBatch', schema: 'pa.Schema') -> 'pa.RecordBatch':
+    return batch if batch.schema.equals(schema) else batch.cast(schema)
+
+
 class DatabaseConnector:
     """数据库连接器类"""
-    
-    def __init__(self):
-        self.connections = {}
-    
+
+    def __init__(self, max_idle: int = MAX_IDLE_CONNECTIONS):
+        # 连接池: 连接配置键 -> [(连接, 归还时间)]
+        self.connections: Dict[Tuple, List[Tuple[Any, float]]] = {}
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _dialect(config: Dict[str, Any]) -> Dialect:
+        return get_dialect(config.get('type', ''))
+
+    @staticmethod
+    def _pool_key(config: Dict[str, Any]) -> Tuple:
+        return tuple(sorted((key, str(value)) for key, value in config.items()))
+
+    def _acquire(self, dialect: Dialect, config: Dict[str, Any]) -> Any:
+        """从连接池取出可用连接，没有时新建"""
+        if dialect.capabilities.get('pooling'):
+            key = self._pool_key(config)
+            while True:
+                with self._lock:
+                    idle = self.connections.get(key)
+                    if not idle:
+                        break
+                    connection, returned_at = idle.pop()
+
+                if time.time() - returned_at < PING_AFTER_IDLE:
+                    return connection
+                try:
+                    dialect.ping(connection)
+                    return connection
+                except Exception:
+                    self._close_quietly(dialect, connection)
+
+        return dialect.connect(config)
+
+    def _release(self, dialect: Dialect, config: Dict[str, Any], connection: Any):
+        """归还连接；不支持复用或连接池已满时关闭"""
+        if dialect.capabilities.get('pooling'):
+            try:
+                dialect.reset(connection)
+                with self._lock:
+                    idle = self.connections.setdefault(self._pool_key(config), [])
+                    if len(idle) < self.max_idle:
+                        idle.append((connection, time.time()))
+                        return
+            except Exception:
+                pass
+        self._close_quietly(dialect, connection)
+
+    @staticmethod
+    def _close_quietly(dialect: Dialect, connection: Any):
+        try:
+            dialect.close(connection)
+        except Exception:
+            pass
+
+    @contextmanager
+    def connect(self, config: Dict[str, Any]) -> Iterator[Tuple[Dialect, Any]]:
+        """获取 (方言, 连接)，退出时归还连接；出错的连接直接关闭"""
+        dialect = self._dialect(config)
+        connection = self._acquire(dialect, config)
+        try:
+            yield dialect, connection
+        except BaseException:
+            self._close_quietly(dialect, connection)
+            raise
+        else:
+            self._release(dialect, config, connection)
+
+    def close(self):
+        """关闭连接池中的所有连接"""
+        with self._lock:
+            pools, self.connections = self.connections, {}
+        for key, idle in pools.items():
+            dialect = get_dialect(dict(key).get('type', ''))
+            for connection, _ in idle:
+                self._close_quietly(dialect, connection)
+
     def get_connection_string(self, config: Dict[str, Any]) -> str:
         """根据配置生成数据库连接字符串"""
-        db_type = config.get('type', '').lower()
-        
-        if db_type == 'mysql':
-            return f"mysql+pymysql://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
-        elif db_type == 'postgresql':
-            return f"postgresql://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
-        elif db_type == 'oracle':
-            return f"oracle+cx_oracle://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
-        elif db_type == 'sqlserver':
-            return f"mssql+pyodbc://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}?driver=ODBC+Driver+17+for+SQL+Server"
-        elif db_type == 'sqlite':
-            return f"sqlite:///{config['database']}"
-        else:
-            raise ValueError(f"不支持的数据库类型: {db_type}")
-    
+        return self._dialect(config).connection_string(config)
+
+    def get_capabilities(self, db_type: str) -> Dict[str, bool]:
+        """获取数据库类型支持的能力（连接复用、抽样、流式读取等）；
+        arrow 仅在已安装 pyarrow 和对应 ADBC 驱动时为 True"""
+        dialect = get_dialect(db_type)
+        return dict(dialect.capabilities, arrow=dialect.arrow_available())
+
+    def get_supported_types(self) -> List[str]:
+        """获取支持的数据库类型"""
+        return available_dialects()
+
     def test_connection(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """测试数据库连接"""
+        """测试数据库连接（总是新建连接）"""
         try:
-            db_type = config.get('type', '').lower()
-            
-            if db_type == 'mysql':
-                connection = pymysql.connect(
-                    host=config['host'],
-                    port=int(config['port']),
-                    user=config['username'],
-                    password=config['password'],
-                    database=config['database'],
-                    charset='utf8mb4'
-                )
-                connection.close()
-                
-            elif db_type == 'postgresql':
-                connection = psycopg2.connect(
-                    host=config['host'],
-                    port=int(config['port']),
-                    user=config['username'],
-                    password=config['password'],
-                    database=config['database']
-                )
-                connection.close()
-                
-            elif db_type == 'oracle':
-                dsn = cx_Oracle.makedsn(config['host'], int(config['port']), service_name=config['database'])
-                connection = cx_Oracle.connect(config['username'], config['password'], dsn)
-                connection.close()
-                
-            elif db_type == 'sqlserver':
-                connection_string = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={config['host']},{config['port']};DATABASE={config['database']};UID={config['username']};PWD={config['password']}"
-                connection = pyodbc.connect(connection_string)
-                connection.close()
-                
-            elif db_type == 'sqlite':
-                connection = sqlite3.connect(config['database'])
-                connection.close()
-                
-            elif db_type == 'mongodb':
-                client = pymongo.MongoClient(
-                    f"mongodb://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
-                )
-                client.admin.command('ping')
-                client.close()
-                
-            else:
-                return {
-                    'success': False,
-                    'error': f'不支持的数据库类型: {db_type}'
-                }
-            
+            dialect = self._dialect(config)
+            connection = dialect.connect(config)
+            try:
+                dialect.ping(connection)
+            finally:
+                self._close_quietly(dialect, connection)
+
             return {
                 'success': True,
                 'message': '连接成功'
             }
-            
+
         except Exception as e:
             logger.error(f"数据库连接测试失败: {str(e)}")
             return {
                 'success': False,
                 'error': str(e)
             }
-    
+
     def get_tables(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """获取数据库中的表列表"""
         try:
-            db_type = config.get('type', '').lower()
-            tables = []
-            
-            if db_type == 'mysql':
-                connection = pymysql.connect(
-                    host=config['host'],
-                    port=int(config['port']),
-                    user=config['username'],
-                    password=config['password'],
-                    database=config['database'],
-                    charset='utf8mb4'
-                )
-                cursor = connection.cursor()
-                cursor.execute("SHOW TABLES")
-                table_names = cursor.fetchall()
-                
-                for table_name in table_names:
-                    table_name = table_name[0]
-                    # 获取表的行数和列数
-                    cursor.execute(f"SELECT COUNT(*) FROM `{table_name}`")
-                    row_count = cursor.fetchone()[0]
-                    
-                    cursor.execute(f"DESCRIBE `{table_name}`")
-                    columns = cursor.fetchall()
-                    col_count = len(columns)
-                    
-                    tables.append({
-                        'name': table_name,
-                        'description': f'{table_name}表',
-                        'rows': row_count,
-                        'columns': col_count
-                    })
-                
-                cursor.close()
-                connection.close()
-                
-            elif db_type == 'postgresql':
-                connection = psycopg2.connect(
-                    host=config['host'],
-                    port=int(config['port']),
-                    user=config['username'],
-                    password=config['password'],
-                    database=config['database']
-                )
-                cursor = connection.cursor()
-                
-                # 获取表列表
-                cursor.execute("""
-                    SELECT table_name 
-                    FROM information_schema.tables 
-                    WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
-                """)
-                table_names = cursor.fetchall()
-                
-                for table_name in table_names:
-                    table_name = table_name[0]
-                    # 获取表的行数和列数
-                    cursor.execute(f"SELECT COUNT(*) FROM \"{table_name}\"")
-                    row_count = cursor.fetchone()[0]
-                    
-                    cursor.execute(f"""
-                        SELECT COUNT(*) 
-                        FROM information_schema.columns 
-                        WHERE table_name = '{table_name}' AND table_schema = 'public'
-                    """)
-                    col_count = cursor.fetchone()[0]
-                    
-                    tables.append({
-                        'name': table_name,
-                        'description': f'{table_name}表',
-                        'rows': row_count,
-                        'columns': col_count
-                    })
-                
-                cursor.close()
-                connection.close()
-                
-            elif db_type == 'oracle':
-                dsn = cx_Oracle.makedsn(config['host'], int(config['port']), service_name=config['database'])
-                connection = cx_Oracle.connect(config['username'], config['password'], dsn)
-                cursor = connection.cursor()
-                
-                # 获取表列表
-                cursor.execute("""
-                    SELECT table_name 
-                    FROM user_tables 
-                    ORDER BY table_name
-                """)
-                table_names = cursor.fetchall()
-                
-                for table_name in table_names:
-                    table_name = table_name[0]
-                    # 获取表的行数和列数
-                    cursor.execute(f"SELECT COUNT(*) FROM \"{table_name}\"")
-                    row_count = cursor.fetchone()[0]
-                    
-                    cursor.execute(f"""
-                        SELECT COUNT(*) 
-                        FROM user_tab_columns 
-                        WHERE table_name = '{table_name}'
-                    """)
-                    col_count = cursor.fetchone()[0]
-                    
-                    tables.append({
-                        'name': table_name,
-                        'description': f'{table_name}表',
-                        'rows': row_count,
-                        'columns': col_count
-                    })
-                
-                cursor.close()
-                connection.close()
-                
-            elif db_type == 'sqlserver':
-                connection_string = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={config['host']},{config['port']};DATABASE={config['database']};UID={config['username']};PWD={config['password']}"
-                connection = pyodbc.connect(connection_string)
-                cursor = connection.cursor()
-                
-                # 获取表列表
-                cursor.execute("""
-                    SELECT TABLE_NAME 
-                    FROM INFORMATION_SCHEMA.TABLES 
-                    WHERE TABLE_TYPE = 'BASE TABLE'
-                """)
-                table_names = cursor.fetchall()
-                
-                for table_name in table_names:
-                    table_name = table_name[0]
-                    # 获取表的行数和列数
-                    cursor.execute(f"SELECT COUNT(*) FROM [{table_name}]")
-                    row_count = cursor.fetchone()[0]
-                    
-                    cursor.execute(f"""
-                        SELECT COUNT(*) 
-                        FROM INFORMATION_SCHEMA.COLUMNS 
-                        WHERE TABLE_NAME = '{table_name}'
-                    """)
-                    col_count = cursor.fetchone()[0]
-                    
-                    tables.append({
-                        'name': table_name,
-                        'description': f'{table_name}表',
-                        'rows': row_count,
-                        'columns': col_count
-                    })
-                
-                cursor.close()
-                connection.close()
-                
-            elif db_type == 'sqlite':
-                connection = sqlite3.connect(config['database'])
-                cursor = connection.cursor()
-                
-                # 获取表列表
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                table_names = cursor.fetchall()
-                
-                for table_name in table_names:
-                    table_name = table_name[0]
-                    # 获取表的行数和列数
-                    cursor.execute(f"SELECT COUNT(*) FROM `{table_name}`")
-                    row_count = cursor.fetchone()[0]
-                    
-                    cursor.execute(f"PRAGMA table_info(`{table_name}`)")
-                    columns = cursor.fetchall()
-                    col_count = len(columns)
-                    
-                    tables.append({
-                        'name': table_name,
-                        'description': f'{table_name}表',
-                        'rows': row_count,
-                        'columns': col_count
-                    })
-                
-                cursor.close()
-                connection.close()
-                
-            elif db_type == 'mongodb':
-                client = pymongo.MongoClient(
-                    f"mongodb://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
-                )
-                db = client[config['database']]
-                collections = db.list_collection_names()
-                
-                for collection_name in collections:
-                    collection = db[collection_name]
-                    doc_count = collection.count_documents({})
-                    
-                    # 获取一个样本文档来估算字段数
-                    sample_doc = collection.find_one()
-                    field_count = len(sample_doc) if sample_doc else 0
-                    
-                    tables.append({
-                        'name': collection_name,
-                        'description': f'{collection_name}集合',
-                        'rows': doc_count,
-                        'columns': field_count
-                    })
-                
-                client.close()
-                
-            else:
-                return {
-                    'success': False,
-                    'error': f'不支持的数据库类型: {db_type}'
-                }
-            
+            with self.connect(config) as (dialect, connection):
+                tables = dialect.list_tables(connection)
+
             return {
                 'success': True,
                 'tables': tables
             }
-            
+
         except Exception as e:
             logger.error(f"获取表列表失败: {str(e)}")
             return {
                 'success': False,
                 'error': str(e)
             }
-    
-    def get_table_data(self, config: Dict[str, Any], table_name: str, limit: int = 100) -> Dict[str, Any]:
-        """获取表数据"""
+
+    def get_table_data(self, config: Dict[str, Any], table_name: str, limit: int = 100,
+                       sample: bool = False) -> Dict[str, Any]:
+        """获取表数据；sample 为 True 且数据库支持时在数据库端随机抽样"""
         try:
-            db_type = config.get('type', '').lower()
-            
-            if db_type == 'mysql':
-                connection = pymysql.connect(
-                    host=config['host'],
-                    port=int(config['port']),
-                    user=config['username'],
-                    password=config['password'],
-                    database=config['database'],
-                    charset='utf8mb4'
-                )
-                df = pd.read_sql(f"SELECT * FROM `{table_name}` LIMIT {limit}", connection)
-                connection.close()
-                
-            elif db_type == 'postgresql':
-                connection = psycopg2.connect(
-                    host=config['host'],
-                    port=int(config['port']),
-                    user=config['username'],
-                    password=config['password'],
-                    database=config['database']
+            with self.connect(config) as (dialect, connection):
+                df = dialect.read_table(
+                    connection, table_name, limit,
+                    sample=sample and dialect.capabilities.get('sampling', False)
                 )
-                df = pd.read_sql(f'SELECT * FROM "{table_name}" LIMIT {limit}', connection)
-                connection.close()
-                
-            elif db_type == 'oracle':
-                dsn = cx_Oracle.makedsn(config['host'], int(config['port']), service_name=config['database'])
-                connection = cx_Oracle.connect(config['username'], config['password'], dsn)
-                df = pd.read_sql(f'SELECT * FROM "{table_name}" WHERE ROWNUM <= {limit}', connection)
-                connection.close()
-                
-            elif db_type == 'sqlserver':
-                connection_string = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={config['host']},{config['port']};DATABASE={config['database']};UID={config['username']};PWD={config['password']}"
-                connection = pyodbc.connect(connection_string)
-                df = pd.read_sql(f"SELECT TOP {limit} * FROM [{table_name}]", connection)
-                connection.close()
-                
-            elif db_type == 'sqlite':
-                connection = sqlite3.connect(config['database'])
-                df = pd.read_sql(f"SELECT * FROM `{table_name}` LIMIT {limit}", connection)
-                connection.close()
-                
-            elif db_type == 'mongodb':
-                client = pymongo.MongoClient(
-                    f"mongodb://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
-                )
-                db = client[config['database']]
-                collection = db[table_name]
-                
-                # 获取数据并转换为DataFrame
-                data = list(collection.find().limit(limit))
-                if data:
-                    df = pd.DataFrame(data)
-                    # 移除MongoDB的_id字段
-                    if '_id' in df.columns:
-                        df = df.drop('_id', axis=1)
-                else:
-                    df = pd.DataFrame()
-                
-                client.close()
-                
-            else:
-                return {
-                    'success': False,
-                    'error': f'不支持的数据库类型: {db_type}'
-                }
-            
+
             # 转换为列表格式
             data_list = [df.columns.tolist()] + df.values.tolist()
-            
+
             return {
                 'success': True,
                 'data': data_list,
                 'columns': df.columns.tolist(),
                 'rows': len(df)
             }
-            
+
         except Exception as e:
             logger.error(f"获取表数据失败: {str(e)}")
             return {
                 'success': False,
                 'error': str(e)
             }
+
+    def iter_table_data(self, config: Dict[str, Any], table_name: str,
+                        batch_size: Optional[int] = None,
+                        limit: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """分批读取表数据，支持流式游标的数据库不会在内存中缓存整个结果集"""
+        with self.connect(config) as (dialect, connection):
+            yield from dialect.iter_table(connection, table_name, batch_size, limit)
+
+    def _iter_arrow_query(self, dialect: Dialect, config: Dict[str, Any], table_name: str,
+                          query: str, batch_size: Optional[int]) -> Iterator['pa.RecordBatch']:
+        """执行查询并逐批返回 RecordBatch；没有 ADBC 驱动时由游标结果转换"""
+        if dialect.arrow_available():
+            connection = dialect.arrow_connect(config)
+            try:
+                yield from dialect.iter_arrow_query(connection, query, batch_size, table=table_name)
+            finally:
+                connection.close()
+            return
+
+        pa = lazy_import('pyarrow')
+        with self.connect(config) as (dialect, connection):
+            for df in dialect.iter_query(connection, query, batch_size):
+                yield pa.RecordBatch.from_pandas(df, preserve_index=False)
+
+    def _iter_partitions(self, dialect: Dialect, config: Dict[str, Any], table_name: str,
+                         queries: List[str], batch_size: Optional[int]) -> Iterator['pa.RecordBatch']:
+        """每个查询使用单独的连接并行执行，按到达顺序返回批次"""
+        batches: queue.Queue = queue.Queue(maxsize=PARTITION_QUEUE_SIZE * len(queries))
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def run(query):
+            try:
+                for batch in self._iter_arrow_query(dialect, config, table_name, query, batch_size):
+                    if stop.is_set():
+                        return
+                    put(batch)
+            except BaseException as e:
+                put(e)
+            finally:
+                put(done)
+
+        executor = ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix='arrow-partition')
+        try:
+            for query in queries:
+                executor.submit(run, query)
+
+            remaining = len(queries)
+            rows = 0
+            empty = None
+            while remaining:
+                item = batches.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                elif item.num_rows:
+                    rows += item.num_rows
+                    yield item
+                else:
+                    empty = item
+            # 所有分区都为空时返回一个空批次，保留列结构
+            if not rows and empty is not None:
+                yield empty
+        finally:
+            stop.set()
+            executor.shutdown(wait=False)
+
+    def iter_arrow_batches(self, config: Dict[str, Any], table_name: str,
+                           batch_size: Optional[int] = None,
+                           partition_on: Optional[str] = None, partitions: int = 1,
+                           limit: Optional[int] = None) -> Iterator['pa.RecordBatch']:
+        """以 Arrow RecordBatch 分批读取表数据
+
+        指定 partition_on（数值列）且 partitions > 1 时，按该列的取值范围拆分为
+        多个查询并行读取（最多 MAX_PARTITIONS 个），批次按到达顺序返回（不保证行序）。
+
+        各批次的列类型分别推断，某一批中整列为空时该列为空类型（null）。这类列
+        在后续批次给出具体类型之前先缓冲已读取的批次，确定类型后统一转换；缓冲
+        超过 SCHEMA_PROBE_ROWS 行仍为空的列按字符串处理。
+        """
+        pa = lazy_import('pyarrow')
+        schema = None
+        pending: Optional[List['pa.RecordBatch']] = []
+        pending_rows = 0
+        for batch in self._iter_arrow_table(config, table_name, batch_size, partition_on, partitions, limit):
+            if pending is None:
+                yield _conform(batch, schema)
+                continue
+
+            schema = batch.schema if schema is None else _promote_null_fields(schema, batch.schema)
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if _has_null_fields(schema):
+                if pending_rows < SCHEMA_PROBE_ROWS:
+                    continue
+                strings = pa.schema([pa.field(field.name, pa.large_string()) for field in schema])
+                schema = _promote_null_fields(schema, strings)
+
+            for buffered in pending:
+                yield _conform(buffered, schema)
+            pending = None
+
+        # 读取结束时仍有整列为空的列，保留空类型
+        for buffered in pending or ():
+            yield _conform(buffered, schema)
+
+    def _iter_arrow_table(self, config: Dict[str, Any], table_name: str, batch_size: Optional[int],
+                          partition_on: Optional[str], partitions: int,
+                          limit: Optional[int]) -> Iterator['pa.RecordBatch']:
+        dialect = self._dialect(config)
+        if not dialect.capabilities.get('sql'):
+            raise ValueError(f"{dialect.name} 不支持批量抽取（需要 SQL 查询）")
+        if not partition_on or partitions <= 1:
+            yield from self._iter_arrow_query(
+                dialect, config, table_name, dialect.table_query(table_name, limit), batch_size
+            )
+            return
+
+        if limit is not None:
+            raise ValueError('分区读取不支持 limit')
+        partitions = min(partitions, MAX_PARTITIONS)
+        with self.connect(config) as (dialect, connection):
+            low, high = dialect.key_range(connection, table_name, partition_on)
+
+        if low is None:
+            # 空表或分区列全部为空
+            yield from self._iter_arrow_query(
+                dialect, config, table_name, dialect.table_query(table_name), batch_size
+            )
+            return
+        if not isinstance(low, int) or not isinstance(high, int):
+            # Decimal 等键按浮点数切分；首尾分区不设边界，舍入不会漏掉行
+            low, high = float(low), float(high)
+
+        bounds = partition_bounds(low, high, partitions)
+        queries = [
+            dialect.range_query(table_name, partition_on, lower, upper,
+                                first=i == 0, last=i == len(bounds) - 1)
+            for i, (lower, upper) in enumerate(bounds)
+        ]
+        yield from self._iter_partitions(dialect, config, table_name, queries, batch_size)
+
+    def read_arrow(self, config: Dict[str, Any], table_name: str, **kwargs) -> 'pa.Table':
+        """读取整张表为 Arrow Table，参数同 iter_arrow_batches"""
+        pa = lazy_import('pyarrow')
+        batches = list(self.iter_arrow_batches(config, table_name, **kwargs))
+        return pa.Table.from_batches(batches)
+
+    @staticmethod
+    def _cache_key(config: Dict[str, Any], table_name: str, limit: Optional[int]) -> str:
+        return columnar_key(dict(connection_config(config), table_name=table_name, limit=limit))
+
+    def _authenticate(self, config: Dict[str, Any]):
+        """用请求中的凭据连接一次数据库，失败时抛出 PermissionError"""
+        result = self.test_connection(config)
+        if not result['success']:
+            raise PermissionError(f"数据库认证失败: {result['error']}")
+
+    def read_cached(self, config: Dict[str, Any], table_name: str,
+                    limit: Optional[int] = None, columns: Optional[List[str]] = None,
+                    cache: Optional[ColumnarCache] = None) -> Optional[pd.DataFrame]:
+        """读取 extract_to_cache 抽取的表数据，未抽取时返回 None；凭据无效时抛出 PermissionError"""
+        cache = cache or get_columnar_cache()
+        key = self._cache_key(config, table_name, limit)
+        if not cache.contains(key):
+            return None
+        self._authenticate(config)
+        return cache.read_pandas(key, columns)
+
+    def extract_to_cache(self, config: Dict[str, Any], table_name: str,
+                         cache: Optional[ColumnarCache] = None, refresh: bool = False,
+                         batch_size: Optional[int] = None,
+                         partition_on: Optional[str] = None, partitions: int = 1,
+                         limit: Optional[int] = None) -> Dict[str, Any]:
+        """将表数据抽取到列式缓存，返回缓存键和抽取统计；已缓存且 refresh 为 False 时直接返回"""
+        try:
+            cache = cache or get_columnar_cache()
+            key = self._cache_key(config, table_name, limit)
+            if not refresh and cache.contains(key):
+                self._authenticate(config)
+                return {
+                    'success': True,
+                    'key': key,
+                    'cached': True
+                }
+
+            started = time.perf_counter()
+            result = cache.write_batches(key, self.iter_arrow_batches(
+                config, table_name, batch_size=batch_size,
+                partition_on=partition_on, partitions=partitions, limit=limit
+            ))
+            elapsed = time.perf_counter() - started
+            logger.info(f"抽取表 {table_name}: {result['rows']} 行, {elapsed:.2f}s")
+
+            return {
+                'success': True,
+                'key': key,
+                'cached': False,
+                'arrow_native': self._dialect(config).arrow_available(),
+                'elapsed': round(elapsed, 3),
+                **result
+            }
+
+        except Exception as e:
+            logger.error(f"抽取表数据失败: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
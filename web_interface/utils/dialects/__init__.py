@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库方言插件
+==============
+
+方言按名称注册为 ``模块:类`` 路径，首次使用时才导入对应模块（及其驱动），
+未安装的驱动不影响其他数据库类型。
+
+接入新的驱动（例如 Arrow 原生的 ADBC / connectorx）只需实现 ``Dialect``
+并注册，调用方无需修改::
+
+    register_dialect('postgresql', 'my_package.adbc_postgres:ADBCPostgresDialect')
+"""
+
+import threading
+from typing import Dict, List, Type, Union
+
+from ..lazy_imports import lazy_import
+from .base import Dialect, DEFAULT_CAPABILITIES
+
+_registry: Dict[str, Union[str, Type[Dialect]]] = {
+    'mysql': f'{__name__}.mysql:MySQLDialect',
+    'postgresql': f'{__name__}.postgresql:PostgreSQLDialect',
+    'oracle': f'{__name__}.oracle:OracleDialect',
+    'sqlserver': f'{__name__}.sqlserver:SQLServerDialect',
+    'sqlite': f'{__name__}.sqlite:SQLiteDialect',
+    'mongodb': f'{__name__}.mongodb:MongoDBDialect'
+}
+_instances: Dict[str, Dialect] = {}
+_lock = threading.Lock()
+
+
+def register_dialect(name: str, dialect: Union[str, Type[Dialect]]):
+    """注册方言，dialect 为方言类或 ``模块:类`` 路径；同名方言会被替换"""
+    with _lock:
+        _registry[name.lower()] = dialect
+        _instances.pop(name.lower(), None)
+
+
+def get_dialect(name: str) -> Dialect:
+    """获取方言实例，首次使用时导入"""
+    name = (name or '').lower()
+    with _lock:
+        if name in _instances:
+            return _instances[name]
+        if name not in _registry:
+            raise ValueError(f"不支持的数据库类型: {name}")
+
+        dialect = _registry[name]
+        if isinstance(dialect, str):
+            module, attr = dialect.split(':')
+            try:
+                dialect = getattr(lazy_import(module), attr)
+            except ImportError as e:
+                raise ImportError(f"数据库类型 {name} 的驱动未安装: {e}")
+        _instances[name] = dialect()
+        return _instances[name]
+
+
+def available_dialects() -> List[str]:
+    """已注册的数据库类型"""
+    return sorted(_registry)
+
+
+__all__ = [
+    'Dialect',
+    'DEFAULT_CAPABILITIES',
+    'register_dialect',
+    'get_dialect',
+    'available_dialects'
+]
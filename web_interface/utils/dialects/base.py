@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库方言基类
+==============
+
+每种数据库一个方言插件，负责连接、表结构查询和数据读取。
+DatabaseConnector 只通过本接口调用方言，不关心具体驱动。
+
+方言通过 ``capabilities`` 声明自身能力:
+
+- ``pooling``     连接可以复用，DatabaseConnector 会缓存空闲连接
+- ``sampling``    支持在数据库端随机抽样
+- ``streaming``   支持流式游标（服务端游标），读取大表时不在客户端缓存全部结果
+- ``bulk_fetch``  支持按数组批量获取（可调 arraysize / itersize）
+- ``arrow``       支持直接读取为 Arrow 数据（需安装 pyarrow 和 ``arrow_driver``
+                  指定的 ADBC 驱动），结果集不经过 Python 元组，直接以列式批次返回
+- ``sql``         通过 SQL 查询读取数据（``table_query`` / ``range_query`` / ``iter_query``），
+                  批量抽取到列式缓存依赖该能力
+"""
+
+import importlib.util
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from ..lazy_imports import lazy_import
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+DEFAULT_CAPABILITIES = {
+    'pooling': False,
+    'sampling': False,
+    'streaming': False,
+    'bulk_fetch': False,
+    'arrow': False,
+    'sql': True
+}
+
+
+class Dialect:
+    """数据库方言基类（适用于 DB-API 2.0 驱动）"""
+
+    name = ''
+    capabilities: Dict[str, bool] = DEFAULT_CAPABILITIES
+    # 随机排序函数，用于数据库端抽样
+    random_function = 'RANDOM()'
+    fetch_size = 10000
+    # ADBC 驱动的 DB-API 模块（如 adbc_driver_postgresql.dbapi）
+    arrow_driver: Optional[str] = None
+    # ADBC 语句中控制每批行数的选项
+    arrow_batch_option: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # 连接
+    # ------------------------------------------------------------------
+
+    def connect(self, config: Dict[str, Any]) -> Any:
+        """创建新连接"""
+        raise NotImplementedError
+
+    def connection_string(self, config: Dict[str, Any]) -> str:
+        """SQLAlchemy 连接字符串"""
+        raise NotImplementedError
+
+    def ping(self, connection: Any):
+        """检查连接是否可用，不可用时抛出异常"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def reset(self, connection: Any):
+        """连接归还连接池前结束未提交的事务"""
+        connection.rollback()
+
+    def close(self, connection: Any):
+        connection.close()
+
+    # ------------------------------------------------------------------
+    # 表结构
+    # ------------------------------------------------------------------
+
+    def quote(self, identifier: str) -> str:
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def table_names(self, connection: Any) -> List[str]:
+        raise NotImplementedError
+
+    def column_count(self, connection: Any, table: str) -> int:
+        raise NotImplementedError
+
+    def _scalar(self, connection: Any, query: str, params: Optional[tuple] = None) -> Any:
+        cursor = connection.cursor()
+        try:
+            if params is None:
+                cursor.execute(query)
+            else:
+                cursor.execute(query, params)
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def row_count(self, connection: Any, table: str) -> int:
+        return self._scalar(connection, f"SELECT COUNT(*) FROM {self.quote(table)}")
+
+    def key_range(self, connection: Any, table: str, column: str) -> Tuple[Any, Any]:
+        """数值列的最小值和最大值，用于按范围分区读取"""
+        cursor = connection.cursor()
+        try:
+            column = self.quote(column)
+            cursor.execute(f"SELECT MIN({column}), MAX({column}) FROM {self.quote(table)}")
+            low, high = cursor.fetchone()
+        finally:
+            cursor.close()
+        return low, high
+
+    def list_tables(self, connection: Any) -> List[Dict[str, Any]]:
+        """表列表（名称、行数、列数）"""
+        return [
+            {
+                'name': table,
+                'description': f'{table}表',
+                'rows': self.row_count(connection, table),
+                'columns': self.column_count(connection, table)
+            }
+            for table in self.table_names(connection)
+        ]
+
+    # ------------------------------------------------------------------
+    # 数据读取
+    # ------------------------------------------------------------------
+
+    def table_query(self, table: str, limit: Optional[int] = None, sample: bool = False) -> str:
+        """读取表数据的查询语句"""
+        query = f"SELECT * FROM {self.quote(table)}"
+        if sample:
+            query += f" ORDER BY {self.random_function}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return query
+
+    def range_query(self, table: str, column: str, low: float, high: float,
+                    first: bool = False, last: bool = False) -> str:
+        """读取分区 [low, high) 的查询语句
+
+        第一个分区不设下界，最后一个分区不设上界并包含空值：边界由 MIN/MAX
+        转换为浮点数时可能发生舍入，两端开放才不会漏掉最小值或最大值所在的行。
+        """
+        column = self.quote(column)
+        query = f"SELECT * FROM {self.quote(table)}"
+        conditions = []
+        if not first:
+            conditions.append(f"{column} >= {low!r}")
+        if not last:
+            conditions.append(f"{column} < {high!r}")
+        if not conditions:
+            return query
+        condition = ' AND '.join(conditions)
+        if last:
+            condition = f"{condition} OR {column} IS NULL"
+        return f"{query} WHERE {condition}"
+
+    def cursor(self, connection: Any, streaming: bool = False) -> Any:
+        """创建游标；streaming 为 True 且支持时使用服务端游标"""
+        return connection.cursor()
+
+    def records(self, rows: List[Any]) -> List[Any]:
+        """将驱动返回的行转换为 DataFrame.from_records 可接受的格式"""
+        return rows
+
+    def iter_query(self, connection: Any, query: str,
+                   batch_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """分批执行查询，逐批返回 DataFrame"""
+        batch_size = batch_size or self.fetch_size
+        cursor = self.cursor(connection, streaming=True)
+        try:
+            cursor.arraysize = batch_size
+            cursor.execute(query)
+            # 服务端游标在第一次获取数据后才有列信息
+            rows = cursor.fetchmany(batch_size)
+            columns = [column[0] for column in cursor.description]
+            if not rows:
+                yield pd.DataFrame(columns=columns)
+                return
+            while rows:
+                yield pd.DataFrame.from_records(self.records(rows), columns=columns)
+                rows = cursor.fetchmany(batch_size)
+        finally:
+            cursor.close()
+
+    def read_query(self, connection: Any, query: str) -> pd.DataFrame:
+        """执行查询并返回完整结果"""
+        cursor = self.cursor(connection)
+        try:
+            cursor.execute(query)
+            rows = cursor.fetchall()
+            columns = [column[0] for column in cursor.description]
+        finally:
+            cursor.close()
+        return pd.DataFrame.from_records(self.records(rows), columns=columns)
+
+    def read_table(self, connection: Any, table: str, limit: Optional[int] = None,
+                   sample: bool = False) -> pd.DataFrame:
+        """读取表数据"""
+        return self.read_query(connection, self.table_query(table, limit, sample))
+
+    def iter_table(self, connection: Any, table: str, batch_size: Optional[int] = None,
+                   limit: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """流式读取表数据"""
+        return self.iter_query(connection, self.table_query(table, limit), batch_size)
+
+    # ------------------------------------------------------------------
+    # Arrow 读取
+    # ------------------------------------------------------------------
+
+    def arrow_available(self) -> bool:
+        """是否可以使用 Arrow 原生读取（声明了 arrow 能力且已安装 pyarrow 和 ADBC 驱动）"""
+        if not (self.capabilities.get('arrow') and self.arrow_driver):
+            return False
+        return all(
+            importlib.util.find_spec(module) is not None
+            for module in ('pyarrow', self.arrow_driver.split('.')[0])
+        )
+
+    def arrow_uri(self, config: Dict[str, Any]) -> str:
+        """ADBC 驱动的连接地址"""
+        raise NotImplementedError
+
+    def arrow_connect(self, config: Dict[str, Any]) -> Any:
+        """创建 ADBC 连接（每个分区单独使用一个连接）"""
+        return lazy_import(self.arrow_driver).connect(self.arrow_uri(config))
+
+    def iter_arrow_query(self, connection: Any, query: str, batch_size: Optional[int] = None,
+                         table: Optional[str] = None) -> Iterator['pa.RecordBatch']:
+        """通过 ADBC 连接执行查询，逐批返回 Arrow RecordBatch；结果为空时返回一个空批次
+
+        table 为查询读取的表，驱动需要按表结构确定列类型时使用。
+        """
+        pa = lazy_import('pyarrow')
+        cursor = connection.cursor()
+        try:
+            if batch_size and self.arrow_batch_option:
+                cursor.adbc_statement.set_options(**{self.arrow_batch_option: str(int(batch_size))})
+            cursor.execute(query)
+            reader = cursor.fetch_record_batch()
+            empty = True
+            for batch in reader:
+                empty = False
+                yield batch
+            if empty:
+                yield pa.RecordBatch.from_pylist([], schema=reader.schema)
+        finally:
+            cursor.close()
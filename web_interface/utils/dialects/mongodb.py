@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MongoDB 方言（pymongo）
+
+连接对象为 pymongo 的 Database，集合对应表。文档没有固定结构，
+不支持 SQL 查询，因此不能批量抽取到列式缓存。
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+import pymongo
+
+from .base import Dialect, DEFAULT_CAPABILITIES
+
+
+class MongoDBDialect(Dialect):
+    """MongoDB 方言"""
+
+    name = 'mongodb'
+    capabilities = dict(DEFAULT_CAPABILITIES, pooling=True, sampling=True, streaming=True, sql=False)
+
+    def connect(self, config: Dict[str, Any]) -> Any:
+        client = pymongo.MongoClient(self.connection_string(config))
+        return client[config['database']]
+
+    def connection_string(self, config: Dict[str, Any]) -> str:
+        return f"mongodb://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
+
+    def ping(self, connection: Any):
+        connection.client.admin.command('ping')
+
+    def reset(self, connection: Any):
+        pass
+
+    def close(self, connection: Any):
+        connection.client.close()
+
+    def list_tables(self, connection: Any) -> List[Dict[str, Any]]:
+        tables = []
+        for collection_name in connection.list_collection_names():
+            collection = connection[collection_name]
+            # 获取一个样本文档来估算字段数
+            sample_doc = collection.find_one()
+            tables.append({
+                'name': collection_name,
+                'description': f'{collection_name}集合',
+                'rows': collection.count_documents({}),
+                'columns': len(sample_doc) if sample_doc else 0
+            })
+        return tables
+
+    @staticmethod
+    def _frame(documents: List[Dict[str, Any]]) -> pd.DataFrame:
+        df = pd.DataFrame(documents)
+        # 移除MongoDB的_id字段
+        if '_id' in df.columns:
+            df = df.drop('_id', axis=1)
+        return df
+
+    def read_table(self, connection: Any, table: str, limit: Optional[int] = None,
+                   sample: bool = False) -> pd.DataFrame:
+        collection = connection[table]
+        if sample and limit is not None:
+            documents = list(collection.aggregate([{'$sample': {'size': int(limit)}}]))
+        else:
+            cursor = collection.find()
+            if limit is not None:
+                cursor = cursor.limit(int(limit))
+            documents = list(cursor)
+        return self._frame(documents)
+
+    def iter_table(self, connection: Any, table: str, batch_size: Optional[int] = None,
+                   limit: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        batch_size = batch_size or self.fetch_size
+        cursor = connection[table].find().batch_size(batch_size)
+        if limit is not None:
+            cursor = cursor.limit(int(limit))
+
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield self._frame(batch)
+                batch = []
+        if batch:
+            yield self._frame(batch)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MySQL 方言（pymysql）
+"""
+
+from typing import Any, Dict, List
+
+import pymysql
+import pymysql.cursors
+
+from .base import Dialect, DEFAULT_CAPABILITIES
+
+
+class MySQLDialect(Dialect):
+    """MySQL 方言"""
+
+    name = 'mysql'
+    capabilities = dict(DEFAULT_CAPABILITIES, pooling=True, sampling=True, streaming=True)
+    random_function = 'RAND()'
+
+    def connect(self, config: Dict[str, Any]) -> Any:
+        return pymysql.connect(
+            host=config['host'],
+            port=int(config['port']),
+            user=config['username'],
+            password=config['password'],
+            database=config['database'],
+            charset='utf8mb4'
+        )
+
+    def connection_string(self, config: Dict[str, Any]) -> str:
+        return f"mysql+pymysql://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
+
+    def ping(self, connection: Any):
+        connection.ping(reconnect=False)
+
+    def quote(self, identifier: str) -> str:
+        return '`' + identifier.replace('`', '``') + '`'
+
+    def table_names(self, connection: Any) -> List[str]:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SHOW TABLES")
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def column_count(self, connection: Any, table: str) -> int:
+        return self._scalar(
+            connection,
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            (table,)
+        )
+
+    def cursor(self, connection: Any, streaming: bool = False) -> Any:
+        # SSCursor 逐行从服务端读取，不在客户端缓存整个结果集
+        if streaming:
+            return connection.cursor(pymysql.cursors.SSCursor)
+        return connection.cursor()
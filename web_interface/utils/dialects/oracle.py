@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Oracle 方言（cx_Oracle）
+"""
+
+from typing import Any, Dict, List, Optional
+
+import cx_Oracle
+
+from .base import Dialect, DEFAULT_CAPABILITIES
+
+
+class OracleDialect(Dialect):
+    """Oracle 方言"""
+
+    name = 'oracle'
+    capabilities = dict(DEFAULT_CAPABILITIES, pooling=True, sampling=True, streaming=True, bulk_fetch=True)
+    random_function = 'DBMS_RANDOM.VALUE'
+
+    def connect(self, config: Dict[str, Any]) -> Any:
+        dsn = cx_Oracle.makedsn(config['host'], int(config['port']), service_name=config['database'])
+        return cx_Oracle.connect(config['username'], config['password'], dsn)
+
+    def connection_string(self, config: Dict[str, Any]) -> str:
+        return f"oracle+cx_oracle://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
+
+    def ping(self, connection: Any):
+        connection.ping()
+
+    def table_names(self, connection: Any) -> List[str]:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT table_name 
+                FROM user_tables 
+                ORDER BY table_name
+            """)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def column_count(self, connection: Any, table: str) -> int:
+        return self._scalar(
+            connection,
+            "SELECT COUNT(*) FROM user_tab_columns WHERE table_name = :1",
+            (table,)
+        )
+
+    def table_query(self, table: str, limit: Optional[int] = None, sample: bool = False) -> str:
+        query = f"SELECT * FROM {self.quote(table)}"
+        if sample:
+            query += f" ORDER BY {self.random_function}"
+        if limit is not None:
+            query += f" FETCH FIRST {int(limit)} ROWS ONLY"
+        return query
+
+    def cursor(self, connection: Any, streaming: bool = False) -> Any:
+        # 加大 arraysize / prefetchrows，减少网络往返
+        cursor = connection.cursor()
+        cursor.arraysize = self.fetch_size
+        cursor.prefetchrows = self.fetch_size + 1
+        return cursor
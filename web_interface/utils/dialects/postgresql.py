@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PostgreSQL 方言（psycopg2；安装 adbc-driver-postgresql 后支持 Arrow 原生读取）
+"""
+
+import uuid
+from typing import Any, Dict, List
+
+import psycopg2
+
+from .base import Dialect, DEFAULT_CAPABILITIES
+
+
+class PostgreSQLDialect(Dialect):
+    """PostgreSQL 方言"""
+
+    name = 'postgresql'
+    capabilities = dict(DEFAULT_CAPABILITIES, pooling=True, sampling=True, streaming=True, bulk_fetch=True,
+                        arrow=True)
+    random_function = 'random()'
+    arrow_driver = 'adbc_driver_postgresql.dbapi'
+
+    def connect(self, config: Dict[str, Any]) -> Any:
+        return psycopg2.connect(
+            host=config['host'],
+            port=int(config['port']),
+            user=config['username'],
+            password=config['password'],
+            database=config['database']
+        )
+
+    def connection_string(self, config: Dict[str, Any]) -> str:
+        return f"postgresql://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
+
+    def arrow_uri(self, config: Dict[str, Any]) -> str:
+        return self.connection_string(config)
+
+    def table_names(self, connection: Any) -> List[str]:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT table_name 
+                FROM information_schema.tables 
+                WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
+            """)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def column_count(self, connection: Any, table: str) -> int:
+        return self._scalar(
+            connection,
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_name = %s AND table_schema = 'public'",
+            (table,)
+        )
+
+    def cursor(self, connection: Any, streaming: bool = False) -> Any:
+        # 命名游标即服务端游标，按 itersize / fetchmany 分批从服务端获取
+        if streaming:
+            cursor = connection.cursor(name=f'sdg_{uuid.uuid4().hex}')
+            cursor.itersize = self.fetch_size
+            return cursor
+        return connection.cursor()
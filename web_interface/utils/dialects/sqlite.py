@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 方言（标准库 sqlite3；安装 adbc-driver-sqlite 后支持 Arrow 原生读取）
+
+adbc-driver-sqlite 按第一批数据推断列类型，之后出现其他类型的值时报
+``Type mismatch``（例如前几批中整列为空的文本列）。读取整张表时在结果前插入
+一行按声明类型取值的占位行，使第一批的列类型与表结构一致，返回前再去掉该行。
+"""
+
+import sqlite3
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from .base import Dialect, DEFAULT_CAPABILITIES
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+def _affinity_placeholder(declared: str) -> str:
+    """按 SQLite 的类型亲和性规则返回声明类型对应的占位值"""
+    declared = (declared or '').upper()
+    if 'INT' in declared:
+        return '0'
+    if any(name in declared for name in ('CHAR', 'CLOB', 'TEXT')):
+        return "''"
+    if not declared or 'BLOB' in declared:
+        # 无声明类型的列可以保存任意类型的值，不指定
+        return 'NULL'
+    # REAL 及 NUMERIC 亲和性：浮点列可以容纳后续的整数值
+    return '0.0'
+
+
+class SQLiteDialect(Dialect):
+    """SQLite 方言；连接开销很小且不能跨线程使用，因此不复用连接"""
+
+    name = 'sqlite'
+    capabilities = dict(DEFAULT_CAPABILITIES, sampling=True, streaming=True, arrow=True)
+    arrow_driver = 'adbc_driver_sqlite.dbapi'
+    arrow_batch_option = 'adbc.sqlite.query.batch_rows'
+
+    def connect(self, config: Dict[str, Any]) -> Any:
+        return sqlite3.connect(config['database'])
+
+    def connection_string(self, config: Dict[str, Any]) -> str:
+        return f"sqlite:///{config['database']}"
+
+    def arrow_uri(self, config: Dict[str, Any]) -> str:
+        return config['database']
+
+    def quote(self, identifier: str) -> str:
+        return '`' + identifier.replace('`', '``') + '`'
+
+    def table_names(self, connection: Any) -> List[str]:
+        cursor = connection.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        return [row[0] for row in cursor.fetchall()]
+
+    def column_count(self, connection: Any, table: str) -> int:
+        return len(connection.execute(f"PRAGMA table_info({self.quote(table)})").fetchall())
+
+    def _placeholder_row(self, connection: Any, table: str) -> str:
+        """按表结构生成占位行的查询语句"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA table_info({self.quote(table)})")
+            columns = cursor.fetchall()
+        finally:
+            cursor.close()
+        return 'SELECT ' + ', '.join(
+            f"{_affinity_placeholder(declared)} AS {self.quote(name)}"
+            for _, name, declared, *_ in columns
+        )
+
+    def iter_arrow_query(self, connection: Any, query: str, batch_size: Optional[int] = None,
+                         table: Optional[str] = None) -> Iterator['pa.RecordBatch']:
+        if table is None:
+            yield from super().iter_arrow_query(connection, query, batch_size)
+            return
+
+        typed_query = f"{self._placeholder_row(connection, table)} UNION ALL SELECT * FROM ({query})"
+        first = True
+        for batch in super().iter_arrow_query(connection, typed_query, batch_size):
+            if first:
+                # 去掉占位行；只有占位行时返回保留列结构的空批次
+                batch = batch.slice(1)
+                first = False
+            yield batch
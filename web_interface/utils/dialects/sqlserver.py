@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQL Server 方言（pyodbc）
+"""
+
+from typing import Any, Dict, List, Optional
+
+import pyodbc
+
+from .base import Dialect, DEFAULT_CAPABILITIES
+
+
+class SQLServerDialect(Dialect):
+    """SQL Server 方言"""
+
+    name = 'sqlserver'
+    capabilities = dict(DEFAULT_CAPABILITIES, pooling=True, sampling=True, streaming=True)
+    random_function = 'NEWID()'
+
+    def connect(self, config: Dict[str, Any]) -> Any:
+        connection_string = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={config['host']},{config['port']};DATABASE={config['database']};UID={config['username']};PWD={config['password']}"
+        return pyodbc.connect(connection_string)
+
+    def connection_string(self, config: Dict[str, Any]) -> str:
+        return f"mssql+pyodbc://{config['username']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}?driver=ODBC+Driver+17+for+SQL+Server"
+
+    def quote(self, identifier: str) -> str:
+        return '[' + identifier.replace(']', ']]') + ']'
+
+    def table_names(self, connection: Any) -> List[str]:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT TABLE_NAME 
+                FROM INFORMATION_SCHEMA.TABLES 
+                WHERE TABLE_TYPE = 'BASE TABLE'
+            """)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def column_count(self, connection: Any, table: str) -> int:
+        return self._scalar(
+            connection,
+            "SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ?",
+            (table,)
+        )
+
+    def table_query(self, table: str, limit: Optional[int] = None, sample: bool = False) -> str:
+        top = f"TOP {int(limit)} " if limit is not None else ''
+        query = f"SELECT {top}* FROM {self.quote(table)}"
+        if sample:
+            query += f" ORDER BY {self.random_function}"
+        return query
+
+    def records(self, rows: List[Any]) -> List[Any]:
+        # pyodbc.Row 需要转换为元组
+        return [tuple(row) for row in rows]
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+超参数搜索
+==========
+
+在 ModelManager 给出的 CTGAN 参数范围内搜索超参数。
+
+采用 successive halving / Hyperband：先用少量 epochs 训练大量随机配置，
+在留出集上用 QualityEvaluator 打分，每轮只保留得分最高的 1/eta，
+并把 epochs 乘以 eta 继续训练。弱配置在早期就被淘汰，总训练量只是
+网格搜索的一小部分。同一轮的试验在进程池中并行执行。
+"""
+
+import math
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 可搜索的数值参数及其采样方式（均为对数均匀分布）
+LOG_UNIFORM_PARAMETERS = ['generator_lr', 'discriminator_lr', 'generator_decay', 'discriminator_decay']
+
+# 衰减率允许为 0，对数采样时的下限
+MIN_LOG_VALUE = 1e-8
+
+# CTGAN 要求 batch_size 为偶数且能被 pac(10) 整除
+BATCH_SIZE_CHOICES = [100, 200, 500, 1000, 2000]
+DIMENSION_CHOICES = ['(128, 128)', '(256, 256)', '(512, 512)', '(256, 256, 256)']
+
+# 试验函数: (训练集, 留出集, 参数配置, epochs) -> 分数(0-100)
+TrialFunc = Callable[[pd.DataFrame, pd.DataFrame, Dict[str, Any], int], float]
+
+
+def hyperband_brackets(min_epochs: int, max_epochs: int, eta: int) -> List[Tuple[int, int]]:
+    """Hyperband 各组的 (试验数, 初始 epochs)"""
+    if not 1 <= min_epochs <= max_epochs:
+        raise ValueError('需要满足 1 <= min_epochs <= max_epochs')
+    if eta < 2:
+        raise ValueError('eta 必须不小于2')
+
+    s_max = int(math.log(max_epochs / min_epochs, eta) + 1e-9)
+    brackets = []
+    for s in range(s_max, -1, -1):
+        n_trials = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        brackets.append((n_trials, max(min_epochs, int(round(max_epochs / eta ** s)))))
+    return brackets
+
+
+def build_search_space(parameters: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """根据 ModelManager 的 CTGAN 参数配置生成搜索空间（epochs 由搜索算法控制）"""
+    space = {}
+    for name in LOG_UNIFORM_PARAMETERS:
+        config = parameters[name]
+        space[name] = {
+            'type': 'log_uniform',
+            'low': max(config.get('min', 0), MIN_LOG_VALUE),
+            'high': config['max']
+        }
+
+    batch_config = parameters['batch_size']
+    space['batch_size'] = {
+        'type': 'choice',
+        'values': [v for v in BATCH_SIZE_CHOICES if batch_config['min'] <= v <= batch_config['max']]
+    }
+    space['generator_dim'] = {'type': 'choice', 'values': list(DIMENSION_CHOICES)}
+    space['discriminator_dim'] = {'type': 'choice', 'values': list(DIMENSION_CHOICES)}
+    return space
+
+
+def sample_config(space: Dict[str, Dict[str, Any]], rng: np.random.Generator) -> Dict[str, Any]:
+    """从搜索空间中随机采样一组参数"""
+    config = {}
+    for name, spec in space.items():
+        if spec['type'] == 'log_uniform':
+            config[name] = float(np.exp(rng.uniform(np.log(spec['low']), np.log(spec['high']))))
+        elif spec['type'] == 'uniform':
+            config[name] = float(rng.uniform(spec['low'], spec['high']))
+        elif spec['type'] == 'choice':
+            config[name] = spec['values'][rng.integers(len(spec['values']))]
+        else:
+            raise ValueError(f"不支持的搜索空间类型: {spec['type']}")
+    return config
+
+
+def fit_and_score(train_df: pd.DataFrame, holdout_df: pd.DataFrame,
+                  config: Dict[str, Any], epochs: int) -> float:
+    """训练一个 CTGAN 配置，并用留出集评估合成数据质量（在子进程中执行）"""
+    from sdgx.data_connectors.dataframe_connector import DataFrameConnector
+    from sdgx.synthesizer import Synthesizer
+
+    from .data_processor import DataProcessor
+    from .model_manager import ModelManager
+    from .quality_evaluator import QualityEvaluator
+
+    processor = DataProcessor()
+    encoder = processor.fit_encoder(train_df)
+    prepared_df = processor.prepare_for_synthesis(train_df, encoder=encoder)
+
+    model = ModelManager().create_model('ctgan', dict(config, epochs=epochs))
+    synthesizer = Synthesizer(model=model, data_connector=DataFrameConnector(df=prepared_df))
+    synthesizer.fit()
+
+    synthetic_df = processor.post_process_synthetic(synthesizer.sample(len(holdout_df)), encoder=encoder)
+    return float(QualityEvaluator().evaluate(holdout_df, synthetic_df)['overall_score'])
+
+
+def _timed_trial(trial_fn: TrialFunc, train_df: pd.DataFrame, holdout_df: pd.DataFrame,
+                 config: Dict[str, Any], epochs: int) -> Tuple[Optional[float], float, Optional[str]]:
+    """执行一次试验，返回 (分数, 耗时, 错误信息)"""
+    started = time.time()
+    try:
+        score = trial_fn(train_df, holdout_df, config, epochs)
+        return score, time.time() - started, None
+    except Exception as e:
+        return None, time.time() - started, str(e)
+
+
+class HyperparameterSearch:
+    """基于 successive halving / Hyperband 的超参数搜索"""
+
+    def __init__(self, parameters: Dict[str, Any], max_workers: Optional[int] = None,
+                 holdout_fraction: float = 0.2, seed: Optional[int] = None,
+                 trial_fn: TrialFunc = fit_and_score):
+        self.space = build_search_space(parameters)
+        self.max_workers = max_workers or 1
+        self.holdout_fraction = holdout_fraction
+        self.trial_fn = trial_fn
+        self._rng = np.random.default_rng(seed)
+
+    def split(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """随机划分训练集和留出集"""
+        if len(df) < 10:
+            raise ValueError('数据量过少，无法划分留出集')
+        order = self._rng.permutation(len(df))
+        holdout_size = max(1, int(len(df) * self.holdout_fraction))
+        holdout = df.iloc[order[:holdout_size]].reset_index(drop=True)
+        train = df.iloc[order[holdout_size:]].reset_index(drop=True)
+        return train, holdout
+
+    def _run_rung(self, executor: Optional[ProcessPoolExecutor], train_df: pd.DataFrame,
+                  holdout_df: pd.DataFrame, trials: List[Dict[str, Any]], epochs: int):
+        """以相同的 epochs 训练一组试验"""
+        args = [(self.trial_fn, train_df, holdout_df, trial['config'], epochs) for trial in trials]
+        if executor is None:
+            results = [_timed_trial(*arg) for arg in args]
+        else:
+            results = list(executor.map(_timed_trial, *zip(*args)))
+
+        for trial, (score, seconds, error) in zip(trials, results):
+            trial['epochs'] = epochs
+            trial['cpu_seconds'] += seconds
+            if error is None:
+                trial['scores'][epochs] = score
+                trial['score'] = score
+            else:
+                logger.warning(f"超参数试验 {trial['id']} 失败: {error}")
+                trial['status'] = 'failed'
+                trial['error'] = error
+                trial['score'] = None
+
+    def _halving(self, executor, train_df: pd.DataFrame, holdout_df: pd.DataFrame,
+                 configs: List[Dict[str, Any]], min_epochs: int, max_epochs: int,
+                 eta: int, first_id: int = 0) -> Dict[str, Any]:
+        trials = [
+            {'id': first_id + i, 'config': config, 'scores': {}, 'score': None,
+             'epochs': 0, 'cpu_seconds': 0.0, 'status': 'running'}
+            for i, config in enumerate(configs)
+        ]
+        rungs = []
+        active = trials
+        epochs = min_epochs
+        while active:
+            self._run_rung(executor, train_df, holdout_df, active, epochs)
+            active = sorted((t for t in active if t['status'] == 'running'),
+                            key=lambda t: t['score'], reverse=True)
+            rungs.append({'epochs': epochs, 'trials': len(active),
+                          'best_score': active[0]['score'] if active else None})
+
+            if epochs >= max_epochs or len(active) <= 1:
+                break
+
+            # 只保留前 1/eta 的试验进入下一轮，其余提前停止
+            keep = max(1, len(active) // eta)
+            for trial in active[keep:]:
+                trial['status'] = 'stopped'
+            active = active[:keep]
+            epochs = min(max_epochs, epochs * eta)
+
+        for trial in active:
+            trial['status'] = 'completed'
+        return {'trials': trials, 'rungs': rungs}
+
+    def successive_halving(self, df: pd.DataFrame, n_trials: int = 27, min_epochs: int = 5,
+                           max_epochs: int = 135, eta: int = 3) -> Dict[str, Any]:
+        """successive halving：n_trials 个随机配置从 min_epochs 开始逐轮淘汰"""
+        return self._search(df, [(n_trials, min_epochs)], max_epochs, eta)
+
+    def hyperband(self, df: pd.DataFrame, min_epochs: int = 5, max_epochs: int = 135,
+                  eta: int = 3) -> Dict[str, Any]:
+        """Hyperband：用不同的初始 epochs 运行多组 successive halving"""
+        return self._search(df, hyperband_brackets(min_epochs, max_epochs, eta), max_epochs, eta)
+
+    def _search(self, df: pd.DataFrame, brackets: List[Tuple[int, int]],
+                max_epochs: int, eta: int) -> Dict[str, Any]:
+        if eta < 2:
+            raise ValueError('eta 必须不小于2')
+
+        started = time.time()
+        train_df, holdout_df = self.split(df)
+        executor = ProcessPoolExecutor(max_workers=self.max_workers) if self.max_workers > 1 else None
+
+        trials, bracket_results = [], []
+        try:
+            for n_trials, min_epochs in brackets:
+                configs = [sample_config(self.space, self._rng) for _ in range(n_trials)]
+                result = self._halving(executor, train_df, holdout_df, configs,
+                                       min(min_epochs, max_epochs), max_epochs, eta, len(trials))
+                trials.extend(result['trials'])
+                bracket_results.append({'initial_epochs': min_epochs, 'rungs': result['rungs']})
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # 只比较训练到最大 epochs 的配置；都未达到时取训练最充分的
+        scored = [t for t in trials if t['score'] is not None]
+        if not scored:
+            raise RuntimeError('所有超参数试验均失败')
+        best = max(scored, key=lambda t: (t['epochs'], t['score']))
+
+        epochs_used = sum(sum(t['scores']) for t in trials)
+        return {
+            'best_config': dict(best['config'], epochs=best['epochs']),
+            'best_score': best['score'],
+            'trials': [
+                {key: trial[key] for key in ('id', 'config', 'scores', 'epochs', 'status', 'cpu_seconds')}
+                for trial in trials
+            ],
+            'brackets': bracket_results,
+            'epochs_used': epochs_used,
+            'epochs_full_search': len(trials) * max_epochs,
+            'cpu_seconds': sum(t['cpu_seconds'] for t in trials),
+            'wall_seconds': time.time() - started
+        }
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+延迟导入
+========
+
+sdgx（torch）、scipy、数据库驱动等依赖导入耗时较长，且部分为可选依赖。
+这些模块改为首次使用时再导入，worker 启动时不再加载，缺失的可选依赖
+也只在用到时报错。
+
+每个模块首次导入的耗时记录在 ``IMPORT_TIMINGS`` 中，可通过健康检查接口查看。
+"""
+
+import time
+import logging
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 模块名 -> 首次导入耗时（秒）
+IMPORT_TIMINGS: Dict[str, float] = {}
+
+_lock = threading.RLock()
+
+
+def lazy_import(name: str) -> ModuleType:
+    """导入模块并记录首次导入耗时"""
+    with _lock:
+        if name in IMPORT_TIMINGS:
+            return importlib.import_module(name)
+
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        IMPORT_TIMINGS[name] = round(time.perf_counter() - started, 4)
+        logger.debug(f"延迟导入 {name}: {IMPORT_TIMINGS[name]:.3f}s")
+        return module
+
+
+class LazyInstance:
+    """首次访问属性时才导入模块并创建实例的代理对象"""
+
+    def __init__(self, module: str, attr: str, *args, **kwargs):
+        self._module = module
+        self._attr = attr
+        self._args = args
+        self._kwargs = kwargs
+        self._instance: Optional[Any] = None
+
+    def _get_instance(self) -> Any:
+        if self._instance is None:
+            with _lock:
+                if self._instance is None:
+                    cls = getattr(lazy_import(self._module), self._attr)
+                    self._instance = cls(*self._args, **self._kwargs)
+        return self._instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get_instance(), name)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._instance is not None else 'pending'
+        return f"<LazyInstance {self._module}.{self._attr} ({state})>"
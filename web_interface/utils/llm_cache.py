@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 补全缓存
+============
+
+GPT 合成使用的补全结果缓存，保存在本地 SQLite 文件中（进程重启不丢失）:
+
+- 以请求内容（接口地址、模型、消息、温度、最大 token 数）的 SHA-256 作为键，
+  相同的请求直接返回缓存结果，不再调用接口
+- 总大小超过上限时按最近访问时间淘汰（LRU）
+- 记录命中、未命中、写入和淘汰次数，提供命中率指标
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'llm_cache.db'
+)
+LLM_CACHE_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES') or 256 * 1024 * 1024)
+
+
+def completion_key(request: Dict[str, Any]) -> str:
+    """请求内容的 SHA-256 键（不含 API 密钥）"""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CompletionCache:
+    """按内容寻址、容量有界的 LRU 补全缓存"""
+
+    def __init__(self, db_path: str, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+        self._init_db()
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        """打开数据库连接，退出时提交并关闭"""
+        with self._lock:
+            connection = sqlite3.connect(str(self.db_path), timeout=30)
+            try:
+                with connection:
+                    yield connection
+            finally:
+                connection.close()
+
+    def _init_db(self):
+        with self._db() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            ''')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_completions_accessed ON completions (accessed_at)'
+            )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，命中时更新访问时间"""
+        with self._db() as connection:
+            row = connection.execute('SELECT value FROM completions WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                connection.execute('UPDATE completions SET accessed_at = ? WHERE key = ?',
+                                   (time.time(), key))
+
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """写入缓存，超出容量时淘汰最久未访问的条目"""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._db() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO completions (key, value, size, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, data, size, now, now)
+            )
+            evicted = self._evict(connection)
+
+        self.stats['writes'] += 1
+        self.stats['evictions'] += evicted
+
+    def _evict(self, connection: sqlite3.Connection) -> int:
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM completions').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        keys = []
+        for key, size in connection.execute('SELECT key, size FROM completions ORDER BY accessed_at'):
+            if total <= self.max_bytes:
+                break
+            keys.append((key,))
+            total -= size
+        connection.executemany('DELETE FROM completions WHERE key = ?', keys)
+        return len(keys)
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else None
+
+    def info(self) -> Dict[str, Any]:
+        """缓存大小和命中率"""
+        with self._db() as connection:
+            entries, total = connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions'
+            ).fetchone()
+        return dict(self.stats, entries=entries, bytes=total, max_bytes=self.max_bytes,
+                    hit_rate=self.hit_rate)
+
+    def clear(self) -> int:
+        """清空缓存，返回删除的条目数"""
+        with self._db() as connection:
+            return connection.execute('DELETE FROM completions').rowcount
+
+
+_default_cache: Optional[CompletionCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    """进程内共享的默认缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CompletionCache(LLM_CACHE_PATH)
+        return _default_cache
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GPT 采样管线
+============
+
+并发调用 OpenAI 兼容的 chat/completions 接口生成表格数据:
+
+- 多个请求通过 asyncio 并发执行，HTTP 调用在专用线程池中完成
+- 每分钟请求数、每分钟 token 数分别由令牌桶限流
+- 429、5xx、超时等可重试错误按指数退避加随机抖动重试，并遵循 Retry-After
+- 返回的行按原始数据推断的结构校验，去除重复行以及与原始数据相同的行
+- 通过校验的行按批次流式输出，不必等待全部请求完成
+- 可选的补全缓存（见 ``llm_cache``）：相同的请求直接返回缓存结果，
+  不占用限流配额；默认对所有请求使用缓存
+- 示例行由种子决定；未指定种子时每次运行随机选取，本次使用的种子记录在
+  ``stats['seed']`` 中，以相同种子重新运行即可命中缓存
+"""
+
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import threading
+import queue
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Iterator, AsyncIterator, Tuple
+
+import pandas as pd
+
+from .llm_cache import CompletionCache, completion_key
+
+logger = logging.getLogger(__name__)
+
+# 分类列最多允许的取值个数，超过时按自由文本处理
+MAX_CATEGORIES = 20
+# 数值列允许超出原始范围的比例
+RANGE_MARGIN = 0.5
+# 每个请求附带的示例行数
+EXAMPLE_ROWS = 20
+# 请求总数上限 = 所需请求数 * 该系数，防止模型持续返回无效数据时无限请求
+REQUEST_BUDGET_FACTOR = 3
+# 估算 token 数时每个 token 对应的字符数
+CHARS_PER_TOKEN = 3
+MAX_BACKOFF = 60.0
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+PROMPT_TEMPLATE = (
+    "Here are example rows of a table, one JSON object per line, with columns {columns}:\n"
+    "{examples}\n\n"
+    "Generate {count} new, realistic and diverse rows that follow the same schema and value "
+    "distributions. Do not copy the examples. Reply with only a JSON array of {count} objects "
+    "using exactly these keys."
+)
+
+_NULL_STRINGS = {'', 'null', 'none', 'nan', 'n/a'}
+_TRUE_STRINGS = {'true', '1', 'yes', 'y', 't'}
+_FALSE_STRINGS = {'false', '0', 'no', 'n', 'f'}
+
+
+class LLMRequestError(Exception):
+    """LLM 请求失败"""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶限流器（每分钟速率）"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        """取出 amount 个令牌，不足时等待"""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, amount: float):
+        """按实际用量修正令牌数（正数为补扣，负数为返还）"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RowSchema:
+    """根据原始数据推断的行结构，用于校验和规范化生成的行"""
+
+    def __init__(self, columns: Dict[str, Dict[str, Any]]):
+        self.columns = columns
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, max_categories: int = MAX_CATEGORIES) -> 'RowSchema':
+        columns = {}
+        for name in df.columns:
+            series = df[name]
+            non_null = series.dropna()
+            spec = {'nullable': bool(series.isna().any())}
+
+            if pd.api.types.is_bool_dtype(series):
+                spec['kind'] = 'bool'
+            elif pd.api.types.is_numeric_dtype(series):
+                spec['kind'] = 'int' if pd.api.types.is_integer_dtype(series) else 'float'
+                if len(non_null):
+                    low, high = float(non_null.min()), float(non_null.max())
+                    margin = (high - low) * RANGE_MARGIN or abs(high) * RANGE_MARGIN or 1.0
+                    spec['range'] = (low - margin, high + margin)
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                spec['kind'] = 'datetime'
+            else:
+                values = non_null.astype(str).unique()
+                if len(values) <= max_categories and len(values) < max(2, len(non_null) * 0.5):
+                    spec['kind'] = 'category'
+                    spec['values'] = set(values)
+                else:
+                    spec['kind'] = 'text'
+            columns[str(name)] = spec
+        return cls(columns)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns)
+
+    def _normalize(self, spec: Dict[str, Any], value: Any) -> Tuple[bool, Any]:
+        """规范化单个值，返回 (是否有效, 规范化后的值)"""
+        if value is None or (isinstance(value, float) and math.isnan(value)) \
+                or (isinstance(value, str) and value.strip().lower() in _NULL_STRINGS):
+            return spec['nullable'], None
+
+        kind = spec['kind']
+        try:
+            if kind in ('int', 'float'):
+                if isinstance(value, bool):
+                    return False, None
+                number = float(value)
+                if not math.isfinite(number):
+                    return False, None
+                if 'range' in spec and not spec['range'][0] <= number <= spec['range'][1]:
+                    return False, None
+                if kind == 'int':
+                    return number.is_integer(), int(number)
+                return True, number
+            if kind == 'bool':
+                if isinstance(value, bool):
+                    return True, value
+                text = str(value).strip().lower()
+                if text in _TRUE_STRINGS:
+                    return True, True
+                if text in _FALSE_STRINGS:
+                    return True, False
+                return False, None
+            if kind == 'datetime':
+                return True, pd.Timestamp(value).isoformat()
+            if kind == 'category':
+                text = str(value)
+                return text in spec['values'], text
+            return True, str(value)
+        except (TypeError, ValueError, OverflowError):
+            return False, None
+
+    def validate(self, row: Any) -> Optional[Dict[str, Any]]:
+        """校验一行数据，缺列或取值不合法时返回 None；多余的键被忽略"""
+        if not isinstance(row, dict):
+            return None
+
+        normalized = {}
+        for name, spec in self.columns.items():
+            if name not in row:
+                return None
+            valid, value = self._normalize(spec, row[name])
+            if not valid:
+                return None
+            normalized[name] = value
+        return normalized
+
+    def key(self, row: Dict[str, Any]) -> tuple:
+        """行的去重键"""
+        return tuple(row[name] for name in self.columns)
+
+    def to_frame(self, rows: List[Dict[str, Any]]) -> pd.DataFrame:
+        """将规范化后的行转换为与原始数据类型一致的 DataFrame"""
+        df = pd.DataFrame(rows, columns=self.names)
+        for name, spec in self.columns.items():
+            if spec['kind'] == 'int':
+                df[name] = df[name].astype('Int64' if df[name].isna().any() else 'int64')
+            elif spec['kind'] == 'float':
+                df[name] = df[name].astype('float64')
+            elif spec['kind'] == 'datetime':
+                df[name] = pd.to_datetime(df[name], format='ISO8601')
+        return df
+
+
+def parse_rows(content: str) -> List[Any]:
+    """从模型回复中解析行：优先解析 JSON 数组，失败时逐行解析 JSON 对象"""
+    start, end = content.find('['), content.rfind(']')
+    if start != -1 and end > start:
+        try:
+            rows = json.loads(content[start:end + 1])
+            if isinstance(rows, list):
+                return rows
+        except ValueError:
+            pass
+
+    rows = []
+    for line in content.splitlines():
+        line = line.strip().rstrip(',')
+        if line.startswith('{') and line.endswith('}'):
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+    return rows
+
+
+class GPTSampler:
+    """基于 OpenAI 兼容接口的并发、限流 GPT 采样管线"""
+
+    def __init__(self, api_key: str, api_url: str = 'https://api.openai.com/v1/',
+                 model: str = 'gpt-3.5-turbo', temperature: float = 0.1, max_tokens: int = 2000,
+                 timeout: float = 90, query_batch: int = 10, concurrency: int = 4,
+                 requests_per_minute: float = 60, tokens_per_minute: float = 90000,
+                 max_retries: int = 5, backoff: float = 1.0, example_rows: int = EXAMPLE_ROWS,
+                 cache: Optional[CompletionCache] = None, cache_sampled: bool = True):
+        if not api_key:
+            raise ValueError("GPT模型需要API密钥")
+
+        self.api_key = api_key
+        self.endpoint = api_url.rstrip('/') + '/chat/completions'
+        self.model = model
+        self.temperature = float(temperature)
+        self.max_tokens = int(max_tokens)
+        self.timeout = float(timeout)
+        self.query_batch = max(1, int(query_batch))
+        self.concurrency = max(1, int(concurrency))
+        self.requests_per_minute = float(requests_per_minute)
+        self.tokens_per_minute = float(tokens_per_minute)
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = float(backoff)
+        self.example_rows = max(1, int(example_rows))
+        # temperature > 0 时结果本身是随机的；cache_sampled=False 时只缓存 temperature 为 0 的请求
+        self.cache = cache if cache is not None and (self.temperature == 0 or cache_sampled) else None
+        self.stats: Dict[str, Any] = {}
+
+    def _reset_stats(self):
+        self.stats = {
+            'requests': 0, 'failed_requests': 0, 'retries': 0,
+            'rows_received': 0, 'rows_accepted': 0, 'rows_invalid': 0, 'rows_duplicate': 0,
+            'prompt_tokens': 0, 'completion_tokens': 0, 'cache_hits': 0, 'cache_misses': 0,
+            'seconds': 0.0, 'seed': None
+        }
+
+    def build_prompt(self, schema: RowSchema, examples: pd.DataFrame, count: int) -> str:
+        return PROMPT_TEMPLATE.format(
+            columns=', '.join(schema.names),
+            examples=examples.to_json(orient='records', lines=True, date_format='iso',
+                                      force_ascii=False).strip(),
+            count=count
+        )
+
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """同步发送一次请求（在线程池中执行）"""
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {self.api_key}'},
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            retry_after = e.headers.get('Retry-After') if e.headers else None
+            raise LLMRequestError(
+                f"HTTP {e.code}: {e.reason}",
+                retryable=e.code in RETRYABLE_STATUS,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise LLMRequestError(f"请求失败: {e}", retryable=True)
+        except ValueError as e:
+            raise LLMRequestError(f"响应不是有效的JSON: {e}", retryable=True)
+
+    def _payload(self, prompt: str) -> Dict[str, Any]:
+        return {
+            'model': self.model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens
+        }
+
+    def _complete(self, prompt: str) -> Dict[str, Any]:
+        """调用补全接口，返回 {'content', 'prompt_tokens', 'completion_tokens'}"""
+        response = self._post(self._payload(prompt))
+        try:
+            content = response['choices'][0]['message']['content']
+        except (KeyError, IndexError, TypeError):
+            raise LLMRequestError('响应缺少 choices', retryable=True)
+
+        usage = response.get('usage') or {}
+        return {
+            'content': content,
+            'prompt_tokens': usage.get('prompt_tokens', len(prompt) // CHARS_PER_TOKEN),
+            'completion_tokens': usage.get('completion_tokens', len(content) // CHARS_PER_TOKEN)
+        }
+
+    async def _request(self, executor: ThreadPoolExecutor, limits: Tuple[TokenBucket, TokenBucket],
+                       prompt: str) -> str:
+        """限流并带重试地执行一次补全"""
+        request_bucket, token_bucket = limits
+        estimated_tokens = len(prompt) // CHARS_PER_TOKEN + self.max_tokens
+        loop = asyncio.get_running_loop()
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = completion_key(dict(self._payload(prompt), endpoint=self.endpoint))
+            cached = await loop.run_in_executor(executor, self.cache.get, cache_key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached['content']
+            self.stats['cache_misses'] += 1
+
+        for attempt in range(self.max_retries + 1):
+            await request_bucket.acquire()
+            await token_bucket.acquire(estimated_tokens)
+            self.stats['requests'] += 1
+            try:
+                result = await loop.run_in_executor(executor, self._complete, prompt)
+            except LLMRequestError as e:
+                token_bucket.adjust(-estimated_tokens)
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                # 指数退避 + 完全抖动，避免并发请求同时重试
+                delay = e.retry_after or random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+                self.stats['retries'] += 1
+                logger.info(f"GPT请求失败，{delay:.1f}秒后重试: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            used = result['prompt_tokens'] + result['completion_tokens']
+            token_bucket.adjust(used - estimated_tokens)
+            self.stats['prompt_tokens'] += result['prompt_tokens']
+            self.stats['completion_tokens'] += result['completion_tokens']
+            if cache_key is not None:
+                await loop.run_in_executor(executor, self.cache.put, cache_key, result)
+            return result['content']
+
+    async def astream(self, df: pd.DataFrame, num_rows: int,
+                      seed: Optional[int] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """并发生成 num_rows 行，按批次产出通过校验的行"""
+        if num_rows <= 0:
+            return
+        if df.empty:
+            raise ValueError('示例数据为空')
+
+        self._reset_stats()
+        started = time.time()
+        schema = RowSchema.from_dataframe(df)
+        # 与原始数据相同的行视为重复，不输出
+        seen = {schema.key(row) for row in map(schema.validate, df.to_dict('records')) if row}
+
+        # 指定种子时提示词固定，重复运行可以命中缓存；未指定时随机选取示例行
+        base_seed = seed if seed is not None else random.getrandbits(32)
+        self.stats['seed'] = base_seed
+        example_count = min(self.example_rows, len(df))
+        max_requests = math.ceil(num_rows / self.query_batch) * REQUEST_BUDGET_FACTOR + self.concurrency
+
+        limits = (TokenBucket(self.requests_per_minute, max(1, self.concurrency)),
+                  TokenBucket(self.tokens_per_minute))
+        state = {'accepted': 0, 'pending': 0, 'issued': 0}
+        condition = asyncio.Condition()
+        output: asyncio.Queue = asyncio.Queue()
+
+        def finished():
+            return state['accepted'] >= num_rows or state['issued'] >= max_requests
+
+        async def worker(executor):
+            while True:
+                async with condition:
+                    # 已请求但未返回的行数足够时等待，避免过量请求
+                    await condition.wait_for(
+                        lambda: finished() or state['pending'] < num_rows - state['accepted']
+                    )
+                    if finished():
+                        return
+                    index = state['issued']
+                    count = min(self.query_batch, num_rows - state['accepted'] - state['pending'])
+                    state['issued'] += 1
+                    state['pending'] += count
+
+                # 示例行由种子和请求序号决定，相同种子得到相同的提示词
+                examples = df.sample(n=example_count, random_state=(base_seed + index) % 2 ** 32)
+                try:
+                    content = await self._request(executor, limits, self.build_prompt(schema, examples, count))
+                    rows = parse_rows(content)
+                except LLMRequestError as e:
+                    if not e.retryable:
+                        raise
+                    self.stats['failed_requests'] += 1
+                    logger.warning(f"GPT请求重试{self.max_retries}次后仍失败: {e}")
+                    rows = []
+
+                accepted = []
+                for raw in rows:
+                    row = schema.validate(raw)
+                    if row is None:
+                        self.stats['rows_invalid'] += 1
+                        continue
+                    key = schema.key(row)
+                    if key in seen:
+                        self.stats['rows_duplicate'] += 1
+                        continue
+                    seen.add(key)
+                    accepted.append(row)
+                self.stats['rows_received'] += len(rows)
+
+                async with condition:
+                    accepted = accepted[:max(0, num_rows - state['accepted'])]
+                    state['accepted'] += len(accepted)
+                    state['pending'] -= count
+                    condition.notify_all()
+                if accepted:
+                    self.stats['rows_accepted'] += len(accepted)
+                    await output.put(accepted)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            tasks = [asyncio.create_task(worker(executor)) for _ in range(self.concurrency)]
+            done = asyncio.gather(*tasks)
+            done.add_done_callback(lambda _: output.put_nowait(None))
+            try:
+                while True:
+                    batch = await output.get()
+                    if batch is None:
+                        break
+                    yield batch
+                await done
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if done.done() and not done.cancelled():
+                    # 提前关闭时任务被取消，取出异常避免事件循环报告未处理
+                    done.exception()
+                self.stats['seconds'] = time.time() - started
+
+        if self.stats['rows_accepted'] < num_rows:
+            logger.warning(f"GPT采样达到请求上限，仅生成 {self.stats['rows_accepted']}/{num_rows} 行")
+
+    def iter_rows(self, df: pd.DataFrame, num_rows: int,
+                  seed: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+        """同步迭代通过校验的行批次（事件循环在后台线程中运行，适用于流式响应）"""
+        batches: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        end = object()
+
+        async def consume():
+            stream = self.astream(df, num_rows, seed)
+            try:
+                async for batch in stream:
+                    batches.put(batch)
+                    if stop.is_set():
+                        break
+            finally:
+                await stream.aclose()
+
+        def run():
+            try:
+                asyncio.run(consume())
+                batches.put(end)
+            except BaseException as e:
+                batches.put(e)
+
+        threading.Thread(target=run, daemon=True).start()
+        try:
+            while True:
+                item = batches.get()
+                if item is end:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def sample(self, df: pd.DataFrame, num_rows: int, seed: Optional[int] = None) -> pd.DataFrame:
+        """生成 num_rows 行合成数据"""
+        rows = [row for batch in self.iter_rows(df, num_rows, seed) for row in batch]
+        if not rows:
+            raise RuntimeError('GPT未生成有效数据')
+        return RowSchema.from_dataframe(df).to_frame(rows)
@@ -9,24 +9,39 @@
 
 import sys
 import os
+import uuid
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, TYPE_CHECKING
 import pandas as pd
 import numpy as np
 
+from .lazy_imports import lazy_import
+from .model_registry import NullRegistry
+
 # 添加SDG路径
 sys.path.append('../../synthetic-data-generator')
 
-try:
+# sdgx 会加载 torch，导入耗时较长，在创建模型时再导入
+if TYPE_CHECKING:
     from sdgx.models.ml.single_table.ctgan import CTGANSynthesizerModel
     from sdgx.models.LLM.single_table.gpt import SingleTableGPTModel
-    from sdgx.synthesizer import Synthesizer
-    from sdgx.data_connectors.dataframe_connector import DataFrameConnector
-except ImportError as e:
-    logging.warning(f"SDG导入失败: {e}")
 
 logger = logging.getLogger(__name__)
 
+# 训练计划估算使用的 CTGAN 成本模型参数。吞吐量按普通 CPU 标定，
+# 可通过环境变量按实际机器调整。
+CTGAN_FLOPS_PER_SECOND = float(os.environ.get('CTGAN_FLOPS_PER_SECOND') or 5e9)
+CTGAN_STEP_OVERHEAD = 0.004       # 每个训练步骤的固定开销（秒）
+CTGAN_EMBEDDING_DIM = 128
+CTGAN_PAC = 10
+CTGAN_MAX_MODES = 10              # 连续列 BayesianGMM 的最大模态数
+DEFAULT_MODES = 5                 # 未做剖析时假设的模态数
+DEFAULT_CARDINALITY = 10          # 缺少统计时假设的分类列取值数
+GMM_SECONDS_PER_VALUE_MODE = 2e-6 # 数据转换阶段 GMM 拟合的成本
+BASE_MEMORY_MB = 400              # Python + torch 运行时的基础内存
+MIN_PLAN_EPOCHS = 10
+MIN_SUBSAMPLE_ROWS = 1000
+
 class ModelManager:
     """模型管理器类"""
     
@@ -112,6 +127,31 @@ class ModelManager:
                 'default': '(256, 256)',
                 'description': '判别器网络维度',
                 'help': '判别器网络的隐藏层维度，格式如(256, 256)'
+            },
+            'checkpoint_every': {
+                'type': 'number',
+                'default': 10,
+                'min': 0,
+                'max': 100,
+                'description': '检查点间隔',
+                'help': '每隔多少个epoch保存一次检查点，任务中断后从检查点继续训练，0表示不保存；'
+                        '仅在请求指定 run_id 或 checkpoint 时生效'
+            },
+            'validation_every': {
+                'type': 'number',
+                'default': 5,
+                'min': 0,
+                'max': 100,
+                'description': '验证间隔',
+                'help': '每隔多少个epoch计算一次验证指标，0表示不验证'
+            },
+            'early_stopping_patience': {
+                'type': 'number',
+                'default': 5,
+                'min': 0,
+                'max': 50,
+                'description': '提前停止耐心值',
+                'help': '验证指标连续多少次未改善时停止训练，0表示不提前停止'
             }
         }
     
@@ -170,6 +210,37 @@ class ModelManager:
                 'max': 50,
                 'description': '查询批次大小',
                 'help': '每次查询的样本数量'
+            },
+            'concurrency': {
+                'type': 'number',
+                'default': 4,
+                'min': 1,
+                'max': 32,
+                'description': '并发请求数',
+                'help': '同时进行的API请求数量'
+            },
+            'requests_per_minute': {
+                'type': 'number',
+                'default': 60,
+                'min': 1,
+                'max': 10000,
+                'description': '每分钟请求数上限',
+                'help': '按API账号的速率限制设置，超出时请求会排队等待'
+            },
+            'tokens_per_minute': {
+                'type': 'number',
+                'default': 90000,
+                'min': 1000,
+                'max': 10000000,
+                'description': '每分钟token数上限',
+                'help': '按API账号的token速率限制设置'
+            },
+            'response_cache': {
+                'type': 'select',
+                'default': 'all',
+                'options': ['all', 'deterministic', 'off'],
+                'description': '响应缓存',
+                'help': '相同请求直接使用缓存结果；all 对所有请求使用缓存（以返回的 seed 重新运行即命中缓存），deterministic 仅在温度为0时使用，off 不使用缓存'
             }
         }
     
@@ -184,11 +255,18 @@ class ModelManager:
         
         return self.available_models[model_type]['parameters']
     
-    def create_model(self, model_type: str, parameters: Dict[str, Any]) -> Any:
-        """创建模型实例"""
+    def create_model(self, model_type: str, parameters: Dict[str, Any],
+                     run_id: Optional[str] = None) -> Any:
+        """
+        创建模型实例
+
+        CTGAN 按 validation_every / early_stopping_patience 定期验证，并在验证指标
+        不再改善时提前停止。指定 run_id 时检查点还会保存到模型注册表，相同 run_id
+        再次训练时从检查点继续；未指定时不保存检查点。
+        """
         try:
             if model_type == 'ctgan':
-                return self._create_ctgan_model(parameters)
+                return self._create_ctgan_model(parameters, run_id)
             elif model_type == 'gpt':
                 return self._create_gpt_model(parameters)
             else:
@@ -197,13 +275,14 @@ class ModelManager:
             logger.error(f"创建模型失败: {e}")
             raise
     
-    def _create_ctgan_model(self, parameters: Dict[str, Any]) -> CTGANSynthesizerModel:
+    def _create_ctgan_model(self, parameters: Dict[str, Any],
+                            run_id: Optional[str] = None) -> 'CTGANSynthesizerModel':
         """创建CTGAN模型"""
         # 解析网络维度
         generator_dim = self._parse_dimension(parameters.get('generator_dim', '(256, 256)'))
         discriminator_dim = self._parse_dimension(parameters.get('discriminator_dim', '(256, 256)'))
         
-        model = CTGANSynthesizerModel(
+        model_kwargs = dict(
             epochs=parameters.get('epochs', 50),
             batch_size=parameters.get('batch_size', 500),
             generator_lr=parameters.get('generator_lr', 2e-4),
@@ -214,15 +293,38 @@ class ModelManager:
             discriminator_dim=discriminator_dim
         )
         
-        return model
+        validation_every = parameters.get('validation_every', 5)
+        if run_id is None and not validation_every:
+            ctgan = lazy_import('sdgx.models.ml.single_table.ctgan')
+            return ctgan.CTGANSynthesizerModel(**model_kwargs)
+        
+        from .ctgan_training import CheckpointedCTGANSynthesizerModel
+        if run_id is None:
+            # 只做验证和提前停止，不保存检查点
+            return CheckpointedCTGANSynthesizerModel(
+                run_id=f'memory-{uuid.uuid4().hex[:12]}',
+                registry=NullRegistry(),
+                checkpoint_every=0,
+                validation_every=validation_every,
+                patience=parameters.get('early_stopping_patience', 5),
+                **model_kwargs
+            )
+        return CheckpointedCTGANSynthesizerModel(
+            run_id=run_id,
+            checkpoint_every=parameters.get('checkpoint_every', 10),
+            validation_every=validation_every,
+            patience=parameters.get('early_stopping_patience', 5),
+            **model_kwargs
+        )
     
-    def _create_gpt_model(self, parameters: Dict[str, Any]) -> SingleTableGPTModel:
+    def _create_gpt_model(self, parameters: Dict[str, Any]) -> 'SingleTableGPTModel':
         """创建GPT模型"""
         # 验证必填参数
         if not parameters.get('openai_API_key'):
             raise ValueError("GPT模型需要API密钥")
         
-        model = SingleTableGPTModel(
+        gpt = lazy_import('sdgx.models.LLM.single_table.gpt')
+        model = gpt.SingleTableGPTModel(
             openai_API_key=parameters.get('openai_API_key', ''),
             openai_API_url=parameters.get('openai_API_url', 'https://api.openai.com/v1/'),
             gpt_model=parameters.get('gpt_model', 'gpt-3.5-turbo'),
@@ -234,6 +336,33 @@ class ModelManager:
         
         return model
     
+    def create_gpt_sampler(self, parameters: Dict[str, Any]):
+        """创建并发、限流的GPT采样管线"""
+        from .llm_sampler import GPTSampler
+        from .llm_cache import get_completion_cache
+        
+        cache_policy = parameters.get('response_cache', 'all')
+        # validate_parameters 对超出范围的值只给出警告；每个并发请求占用一个线程，
+        # 这里限制在声明的范围内
+        limits = self.available_models['gpt']['parameters']['concurrency']
+        concurrency = int(parameters.get('concurrency', limits['default']))
+        concurrency = min(max(concurrency, limits['min']), limits['max'])
+        
+        return GPTSampler(
+            api_key=parameters.get('openai_API_key', ''),
+            api_url=parameters.get('openai_API_url', 'https://api.openai.com/v1/'),
+            model=parameters.get('gpt_model', 'gpt-3.5-turbo'),
+            temperature=parameters.get('temperature', 0.1),
+            max_tokens=parameters.get('max_tokens', 2000),
+            timeout=parameters.get('timeout', 90),
+            query_batch=parameters.get('query_batch', 10),
+            concurrency=concurrency,
+            requests_per_minute=parameters.get('requests_per_minute', 60),
+            tokens_per_minute=parameters.get('tokens_per_minute', 90000),
+            cache=get_completion_cache() if cache_policy != 'off' else None,
+            cache_sampled=cache_policy == 'all'
+        )
+    
     def _parse_dimension(self, dim_str: str) -> tuple:
         """解析维度字符串"""
         try:
@@ -286,8 +415,9 @@ class ModelManager:
         
         return validation_result
     
-    def get_model_recommendations(self, data_info: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """根据数据特征推荐模型"""
+    def get_model_recommendations(self, data_info: Dict[str, Any],
+                                  time_budget: Optional[float] = None) -> List[Dict[str, Any]]:
+        """根据数据特征推荐模型；CTGAN 推荐附带训练计划（耗时、内存估算）"""
         recommendations = []
         
         # 分析数据特征
@@ -325,7 +455,8 @@ class ModelManager:
                 'model': 'ctgan',
                 'score': ctgan_score,
                 'reasons': ctgan_reasons,
-                'confidence': 'high'
+                'confidence': 'high',
+                'training_plan': self.estimate_training_plan(data_info, time_budget)
             })
         
         # GPT推荐
@@ -403,3 +534,162 @@ class ModelManager:
                 suggestions['max_tokens'] = 4000
         
         return suggestions
+    
+    def profile_schema(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        剖析数据结构，供训练计划估算使用
+        
+        分类列记录取值数（one-hot 宽度）；连续列用直方图的峰数估计
+        BayesianGMM 的模态数。
+        """
+        continuous, discrete = {}, {}
+        for col in df.columns:
+            series = df[col].dropna()
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                continuous[col] = self._estimate_modes(series.to_numpy(dtype='float64'))
+            else:
+                discrete[col] = int(series.nunique())
+        
+        return {
+            'rows': len(df),
+            'continuous': continuous,
+            'discrete': discrete
+        }
+    
+    @staticmethod
+    def _estimate_modes(values: np.ndarray) -> int:
+        """用平滑后直方图的局部极大值个数估计模态数"""
+        if len(values) < 2 or np.ptp(values) == 0:
+            return 1
+        counts, _ = np.histogram(values, bins=50)
+        smoothed = np.convolve(counts, np.ones(3) / 3, mode='same')
+        threshold = smoothed.max() * 0.05
+        peaks = (smoothed[1:-1] > smoothed[:-2]) & (smoothed[1:-1] >= smoothed[2:]) & (smoothed[1:-1] > threshold)
+        peaks = int(peaks.sum()) + int(smoothed[0] > smoothed[1]) + int(smoothed[-1] > smoothed[-2])
+        return int(np.clip(peaks, 1, CTGAN_MAX_MODES))
+    
+    def _schema_from_info(self, data_info: Dict[str, Any]) -> Dict[str, Any]:
+        """从 analyze_data 的结果推断结构；已有 profile_schema 结果时直接使用"""
+        if 'schema' in data_info:
+            return data_info['schema']
+        
+        rows = data_info.get('shape', (0, 0))[0]
+        column_types = data_info.get('column_types', {})
+        categorical_stats = data_info.get('basic_stats', {}).get('categorical', {})
+        
+        discrete = {}
+        for col in column_types.get('categorical', []) + column_types.get('text', []):
+            unique_count = categorical_stats.get(col, {}).get('unique_count', DEFAULT_CARDINALITY)
+            discrete[col] = int(min(unique_count, rows) if rows else unique_count)
+        
+        return {
+            'rows': rows,
+            'continuous': {col: DEFAULT_MODES for col in column_types.get('numeric', [])},
+            'discrete': discrete
+        }
+    
+    def _estimate_ctgan_cost(self, rows: int, continuous: Dict[str, int], discrete: Dict[str, int],
+                             epochs: int, batch_size: int, generator_dim: tuple,
+                             discriminator_dim: tuple) -> Dict[str, float]:
+        """估算 CTGAN 的训练耗时（秒）和峰值内存（MB）"""
+        cond_dim = sum(discrete.values())
+        data_dim = sum(1 + modes for modes in continuous.values()) + cond_dim
+        
+        # 生成器：残差层逐层拼接输入；判别器：pac 个样本拼接输入
+        generator_params, width = 0, CTGAN_EMBEDDING_DIM + cond_dim
+        for size in generator_dim:
+            generator_params += width * size
+            width += size
+        generator_params += width * data_dim
+        
+        discriminator_params, width = 0, (data_dim + cond_dim) * CTGAN_PAC
+        for size in discriminator_dim:
+            discriminator_params += width * size
+            width = size
+        discriminator_params += width
+        
+        # 每个样本：判别器和生成器各一次前向+反向（约 6 FLOPs/参数）
+        flops_per_row = 6 * (generator_params + 2 * discriminator_params / CTGAN_PAC)
+        steps_per_epoch = max(1, rows // batch_size)
+        train_seconds = epochs * (steps_per_epoch * CTGAN_STEP_OVERHEAD
+                                  + rows * flops_per_row / CTGAN_FLOPS_PER_SECOND)
+        transform_seconds = rows * sum(continuous.values()) * GMM_SECONDS_PER_VALUE_MODE
+        
+        # 转换后的训练矩阵（float32）+ 参数/梯度/Adam 状态 + 批次激活
+        matrix_mb = rows * data_dim * 4 / 1024 ** 2
+        params_mb = (generator_params + discriminator_params) * 4 * 4 / 1024 ** 2
+        activation_mb = batch_size * ((sum(generator_dim) + sum(discriminator_dim)) * 2 + data_dim * 2) * 4 / 1024 ** 2
+        
+        return {
+            'data_dim': data_dim,
+            'estimated_seconds': train_seconds + transform_seconds,
+            'estimated_peak_memory_mb': BASE_MEMORY_MB + 2 * matrix_mb + params_mb + activation_mb
+        }
+    
+    def estimate_training_plan(self, data_info: Dict[str, Any], time_budget: Optional[float] = None,
+                               parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        估算 CTGAN 训练计划
+        
+        根据数据结构预测训练耗时和峰值内存；给定 time_budget（秒）时依次
+        增大批次、减少 epochs、对数据降采样，使预计耗时不超过预算。
+        """
+        schema = self._schema_from_info(data_info)
+        rows = int(schema['rows'])
+        continuous, discrete = schema['continuous'], schema['discrete']
+        
+        plan = dict(self.get_parameter_suggestions('ctgan', {'shape': (rows, len(continuous) + len(discrete))}))
+        plan.update(parameters or {})
+        epochs = int(plan.get('epochs', 50))
+        batch_size = self._fit_batch_size(int(plan.get('batch_size', 500)), rows)
+        generator_dim = self._parse_dimension(str(plan.get('generator_dim', '(256, 256)')))
+        discriminator_dim = self._parse_dimension(str(plan.get('discriminator_dim', '(256, 256)')))
+        train_rows = rows
+        notes = []
+        
+        def estimate():
+            return self._estimate_ctgan_cost(train_rows, continuous, discrete, epochs, batch_size,
+                                             generator_dim, discriminator_dim)
+        
+        cost = estimate()
+        if time_budget and cost['estimated_seconds'] > time_budget:
+            # 1. 增大批次，减少每步的固定开销
+            max_batch = self._fit_batch_size(self.available_models['ctgan']['parameters']['batch_size']['max'], rows)
+            if max_batch > batch_size:
+                batch_size = max_batch
+                cost = estimate()
+                notes.append(f'批次增大到 {batch_size} 以缩短训练时间')
+            
+            # 2. 按比例减少 epochs，不低于 MIN_PLAN_EPOCHS
+            if cost['estimated_seconds'] > time_budget and epochs > MIN_PLAN_EPOCHS:
+                epochs = max(MIN_PLAN_EPOCHS, int(epochs * time_budget / cost['estimated_seconds']))
+                cost = estimate()
+                notes.append(f'训练轮数减少到 {epochs} 以满足时间预算')
+            
+            # 3. 仍超出预算时对训练数据降采样
+            if cost['estimated_seconds'] > time_budget and rows > MIN_SUBSAMPLE_ROWS:
+                train_rows = max(MIN_SUBSAMPLE_ROWS, int(rows * time_budget / cost['estimated_seconds']))
+                batch_size = self._fit_batch_size(batch_size, train_rows)
+                cost = estimate()
+                notes.append(f'训练数据降采样到 {train_rows} 行')
+        
+        plan.update({'epochs': epochs, 'batch_size': batch_size})
+        return {
+            'model': 'ctgan',
+            'parameters': plan,
+            'rows': rows,
+            'subsample_rows': train_rows if train_rows < rows else None,
+            'data_dim': cost['data_dim'],
+            'estimated_seconds': round(cost['estimated_seconds'], 1),
+            'estimated_peak_memory_mb': round(cost['estimated_peak_memory_mb'], 1),
+            'time_budget': time_budget,
+            'fits_budget': time_budget is None or cost['estimated_seconds'] <= time_budget,
+            'notes': notes
+        }
+    
+    @staticmethod
+    def _fit_batch_size(batch_size: int, rows: int) -> int:
+        """批次大小不超过数据行数，并保持为 pac(10) 的偶数倍"""
+        step = 2 * CTGAN_PAC
+        batch_size = min(batch_size, max(step, rows))
+        return max(step, batch_size // step * step)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型注册表
+==========
+
+按训练运行保存模型检查点。每个运行一个目录:
+
+- ``checkpoint.pt``  torch 序列化的训练状态（网络、优化器、随机数状态等）
+- ``meta.json``      运行元数据（状态、当前 epoch、验证指标历史）
+
+检查点先写入临时文件再原子替换，进程在写入过程中被终止也不会
+留下损坏的检查点。
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_registry'
+)
+
+CHECKPOINT_FILE = 'checkpoint.pt'
+METADATA_FILE = 'meta.json'
+
+_RUN_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def training_run_id(df: pd.DataFrame, parameters: Dict[str, Any]) -> str:
+    """
+    根据训练数据和模型参数生成运行ID
+
+    相同的数据和参数得到相同的ID，任务在进程重启后重新提交时
+    可以找到之前的检查点继续训练。
+    """
+    digest = hashlib.sha1()
+    digest.update(','.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(json.dumps(parameters, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+class ModelRegistry:
+    """模型检查点注册表"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or MODEL_REGISTRY_DIR
+
+    def _run_dir(self, run_id: str) -> str:
+        if not _RUN_ID_PATTERN.match(run_id or ''):
+            raise ValueError(f"无效的运行ID: {run_id}")
+        return os.path.join(self.root, run_id)
+
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, Any]):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def save_checkpoint(self, run_id: str, state: Dict[str, Any], **metadata) -> str:
+        """保存检查点，并更新运行元数据"""
+        import torch
+
+        run_dir = self._run_dir(run_id)
+        os.makedirs(run_dir, exist_ok=True)
+
+        path = os.path.join(run_dir, CHECKPOINT_FILE)
+        tmp_path = path + '.tmp'
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+
+        self.update_metadata(run_id, checkpoint_epoch=state.get('epoch'),
+                             checkpoint_at=datetime.now().isoformat(), **metadata)
+        return path
+
+    def load_checkpoint(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """加载检查点，不存在时返回 None"""
+        path = os.path.join(self._run_dir(run_id), CHECKPOINT_FILE)
+        if not os.path.exists(path):
+            return None
+
+        import torch
+        try:
+            # 检查点包含优化器和随机数状态，需要完整反序列化
+            return torch.load(path, map_location='cpu', weights_only=False)
+        except Exception as e:
+            logger.warning(f"加载检查点失败 {run_id}: {e}")
+            return None
+
+    def get_metadata(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """获取运行元数据"""
+        path = os.path.join(self._run_dir(run_id), METADATA_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def update_metadata(self, run_id: str, **fields) -> Dict[str, Any]:
+        """合并更新运行元数据"""
+        run_dir = self._run_dir(run_id)
+        os.makedirs(run_dir, exist_ok=True)
+
+        metadata = self.get_metadata(run_id) or {'run_id': run_id, 'created_at': datetime.now().isoformat()}
+        metadata.update(fields)
+        metadata['updated_at'] = datetime.now().isoformat()
+        self._write_json(os.path.join(run_dir, METADATA_FILE), metadata)
+        return metadata
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        """列出所有训练运行的元数据"""
+        if not os.path.isdir(self.root):
+            return []
+
+        runs = []
+        for run_id in sorted(os.listdir(self.root)):
+            if not _RUN_ID_PATTERN.match(run_id):
+                continue
+            metadata = self.get_metadata(run_id)
+            if metadata is not None:
+                runs.append(metadata)
+        return runs
+
+    def delete_run(self, run_id: str) -> bool:
+        """删除训练运行及其检查点"""
+        run_dir = self._run_dir(run_id)
+        if not os.path.isdir(run_dir):
+            return False
+        shutil.rmtree(run_dir)
+        return True
+
+
+class NullRegistry:
+    """
+    不保存检查点的注册表
+
+    未要求检查点的训练仍使用验证和提前停止，运行元数据只记录在内存中。
+    """
+
+    def __init__(self):
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+
+    def save_checkpoint(self, run_id: str, state: Dict[str, Any], **metadata) -> None:
+        self.update_metadata(run_id, checkpoint_epoch=state.get('epoch'), **metadata)
+
+    def load_checkpoint(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def get_metadata(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return self._metadata.get(run_id)
+
+    def update_metadata(self, run_id: str, **fields) -> Dict[str, Any]:
+        metadata = self._metadata.setdefault(run_id, {'run_id': run_id})
+        metadata.update(fields)
+        return metadata